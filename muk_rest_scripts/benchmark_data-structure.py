@@ -0,0 +1,501 @@
+import argparse
+import contextlib
+import gzip
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# the fake server speaks plain http on localhost
+os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+
+
+def load_sync_module(file_name=None):
+    ''' loads export-import_data-structure.py (which can't be imported by its name) as a module'''
+    file_name = file_name or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                          'export-import_data-structure.py')
+    spec = importlib.util.spec_from_file_location('export_import_data_structure', file_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+
+class FakeOdooDatabase:
+    """Just enough of an Odoo database for the data structure models to answer the requests of the sync script:
+    records are plain dicts, the o2m fields are computed from their inverse m2o and the m2o fields are returned
+    as [id, display name] like Odoo does"""
+    # model: {o2m field: (comodel, inverse field, only records without parent)}
+    o2m_fields = {
+        'data.structure': {'generator_ids': ('generate.data.structure', 'structure_id', True),
+                           'parser_ids': ('parse.data.structure', 'structure_id', True)},
+        'generate.data.structure': {'child_ids': ('generate.data.structure', 'parent_id', False),
+                                    'lang_mapping_ids': ('language.mapping', 'generator_id', False)},
+        'parse.data.structure': {'child_ids': ('parse.data.structure', 'parent_id', False)},
+    }
+    # model: {m2o field: comodel}
+    m2o_fields = {
+        'data.structure': {'model_id': 'ir.model', 'filter_date_field_id': 'ir.model.fields',
+                           'child_id': 'data.structure'},
+        'generate.data.structure': {'model_id': 'ir.model', 'filter_date_field_id': 'ir.model.fields',
+                                    'lang_id': 'res.lang', 'parent_id': 'generate.data.structure',
+                                    'structure_id': 'data.structure'},
+        'parse.data.structure': {'field_id': 'ir.model.fields', 'odoo_model_id': 'ir.model',
+                                 'parent_id': 'parse.data.structure', 'structure_id': 'data.structure'},
+        'language.mapping': {'lang_id': 'res.lang', 'generator_id': 'generate.data.structure'},
+        'ir.model.fields': {'model_id': 'ir.model'},
+    }
+
+    def __init__(self):
+        self.tables = {}
+        self.last_id = 0
+        self.lock = threading.RLock()
+        # (method, endpoint, model) of every request received
+        self.requests = []
+        # (endpoint, parameters) of every request reading or writing records
+        self.payloads = []
+        # per endpoint the number of requests whose connection is dropped without an answer, see
+        # check_retried_payloads
+        self.drop_requests = {}
+
+    def add(self, model='', values={}):
+        with self.lock:
+            self.last_id += 1
+            self.tables.setdefault(model, {})[self.last_id] = dict(values, id=self.last_id,
+                                                                    write_date='2024-01-01 00:00:00')
+            return self.last_id
+
+    def _display(self, model='', rec_id=0):
+        record = self.tables.get(model, {}).get(rec_id)
+        if not record:
+            return False
+        return [rec_id, record.get('name') or record.get('keyword') or record.get('model') or str(rec_id)]
+
+    def _get_value(self, model='', record={}, field=''):
+        if field in self.o2m_fields.get(model, {}):
+            comodel, inverse, top_only = self.o2m_fields[model][field]
+            children = [r for r in self.tables.get(comodel, {}).values()
+                        if r.get(inverse) == record['id'] and not (top_only and r.get('parent_id'))]
+            return [r['id'] for r in sorted(children, key=lambda r: (r.get('sequence') or 0, r['id']))]
+        if field in self.m2o_fields.get(model, {}):
+            return self._display(self.m2o_fields[model][field], record.get(field)) if record.get(field) else False
+        return record.get(field, False)
+
+    def _match(self, model='', record={}, leaf=[]):
+        field, operator, value = leaf
+        if '.' in field:
+            # follow the m2o, e.g. model_id.model
+            m2o_field, field = field.split('.', 1)
+            comodel = self.m2o_fields[model][m2o_field]
+            target = self.tables.get(comodel, {}).get(record.get(m2o_field))
+            return bool(target) and self._match(comodel, target, [field, operator, value])
+        record_value = record.get(field, False)
+        if operator == '=':
+            return record_value == value
+        if operator == '!=':
+            return record_value != value
+        if operator == 'in':
+            return record_value in value
+        if operator == '>':
+            return record_value > value
+        if operator == 'ilike':
+            return str(value).lower() in str(record_value).lower()
+        raise ValueError(f"operator {operator} is not supported by the fake database")
+
+    def _evaluate(self, model='', record={}, domain=[]):
+        ''' evaluates a domain in polish notation, leaves without operator are and-ed'''
+        stack = []
+        for item in reversed(domain):
+            if item in ('|', '&'):
+                first, second = stack.pop(), stack.pop()
+                stack.append(first or second if item == '|' else first and second)
+            elif item == '!':
+                stack.append(not stack.pop())
+            else:
+                stack.append(self._match(model, record, item))
+        return all(stack)
+
+    def search(self, model='', domain=[], limit=None, offset=0, order=None):
+        with self.lock:
+            records = sorted((r for r in self.tables.get(model, {}).values() if self._evaluate(model, r, domain)),
+                             key=lambda r: r['id'], reverse=bool(order and 'desc' in order))
+        records = records[offset:]
+        return records[:limit] if limit else records
+
+    def read(self, model='', records=[], fields=[]):
+        with self.lock:
+            return [{field: self._get_value(model, record, field)
+                     for field in dict.fromkeys(['id'] + (fields or list(record) +
+                                                          list(self.o2m_fields.get(model, {}))))}
+                    for record in records]
+
+    def _apply_o2m(self, model='', rec_id=0, field='', commands=[]):
+        comodel, inverse, top_only = self.o2m_fields[model][field]
+        for command in commands:
+            if command[0] == 0:
+                values = dict(command[2], **{inverse: rec_id})
+                if top_only:
+                    values['parent_id'] = False
+                if comodel in ('generate.data.structure', 'parse.data.structure'):
+                    values['structure_id'] = self.tables[model][rec_id].get('structure_id') \
+                        if model == comodel else rec_id
+                self.create(comodel, values)
+            elif command[0] == 1:
+                self.write(comodel, [command[1]], command[2])
+            elif command[0] == 2:
+                self.unlink(comodel, command[1])
+
+    def create(self, model='', values={}):
+        with self.lock:
+            rec_id = self.add(model, {k: v for k, v in values.items() if k not in self.o2m_fields.get(model, {})})
+            for field in self.o2m_fields.get(model, {}):
+                if field in values:
+                    self._apply_o2m(model, rec_id, field, values[field])
+            return rec_id
+
+    def write(self, model='', rec_ids=[], values={}):
+        with self.lock:
+            for rec_id in rec_ids:
+                for field, value in values.items():
+                    if field in self.o2m_fields.get(model, {}):
+                        self._apply_o2m(model, rec_id, field, value)
+                    else:
+                        self.tables[model][rec_id][field] = value
+                self.tables[model][rec_id]['write_date'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            return True
+
+    def unlink(self, model='', rec_id=0):
+        with self.lock:
+            for comodel, inverse, top_only in self.o2m_fields.get(model, {}).values():
+                for child_id in [r['id'] for r in self.tables.get(comodel, {}).values() if r.get(inverse) == rec_id]:
+                    self.unlink(comodel, child_id)
+            self.tables[model].pop(rec_id, None)
+
+    def count(self, model=''):
+        return len(self.tables.get(model, {}))
+
+
+
+class FakeMukRequestHandler(BaseHTTPRequestHandler):
+    """Answers the MuK REST api requests of the sync script from a FakeOdooDatabase, after sleeping for latency
+    seconds to simulate the round-trip to a real server. authentication isn't checked"""
+    protocol_version = 'HTTP/1.1'
+    # the small header and body writes would otherwise wait for delayed acks and add 40ms to every request
+    disable_nagle_algorithm = True
+    database = None
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _get_params(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        params = {k: v[0] for k, v in parse_qs(body.decode('utf-8')).items()}
+        params.update({k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()})
+        return params
+
+    def _send(self, status_code=200, payload=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method='GET'):
+        params = self._get_params()
+        endpoint = urlparse(self.path).path.split('/api/v2', 1)[-1].strip('/')
+        model = params.get('model')
+        with self.database.lock:
+            self.database.requests.append((method, endpoint, model))
+            drop = False
+            if endpoint in ('search_read', 'search', 'create', 'write'):
+                self.database.payloads.append((endpoint, params))
+                drop = self.database.drop_requests.get(endpoint, 0) > 0
+                if drop:
+                    self.database.drop_requests[endpoint] -= 1
+        if drop:
+            # the client sees a connection error, like with a server restarting
+            self.close_connection = True
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        if endpoint == 'authentication/oauth2/token':
+            return self._send(payload={'access_token': 'benchmark', 'token_type': 'Bearer', 'expires_in': 3600})
+        if endpoint == '':
+            return self._send(payload={'api_version': '2', 'server_version': '16.0', 'server_serie': '16.0',
+                                       'server_version_info': [16, 0, 0, 'final', 0]})
+        if endpoint == 'user':
+            return self._send(payload={'name': 'Benchmark', 'uid': 2})
+        domain = json.loads(params.get('domain') or '[]')
+        limit = int(params['limit']) if params.get('limit') else None
+        offset = int(params.get('offset') or 0)
+        if endpoint == 'search_read':
+            records = self.database.search(model, domain, limit=limit, offset=offset, order=params.get('order'))
+            return self._send(payload=self.database.read(model, records, json.loads(params.get('fields') or '[]')))
+        if endpoint == 'search':
+            return self._send(payload=[r['id'] for r in self.database.search(model, domain, limit=limit,
+                                                                            offset=offset)])
+        if endpoint == 'create':
+            return self._send(payload=[self.database.create(model, json.loads(params['values']))])
+        if endpoint == 'write':
+            return self._send(payload=self.database.write(model, json.loads(params['ids']),
+                                                          json.loads(params['values'])))
+        return self._send(404, {'error': f"endpoint {endpoint} is not supported by the fake server"})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+
+
+class FakeMukServer:
+    """Runs a fake MuK REST api for a database in a background thread on a free port of localhost, use it as a
+    context manager"""
+    def __init__(self, database=None, latency=0.0):
+        handler = type('BenchmarkRequestHandler', (FakeMukRequestHandler,),
+                       {'database': database, 'latency': latency})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.host_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def write_credentials(self, cred_file_name='', connection='benchmark', settings={}):
+        with open(cred_file_name, 'w') as credentials_file:
+            json.dump({connection: dict({'host_url': self.host_url, 'rest_api': '/api/v2', 'client_id': 'benchmark',
+                                         'client_secret': 'benchmark'}, **settings)}, credentials_file)
+
+
+
+def build_sample_database(structures=1, depth=3, fanout=3, lang_density=0.3):
+    ''' builds a database with structures data structures whose generator and parser trees are depth levels
+        deep with fanout children per node, lang_density is the share of generators with language mappings
+        (two each). the references to models, fields and languages vary the way real structures do'''
+    database = FakeOdooDatabase()
+    models = [database.add('ir.model', {'name': name, 'model': model})
+              for name, model in [('Contact', 'res.partner'), ('Journal Entry', 'account.move'),
+                                  ('Product', 'product.product')]]
+    fields = [database.add('ir.model.fields', {'name': name, 'model': model, 'model_id': models[i]})
+              for i, (name, model) in enumerate([('name', 'res.partner'), ('date', 'account.move'),
+                                                 ('default_code', 'product.product')])]
+    langs = [database.add('res.lang', {'name': name, 'code': code})
+             for name, code in [('German', 'de_DE'), ('French', 'fr_FR'), ('Italian', 'it_IT')]]
+    counter = itertools.count()
+
+    for structure in range(structures):
+        structure_id = database.add('data.structure', {'name': f"Benchmark Structure {structure}",
+                                                       'structure_type': 'generate', 'model_id': models[1],
+                                                       'filter_date_field_id': fields[1], 'field_name': False,
+                                                       'value_type': 'dict'})
+
+        def _add_generators(parent_id=False, level=0):
+            for i in range(fanout):
+                n = next(counter)
+                generator_id = database.add('generate.data.structure', {
+                    'keyword': f"key_{level}_{i}", 'sequence': i, 'structure_id': structure_id,
+                    'parent_id': parent_id, 'model_id': models[n % 3] if n % 2 else False,
+                    'lang_id': langs[n % 3] if n % 5 == 0 else False,
+                    'filter_date_field_id': fields[n % 3] if n % 7 == 0 else False,
+                    'value': f"value {n}", 'value_type': 'str' if level + 1 == depth else 'dict'})
+                # spread the mappings evenly over the generators
+                if int((n + 1) * lang_density) > int(n * lang_density):
+                    for lang in range(2):
+                        database.add('language.mapping', {'generator_id': generator_id, 'keyword': f"key_{n}_{lang}",
+                                                          'lang_id': langs[(n + lang) % 3]})
+                if level + 1 < depth:
+                    _add_generators(parent_id=generator_id, level=level + 1)
+
+        def _add_parsers(parent_id=False, level=0):
+            for i in range(fanout):
+                n = next(counter)
+                parser_id = database.add('parse.data.structure', {
+                    'keyword': f"key_{level}_{i}", 'structure_id': structure_id, 'parent_id': parent_id,
+                    'value_type': 'str' if level + 1 == depth else 'dict',
+                    'field_id': fields[n % 3] if n % 3 == 0 else False,
+                    'odoo_model_id': models[n % 3] if n % 4 == 1 else False})
+                if level + 1 < depth:
+                    _add_parsers(parent_id=parser_id, level=level + 1)
+
+        _add_generators()
+        _add_parsers()
+    return database
+
+
+
+def run_benchmark(sync_module=None, depth=3, fanout=3, lang_density=0.3, latency=0.0, use_async=False,
+                  work_dir=None, settings={}, data_file_extension='.json', verbosity=0):
+    ''' exports a synthetic data structure from a fake server and creates it again from the exported file,
+        returns the request counts and wall times of both, the size of the tree and the size of the file and
+        the time it takes to load it. settings are added to the connection's credentials, e.g. to enable
+        compressed requests. the extension of the data file selects its format'''
+    database = build_sample_database(depth=depth, fanout=fanout, lang_density=lang_density)
+    result = {'depth': depth, 'fanout': fanout, 'lang_density': lang_density, 'latency': latency,
+              'nodes': database.count('generate.data.structure') + database.count('parse.data.structure') +
+                       database.count('language.mapping')}
+    with FakeMukServer(database=database, latency=latency) as server, open(os.devnull, 'w') as devnull:
+        cred_file_name = os.path.join(work_dir, 'benchmark_credentials.json')
+        data_file_name = os.path.join(work_dir, f"benchmark_{depth}_{fanout}{data_file_extension}")
+        server.write_credentials(cred_file_name=cred_file_name, settings=settings)
+        for step in ['export', 'create']:
+            odoosync = sync_module.DataStructureSync(cred_file_name=cred_file_name, verbosity=verbosity)
+            odoosync.load_credentials(connection='benchmark')
+            if not odoosync.init_api():
+                raise Exception("ERROR: could not connect to the fake server")
+            requests_before, started = len(database.requests), time.perf_counter()
+            # the results the sync script prints would only clutter the report
+            with contextlib.redirect_stdout(sys.stdout if verbosity else devnull):
+                if step == 'export':
+                    odoosync.export_structure(data_structure_name='Benchmark Structure 0',
+                                              data_file_name=data_file_name, use_async=use_async)
+                else:
+                    odoosync.create_structure(data_structure_name='Benchmark Copy', data_file_name=data_file_name)
+            result[f"{step}_seconds"] = time.perf_counter() - started
+            result[f"{step}_requests"] = len(database.requests) - requests_before
+            result[f"{step}_bytes_sent"] = sum(v['bytes_sent'] for v in odoosync.stats.to_json()['requests'])
+            odoosync.close_api()
+        result['file_bytes'] = os.path.getsize(data_file_name)
+        result['load_seconds'] = measure_load(odoosync=odoosync, data_file_name=data_file_name)
+    return result
+
+
+
+def check_retried_payloads(sync_module=None, work_dir=None, verbosity=0):
+    ''' exports and creates a small data structure while the fake server drops the connection of the first
+        search_read and the first create without answering them, the sync script has to send them again with the
+        same payload. returns the problems found'''
+    database = build_sample_database(depth=2, fanout=2)
+    problems = []
+    with FakeMukServer(database=database) as server:
+        cred_file_name = os.path.join(work_dir, 'retry_credentials.json')
+        data_file_name = os.path.join(work_dir, 'retry.json')
+        server.write_credentials(cred_file_name=cred_file_name, settings={'retry_backoff': 0.01})
+        odoosync = sync_module.DataStructureSync(cred_file_name=cred_file_name, verbosity=verbosity)
+        odoosync.load_credentials(connection='benchmark')
+        if not odoosync.init_api():
+            raise Exception("ERROR: could not connect to the fake server")
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if verbosity else devnull):
+            for step, endpoint in [('export', 'search_read'), ('create', 'create')]:
+                payloads_before = len(database.payloads)
+                database.drop_requests = {endpoint: 1}
+                if step == 'export':
+                    odoosync.export_structure(data_structure_name='Benchmark Structure 0',
+                                              data_file_name=data_file_name)
+                else:
+                    odoosync.create_structure(data_structure_name='Benchmark Copy', data_file_name=data_file_name)
+                dropped, retried = ([p for e, p in database.payloads[payloads_before:] if e == endpoint]
+                                    + [None, None])[:2]
+                if dropped != retried:
+                    problems.append(f"the {step} sent the {endpoint} request again with {retried} instead of "
+                                    f"{dropped} after a connection error")
+        odoosync.close_api()
+    if not database.count('data.structure') == 2:
+        problems.append("the data structure has not been created after a connection error")
+    return problems
+
+
+
+def measure_load(odoosync=None, data_file_name='', repeat=5):
+    ''' returns the best time of loading the data file the way create does and decoding all its records'''
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        data_structure = odoosync.load_data_file(data_file_name=data_file_name, lazy=True)
+        for kind in ['generator_structures', 'language_mappings', 'parser_structures']:
+            for record in (data_structure.get(kind) or {}).values():
+                pass
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of export-import_data-structure.py: exports synthetic "
+                        "data structures from a local fake MuK REST server and creates them again, reporting the "
+                        "requests and the wall time it takes depending on the tree size and the latency.")
+    parser.add_argument("--depths", action="store", default='2,3,4',
+                        help="comma separated depths of the generator and parser trees, defaults to 2,3,4")
+    parser.add_argument("--fanouts", action="store", default='3',
+                        help="comma separated number of children per node, defaults to 3")
+    parser.add_argument("--latencies", action="store", default='0,0.01',
+                        help="comma separated seconds the fake server waits per request, defaults to 0,0.01")
+    parser.add_argument("--lang-density", action="store", type=float, default=0.3,
+                        help="share of the generators with language mappings, defaults to 0.3")
+    parser.add_argument("-a", "--async", action="store_true", dest="use_async", default=False,
+                        help="export with async requests")
+    parser.add_argument("--compress", action="store_true", default=False,
+                        help="send the create requests gzipped")
+    parser.add_argument("--format", action="store", default='.json',
+                        help="extension of the data file, which selects its format: .json (the default), or one of "
+                        "the columnar .dsc, .dsc.gz and .dsc.zst")
+    parser.add_argument("--script", action="store", default=None,
+                        help="the export-import_data-structure.py to benchmark, defaults to the one next to this "
+                        "script - e.g. to compare against another version")
+    parser.add_argument("--json", action="store", default=None,
+                        help="also write the results as json to this file")
+    parser.add_argument("--check", action="store_true", default=False,
+                        help="fail if the number of requests grows with the number of nodes instead of the depth "
+                        "of the trees, i.e. if a tree walker does a request per record again")
+    parser.add_argument("-v", "--verbosity", action="count", default=0,
+                        help="verbosity of the sync script")
+    args = parser.parse_args()
+
+    sync_module = load_sync_module(file_name=args.script)
+    results = []
+    print(f"{'depth':>5}{'fanout':>7}{'nodes':>7}{'latency':>9}{'export req':>12}{'export s':>10}"
+          f"{'create req':>12}{'create s':>10}{'create kB':>11}{'file kB':>9}{'load ms':>9}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for depth, fanout, latency in itertools.product([int(d) for d in args.depths.split(',')],
+                                                        [int(f) for f in args.fanouts.split(',')],
+                                                        [float(l) for l in args.latencies.split(',')]):
+            result = run_benchmark(sync_module=sync_module, depth=depth, fanout=fanout,
+                                   lang_density=args.lang_density, latency=latency, use_async=args.use_async,
+                                   work_dir=work_dir, data_file_extension=args.format, verbosity=args.verbosity,
+                                   settings={'compress_requests': True, 'compress_min_size': 1024}
+                                            if args.compress else {})
+            results.append(result)
+            print(f"{depth:>5}{fanout:>7}{result['nodes']:>7}{latency:>9.3f}{result['export_requests']:>12}"
+                  f"{result['export_seconds']:>10.3f}{result['create_requests']:>12}{result['create_seconds']:>10.3f}"
+                  f"{result['create_bytes_sent'] / 1024:>11.1f}{result['file_bytes'] / 1024:>9.1f}"
+                  f"{result['load_seconds'] * 1000:>9.2f}")
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+    if args.check:
+        # a level-wise export needs a request per tree level and a few more for the meta data and the references,
+        # an import a few for the references and the create itself
+        failed = [r for r in results if r['export_requests'] > 2 * r['depth'] + 10 or r['create_requests'] > 10]
+        for result in failed:
+            print(f"ERROR: {result['export_requests']} export / {result['create_requests']} create requests for "
+                  f"depth {result['depth']} and fanout {result['fanout']} - looks like requests per record")
+        # requests failing with a connection error have to be sent again unchanged
+        with tempfile.TemporaryDirectory() as work_dir:
+            problems = check_retried_payloads(sync_module=sync_module, work_dir=work_dir, verbosity=args.verbosity)
+        for problem in problems:
+            print(f"ERROR: {problem}")
+        sys.exit(1 if failed or problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,587 @@
+import asyncio
+import fnmatch
+import gzip
+import hashlib
+import io
+import itertools
 import json
+import os
+import queue
+import sqlite3
 import sys
+import tarfile
+import tempfile
+import threading
 import argparse
 import re
 import time
-from datetime import datetime, timezone, timedelta
+import zipfile
+import zlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import random
 from pprint import pprint
 import requests
 from requests_oauthlib import OAuth2Session
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth, HTTPDigestAuth
+from urllib3.exceptions import NewConnectionError
+from urllib.parse import quote_plus, urlencode
+from collections.abc import Mapping
 from oauthlib.oauth2 import BackendApplicationClient, InvalidClientError, TokenExpiredError
 import inspect
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import aiohttp # only needed for async requests
+except ImportError:
+    aiohttp = None
+try:
+    import brotli # only needed to accept brotli compressed responses
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+try:
+    import zstandard # only needed for zstd compressed data files
+except ImportError:
+    zstandard = None
 # for more info on requests see https://requests.readthedocs.io/en/master/
 
 
 
+class RestAPIError(Exception):
+    """raised when a request keeps failing after all the retries the retry policy allows, so a transient server
+    or connection error aborts the run instead of silently leaving out data"""
+    pass
+
+
+
+class RetryPolicy:
+    """Decides if and when a failed request is sent again: with exponential backoff and full jitter, honoring the
+    server's Retry-After header, up to max_retries per request and retry_budget retries in total for the life of
+    the object, so a server that is down doesn't keep a long run waiting forever.
+    requests that can't be told apart from a successful one on the server side are only retried when they are
+    idempotent (GET by default) or when the server can't have processed them yet (429, connection refused).
+    the counters show how much the retries cost (see get_stats())"""
+    retry_statuses = (429, 502, 503, 504)
+
+    def __init__(self, max_retries=5, retry_budget=100, backoff_base=0.5, backoff_max=30.0, retry_after_max=120.0,
+                 verbosity=0):
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.verbosity = verbosity
+        self.lock = threading.Lock()
+        self.stats = {'retries': 0, 'retry_wait': 0.0, 'given_up': 0, 'retry_reasons': {}}
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, retry_reasons=dict(self.stats['retry_reasons']))
+
+    def _get_retry_after(self, retry_after=None):
+        ''' returns the seconds to wait according to the value of a Retry-After header or None'''
+        if not retry_after:
+            return None
+        try:
+            seconds = float(retry_after)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.retry_after_max)
+
+    def _is_not_processed(self, status_code=None, error=None):
+        ''' true if the request has surely not been processed by Odoo, so even a create can be sent again'''
+        if status_code == 429:
+            return True
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if aiohttp is not None and isinstance(error, aiohttp.ClientConnectorError):
+            return True
+        reason = getattr(error.args[0], 'reason', None) if error is not None and error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def get_retry_delay(self, attempt=0, idempotent=False, status_code=None, retry_after=None, error=None):
+        ''' returns the seconds to wait before the next attempt or None if the request must not be retried'''
+        if error is None and status_code not in self.retry_statuses:
+            return None
+        if not idempotent and not self._is_not_processed(status_code=status_code, error=error):
+            return None
+        reason = str(status_code) if error is None else type(error).__name__
+        with self.lock:
+            if attempt >= self.max_retries or self.stats['retries'] >= self.retry_budget:
+                self.stats['given_up'] += 1
+                return None
+            delay = self._get_retry_after(retry_after)
+            if delay is None:
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            self.stats['retries'] += 1
+            self.stats['retry_wait'] += delay
+            self.stats['retry_reasons'][reason] = self.stats['retry_reasons'].get(reason, 0) + 1
+        if self.verbosity > 0:
+            print(f"INFO: request failed ({reason}), retrying in {delay:.2f}s (attempt {attempt + 2} of "
+                  f"{self.max_retries + 1})")
+        return delay
+
+
+
+class RateLimiter:
+    """Throttles the requests of a RestAPI with a token bucket (rate requests per second, bursts of up to burst
+    requests) and a limit of requests in flight at the same time. in adaptive mode the in-flight limit follows the
+    server's load: it grows by one per window of fast successful requests (by one per request until the server
+    first shows signs of overload) and is halved when the server answers with 429/5xx or the smoothed latency
+    rises above target_latency (if not given, three times the fastest latency seen, but at least 100ms more), so
+    the requests stay just below the point where the server saturates.
+    both the threads of a parallel run and the coroutines of an async read share one limiter"""
+    def __init__(self, rate=0.0, burst=1, max_in_flight=0, adaptive=False, target_latency=None, verbosity=0):
+        self.rate = float(rate or 0.0)
+        self.burst = max(int(burst or 1), 1)
+        self.max_in_flight = int(max_in_flight or 0)
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.verbosity = verbosity
+        self.tokens = float(self.burst)
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        # the adaptive window starts small and opens up as long as the server keeps up
+        self.limit = float(min(self.max_in_flight, 2) if self.max_in_flight else 2) if adaptive else \
+            float(self.max_in_flight)
+        self.since_decrease = 0
+        self.slow_start = True
+        self.latency = None
+        self.fastest_latency = None
+        self.condition = threading.Condition()
+        self.stats = {'throttled': 0, 'throttle_wait': 0.0, 'decreases': 0, 'min_limit': self.limit,
+                      'max_limit': self.limit}
+
+    def is_active(self):
+        return bool(self.rate or self.limit)
+
+    def get_stats(self):
+        with self.condition:
+            return dict(self.stats, limit=self.limit)
+
+    def _try_acquire(self):
+        ''' takes a slot if one is free, returns 0.0 in that case or else the seconds to wait at most before
+            trying again'''
+        if self.limit and self.in_flight >= int(self.limit):
+            return 0.05
+        if self.rate:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+            self.refilled_at = now
+            if self.tokens < 1.0:
+                return (1.0 - self.tokens) / self.rate
+            self.tokens -= 1.0
+        self.in_flight += 1
+        return 0.0
+
+    def acquire(self):
+        ''' blocks until the request may be sent'''
+        if not self.is_active():
+            return
+        started = time.monotonic()
+        with self.condition:
+            wait = self._try_acquire()
+            while wait:
+                self.condition.wait(timeout=wait)
+                wait = self._try_acquire()
+            self._count_wait(started)
+
+    async def acquire_async(self):
+        ''' waits in the event loop until the request may be sent'''
+        if not self.is_active():
+            return
+        started = time.monotonic()
+        while True:
+            with self.condition:
+                wait = self._try_acquire()
+                if not wait:
+                    self._count_wait(started)
+                    return
+            await asyncio.sleep(min(wait, 0.01))
+
+    def _count_wait(self, started=0.0):
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            self.stats['throttled'] += 1
+            self.stats['throttle_wait'] += waited
+
+    def release(self, latency=0.0, status_code=None):
+        ''' frees the slot of a request once it is answered and adapts the in-flight limit to the response'''
+        if not self.is_active():
+            return
+        with self.condition:
+            self.in_flight = max(self.in_flight - 1, 0)
+            if self.adaptive:
+                self._adapt(latency=latency, status_code=status_code)
+            self.condition.notify_all()
+
+    def _adapt(self, latency=0.0, status_code=None):
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if status_code is not None and status_code < 500 and status_code != 429:
+            self.fastest_latency = latency if self.fastest_latency is None else min(self.fastest_latency, latency)
+        fastest_latency = self.fastest_latency or latency
+        target_latency = self.target_latency or max(3 * fastest_latency, fastest_latency + 0.1)
+        overloaded = status_code is None or status_code >= 500 or status_code == 429 or self.latency > target_latency
+        self.since_decrease += 1
+        if overloaded:
+            # halve the window at most once per window of requests, the answers of the requests still in
+            # flight were caused by the old window
+            if self.since_decrease >= self.limit and self.limit > 1:
+                self.limit = max(self.limit / 2, 1.0)
+                self.since_decrease = 0
+                self.slow_start = False
+                self.stats['decreases'] += 1
+                if self.verbosity > 1:
+                    print(f"INFO: the server seems to be overloaded, reducing the requests in flight to "
+                          f"{int(self.limit)}")
+        elif not self.max_in_flight or self.limit < self.max_in_flight:
+            self.limit = min(self.limit + (1 if self.slow_start else 1 / self.limit), self.max_in_flight or 1e9)
+        self.stats['min_limit'] = min(self.stats['min_limit'], self.limit)
+        self.stats['max_limit'] = max(self.stats['max_limit'], self.limit)
+
+
+
+class TokenManager:
+    """Hands out the OAuth2 token of a RestAPI and fetches a new one ahead of its expiry (as given by the token's
+    expires_in), so requests don't run into expired tokens. all threads share the one token and only one of them
+    fetches a new one when needed. if given a cache file, the token is kept there per connection and reused by
+    the next runs as long as it is valid"""
+    # the cache file is shared by the token managers of all connections, e.g. when deploying to many at once
+    save_lock = threading.Lock()
+
+    def __init__(self, oauth=None, token_url=None, client_id=None, client_secret=None, cache_file_name=None,
+                 cache_key=None, refresh_margin=60, verbosity=0):
+        self.oauth = oauth
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.cache_file_name = cache_file_name
+        self.cache_key = cache_key
+        self.refresh_margin = refresh_margin
+        self.verbosity = verbosity
+        self.token = None
+        self.lock = threading.RLock()
+
+    def _is_fresh(self, token=None):
+        ''' true if the token can still be used for a while, tokens without expiry are used until refused'''
+        if not token or not token.get('access_token'):
+            return False
+        # short-lived tokens are renewed once half their lifetime has passed
+        refresh_margin = min(self.refresh_margin, float(token.get('expires_in') or self.refresh_margin) / 2)
+        return not token.get('expires_at') or token['expires_at'] - refresh_margin > time.time()
+
+    def get_fresh_token(self):
+        ''' returns the current token if it can still be used, without waiting for the lock or fetching one'''
+        token = self.token
+        return token if self._is_fresh(token) else None
+
+    def get_token(self):
+        with self.lock:
+            if not self._is_fresh(self.token):
+                # the cached token is only worth a look before the first fetch of the run
+                token = self._load() if self.token is None else None
+                self.token = token if self._is_fresh(token) else self._fetch()
+            self.oauth.token = self.token
+            return self.token
+
+    def invalidate(self, token=None):
+        ''' drops the token after the server refused it, unless another thread already replaced it'''
+        with self.lock:
+            if token is None or (self.token and self.token.get('access_token') == token.get('access_token')):
+                self.token = False
+
+    def _fetch(self):
+        if self.verbosity > 2:
+            print(f"trying to get token from url {self.token_url}")
+        token = self.oauth.fetch_token(token_url=self.token_url, client_id=self.client_id,
+                                       client_secret=self.client_secret)
+        if token.get('expires_in') and not token.get('expires_at'):
+            token['expires_at'] = time.time() + float(token['expires_in'])
+        if self.verbosity > 2:
+            print(f"got token {token}")
+        self._save(token)
+        return token
+
+    def _load(self):
+        if not self.cache_file_name or not os.path.exists(self.cache_file_name):
+            return None
+        try:
+            with open(self.cache_file_name) as cache_file:
+                token = json.load(cache_file).get(self.cache_key)
+        except (OSError, ValueError):
+            return None
+        if token and self.verbosity > 1:
+            print(f"INFO: reusing the cached token of {self.cache_key}")
+        return token
+
+    def _save(self, token=None):
+        if not self.cache_file_name:
+            return
+        with self.save_lock:
+            tokens = {}
+            if os.path.exists(self.cache_file_name):
+                try:
+                    with open(self.cache_file_name) as cache_file:
+                        tokens = json.load(cache_file)
+                except (OSError, ValueError):
+                    tokens = {}
+            tokens[self.cache_key] = token
+            # the tokens are credentials - only readable by the owner, and replaced at once for concurrent runs
+            temp_file_name = f"{self.cache_file_name}.{os.getpid()}.tmp"
+            with open(os.open(temp_file_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as cache_file:
+                json.dump(tokens, cache_file)
+            os.replace(temp_file_name, self.cache_file_name)
+
+
+
+class RequestStats:
+    """Collects what the requests of a run cost: counts, latency histograms and bytes per endpoint and model, the
+    hits and misses of the reference caches and the time spent per tree level, so it shows which models and
+    which depth of the trees dominate a sync. shared by all threads, see summary(), to_json() and
+    to_prometheus()"""
+    latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.caches = {}
+        self.levels = {}
+
+    def record_request(self, method='GET', endpoint='', model=None, status_code=None, latency=0.0, bytes_sent=0,
+                       bytes_received=0):
+        key = (method, endpoint.strip('/') or '/', model or '')
+        with self.lock:
+            entry = self.requests.setdefault(key, {'count': 0, 'errors': 0, 'latency_sum': 0.0, 'bytes_sent': 0,
+                                                   'bytes_received': 0,
+                                                   'latency_buckets': [0] * (len(self.latency_buckets) + 1)})
+            entry['count'] += 1
+            entry['errors'] += status_code != 200
+            entry['latency_sum'] += latency
+            entry['bytes_sent'] += bytes_sent
+            entry['bytes_received'] += bytes_received
+            bucket = next((i for i, bound in enumerate(self.latency_buckets) if latency <= bound),
+                          len(self.latency_buckets))
+            entry['latency_buckets'][bucket] += 1
+
+    def record_cache(self, cache_name='', hits=0, misses=0):
+        with self.lock:
+            entry = self.caches.setdefault(cache_name, {'hits': 0, 'misses': 0})
+            entry['hits'] += hits
+            entry['misses'] += misses
+
+    def record_level(self, model='', depth=0, records=0, seconds=0.0):
+        ''' the records read on one level of a tree and the time it took'''
+        with self.lock:
+            entry = self.levels.setdefault((model, depth), {'reads': 0, 'records': 0, 'seconds': 0.0})
+            entry['reads'] += 1
+            entry['records'] += records
+            entry['seconds'] += seconds
+
+    def to_json(self, extra={}):
+        with self.lock:
+            data = {
+                'requests': [dict(method=k[0], endpoint=k[1], model=k[2], **dict(v, latency_buckets=dict(zip(
+                                [str(b) for b in self.latency_buckets] + ['+Inf'], v['latency_buckets']))))
+                             for k, v in sorted(self.requests.items())],
+                'caches': dict(self.caches),
+                'levels': [dict(model=k[0], depth=k[1], **v) for k, v in sorted(self.levels.items())],
+            }
+        data.update(extra)
+        return data
+
+    def to_prometheus(self, extra={}):
+        ''' the stats in the text format of the prometheus node exporter's textfile collector'''
+        lines = []
+
+        def _metric(name, kind, help_text, samples):
+            lines.extend([f"# HELP muk_rest_{name} {help_text}", f"# TYPE muk_rest_{name} {kind}"])
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"muk_rest_{name}{{{label_text}}} {value}" if label_text else f"muk_rest_{name} {value}")
+
+        with self.lock:
+            requests = sorted(self.requests.items())
+            labels = {k: {'method': k[0], 'endpoint': k[1], 'model': k[2]} for k, v in requests}
+            _metric('requests_total', 'counter', "requests sent", [(labels[k], v['count']) for k, v in requests])
+            _metric('request_errors_total', 'counter', "requests not answered with status 200",
+                    [(labels[k], v['errors']) for k, v in requests])
+            _metric('request_bytes_sent_total', 'counter', "bytes of the request bodies",
+                    [(labels[k], v['bytes_sent']) for k, v in requests])
+            _metric('request_bytes_received_total', 'counter', "bytes of the response bodies",
+                    [(labels[k], v['bytes_received']) for k, v in requests])
+            samples = []
+            for k, v in requests:
+                cumulative = 0
+                for bound, count in zip([str(b) for b in self.latency_buckets] + ['+Inf'], v['latency_buckets']):
+                    cumulative += count
+                    samples.append((dict(labels[k], le=bound), cumulative))
+            lines.extend(["# HELP muk_rest_request_seconds latency of the requests",
+                          "# TYPE muk_rest_request_seconds histogram"])
+            for sample_labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in sample_labels.items())
+                lines.append(f"muk_rest_request_seconds_bucket{{{label_text}}} {value}")
+            for k, v in requests:
+                label_text = ','.join(f'{l}="{lv}"' for l, lv in labels[k].items())
+                lines.append(f"muk_rest_request_seconds_sum{{{label_text}}} {v['latency_sum']}")
+                lines.append(f"muk_rest_request_seconds_count{{{label_text}}} {v['count']}")
+            _metric('cache_hits_total', 'counter', "lookups answered by the reference caches",
+                    [({'cache': k}, v['hits']) for k, v in sorted(self.caches.items())])
+            _metric('cache_misses_total', 'counter', "lookups the reference caches couldn't answer",
+                    [({'cache': k}, v['misses']) for k, v in sorted(self.caches.items())])
+            levels = sorted(self.levels.items())
+            _metric('tree_level_records_total', 'counter', "records read per tree level",
+                    [({'model': k[0], 'depth': k[1]}, v['records']) for k, v in levels])
+            _metric('tree_level_seconds_total', 'counter', "time spent reading the tree levels",
+                    [({'model': k[0], 'depth': k[1]}, v['seconds']) for k, v in levels])
+        for name, value in extra.items():
+            _metric(name, 'gauge', name.replace('_', ' '), [({}, value)])
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        ''' a human readable summary of the stats, the most expensive entries first'''
+        with self.lock:
+            requests = sorted(self.requests.items(), key=lambda item: -item[1]['latency_sum'])
+            caches = sorted(self.caches.items())
+            levels = sorted(self.levels.items(), key=lambda item: -item[1]['seconds'])
+        lines = [f"{'requests':<48}{'count':>7}{'errors':>8}{'avg ms':>9}{'total s':>9}{'sent kB':>9}{'recv kB':>9}"]
+        for (method, endpoint, model), v in requests:
+            lines.append(f"{f'{method} {endpoint} {model}':<48}{v['count']:>7}{v['errors']:>8}"
+                         f"{1000 * v['latency_sum'] / v['count']:>9.1f}{v['latency_sum']:>9.2f}"
+                         f"{v['bytes_sent'] / 1024:>9.1f}{v['bytes_received'] / 1024:>9.1f}")
+        if caches:
+            lines.append(f"{'reference caches':<48}{'hits':>7}{'misses':>8}")
+            lines.extend(f"{name:<48}{v['hits']:>7}{v['misses']:>8}" for name, v in caches)
+        if levels:
+            lines.append(f"{'tree levels':<48}{'reads':>7}{'records':>8}{'total s':>9}")
+            lines.extend(f"{f'{model} depth {depth}':<48}{v['reads']:>7}{v['records']:>8}{v['seconds']:>9.2f}"
+                         for (model, depth), v in levels)
+        return '\n'.join(lines)
+
+
+
 class RestAPI:
     """This class got two different ways of authenticate solely to test those different ways with various
     different servers. Just to test the actual payloads requests, that should not be of concern.
-    standard way is to use myapi.authenticate(), alternative way is to use myapi.get_auth()"""
+    standard way is to use myapi.authenticate(), alternative way is to use myapi.get_auth()
+    all requests of all auth types go through one pooled session, so the TCP and TLS connections (and the digest
+    auth's nonce) are kept alive and reused for as long as the object lives"""
     def __init__(self, auth_type=None, headers={}, client_id=None, client_secret=None, username=None, 
-                    password=None, base_url=None, token_url=None, verbosity=0, readonly=False):
+                    password=None, base_url=None, token_url=None, verbosity=0, readonly=False,
+                    pool_connections=1, pool_maxsize=10, pool_block=False, keep_alive=True, retry_policy=None,
+                    rate_limiter=None, token_cache_file_name=None, token_cache_key=None, stats=None,
+                    compress_requests=False, compress_min_size=65536):
         self.base_url = base_url
         self.auth_type = auth_type
         self.client_id = client_id
         self.client_secret = client_secret
         self.username = username
         self.password = password
-        self.access_token = None
         self.headers = headers
         self.auth = None
         self.token_url = token_url
         self.token = None
         self.client = BackendApplicationClient(client_id=self.client_id)
         self.oauth = OAuth2Session(client=self.client)
+        self.session = requests.Session()
+        # one connection pool per host is enough here, but the pool needs to hold as many connections as
+        # requests might be sent concurrently
+        for session in [self.session, self.oauth]:
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                  pool_block=pool_block)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            if not keep_alive:
+                session.headers['Connection'] = 'close'
+            # the responses are decompressed by urllib3, brotli only if it is installed
+            session.headers['Accept-Encoding'] = self.get_accept_encoding()
+        # large request bodies can be sent gzipped, but the server (or its proxy) has to decompress them
+        self.compress_requests = compress_requests
+        self.compress_min_size = compress_min_size
         self.counter = 0
+        self.counter_lock = threading.Lock()
+        # the requests of the current thread, e.g. of the structure a worker exports
+        self.thread_counter = threading.local()
+        # the requests that failed and returned an empty result, in total and per thread
+        self.error_count = 0
+        self.thread_errors = threading.local()
+        self.stats = stats or RequestStats()
         self.verbosity = verbosity
         self.readonly = readonly
+        self.retry_policy = retry_policy or RetryPolicy(verbosity=verbosity)
+        self.rate_limiter = rate_limiter or RateLimiter(verbosity=verbosity)
+        # the token is shared by all threads and, if a cache file is given, by later runs
+        self.token_manager = TokenManager(oauth=self.oauth, token_url=self.route(self.token_url or ''),
+                                          client_id=self.client_id, client_secret=self.client_secret,
+                                          cache_file_name=token_cache_file_name,
+                                          cache_key=token_cache_key or f"{self.client_id}@{self.token_url}",
+                                          verbosity=verbosity)
 
     def get_counter(self):
         return self.counter
 
+    def get_thread_counter(self):
+        return getattr(self.thread_counter, 'count', 0)
+
+    def count_request(self):
+        with self.counter_lock:
+            self.counter += 1
+        self.thread_counter.count = self.get_thread_counter() + 1
+
+    def get_thread_error_count(self):
+        return getattr(self.thread_errors, 'count', 0)
+
+    def count_error(self):
+        ''' counts a request that failed without raising, so the caller can tell an empty result from a failure'''
+        with self.counter_lock:
+            self.error_count += 1
+        self.thread_errors.count = self.get_thread_error_count() + 1
+
+    def add_thread_counts(self, requests=0, errors=0):
+        ''' adds requests and errors counted in another thread, e.g. for a page read in the background, to the
+            counters of the current thread'''
+        self.thread_counter.count = self.get_thread_counter() + requests
+        self.thread_errors.count = self.get_thread_error_count() + errors
+
+    def get_retry_stats(self):
+        return self.retry_policy.get_stats()
+
+    def get_throttle_stats(self):
+        return self.rate_limiter.get_stats()
+
+    @staticmethod
+    def get_accept_encoding():
+        return 'br, gzip, deflate' if brotli else 'gzip, deflate'
+
+    def _encode_body(self, type="GET", data={}):
+        ''' returns the body to send and its additional headers: the form data as is, or gzipped if it is large
+            enough and compressed requests are enabled. a StreamingFormBody is compressed as it is produced'''
+        streamed = isinstance(data, StreamingFormBody)
+        if not self.compress_requests or type not in ("POST", "PUT"):
+            return data, {'Content-Type': 'application/x-www-form-urlencoded'} if streamed else {}
+        body = data if streamed else urlencode(data).encode('utf-8')
+        if len(body) < self.compress_min_size:
+            return data, {'Content-Type': 'application/x-www-form-urlencoded'} if streamed else {}
+        if streamed:
+            # compressed piece by piece, only the (much smaller) result is held in memory
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            compressed_body = b''.join([compressor.compress(chunk) for chunk in body] + [compressor.flush()])
+        else:
+            compressed_body = gzip.compress(body, compresslevel=6)
+        if self.verbosity > 2:
+            print(f"sending the {len(body)} bytes of the request body gzipped in {len(compressed_body)} bytes")
+        return compressed_body, {'Content-Type': 'application/x-www-form-urlencoded', 'Content-Encoding': 'gzip'}
+
+    def close(self):
+        ''' closes the pooled connections of the sessions '''
+        self.session.close()
+        self.oauth.close()
+
     def route(self, url):
         if not url.startswith('http'):
             if not url.startswith('/'):
@@ -58,14 +599,8 @@ class RestAPI:
         elif self.auth_type == 'digest':
             self.auth = HTTPDigestAuth(self.username, self.password)
         elif self.auth_type == 'oauth2':
-            #auth = HTTPOauth2(self.get_access_token())
-            if self.verbosity > 2:
-                print(f"trying to get token from url {self.route(self.token_url)}")
             try:
-                self.token = self.oauth.fetch_token(
-                    token_url=self.route(self.token_url),
-                    client_id=self.client_id, client_secret=self.client_secret
-                )
+                self.token = self.token_manager.get_token()
             except InvalidClientError:
                 # InvalidClientError: probably wrong credentials
                 print("ERROR: got an 'invalid client' error from the server - please check your credentials")
@@ -75,8 +610,6 @@ class RestAPI:
                 return False
             except Exception as e:
                 raise e # re-raise all other exceptions
-            if self.verbosity > 2:
-                print(f"got token {self.token}")
         return True
 
 
@@ -88,116 +621,136 @@ class RestAPI:
         elif self.auth_type == 'digest':
             auth = HTTPDigestAuth(self.username, self.password)
         elif self.auth_type == 'oauth2':
-            auth = HTTPOauth2(self._get_access_token())
+            # the token is taken from the token manager for every request, so it's refreshed and cached the same
+            # way as the one of the oauth session
+            def auth(request):
+                request.headers['Authorization'] = f"Bearer {self.token_manager.get_token().get('access_token')}"
+                return request
         return auth
 
 
-    def _get_access_token(self):
-        """ Check if access token need to be (re)generated.
-        We add a security time shift to assure the token does not expire within the
-        time until the request will be sent.
-        """
-        if not self.access_token or \
-                    self.token_expiration_date - timedelta(seconds=10) <= fields.Datetime.now():
-            if self.verbosity > 2:
-                print('request new token')
-            self._generate_rest_token()
-
-        return self.access_token
-
-
-    def _generate_rest_token(self):
-        """Generate Rest Token"""
-        if self.auth_type == 'oauth2':
-            if not (self.base_url and self.token_url and self.client_id and self.client_secret):
-                raise Exception('Missing login parameter(s).')
-
-            payload = {
-                "grant_type": "client_credentials",
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-                "scope": "data/all"
-            }
-            headers = {
-                "Content-Type": "application/x-www-form-urlencoded",
-                "accept": "application/json",
-            }
-
-            resp = requests.post(self.token_url, data=payload, headers=headers)
-
-            if resp.status_code == 200:
-                response = resp.json()
-                self.access_token = response.get('access_token')
-            else:
-                raise Exception('Attempt to retrieve token failed.')
-
-
-    def _exec_oauth(self, endpoint, type="GET", data={}):
+    def _exec_oauth(self, endpoint, type="GET", data={}, headers={}):
         if self.verbosity > 2:
             print(f"query: {type} {self.route(endpoint)}")
-        re_auth = False
-        try:
-            if type == "GET":
-                response = self.oauth.get(self.route(endpoint), data=data)
-            elif type == "POST" and not self.readonly:
-                response = self.oauth.post(self.route(endpoint), data=data)
-            elif type == "PUT" and not self.readonly:
-                response = self.oauth.put(self.route(endpoint), data=data)
-            elif type == "DELETE" and not self.readonly:
-                response = self.oauth.delete(self.route(endpoint), data=data)
-            else:
-                print(f"INFO: not sending {type} requests to {self.route(endpoint)} in read-only mode!")
-                response = None
-        except TokenExpiredError: 
-            # if the token expired, try to re-auth
-            if self.verbosity > 0:
-                print("INFO: token expired, try to re-auth and re-submit request")
-            self.authenticate()
-            self._exec_oauth(endpoint=endpoint, type=type, data=data)
-        except requests.exceptions.ConnectionError:
-            print("ERROR: connection error - please check the (host) url")
-            return False
-        except Exception as e:
-            raise e # re-raise all other exceptions
+        for attempt in range(2):
+            token = self.token_manager.get_token()
+            try:
+                if type == "GET":
+                    response = self.oauth.get(self.route(endpoint), data=data, headers=headers)
+                elif type == "POST" and not self.readonly:
+                    response = self.oauth.post(self.route(endpoint), data=data, headers=headers)
+                elif type == "PUT" and not self.readonly:
+                    response = self.oauth.put(self.route(endpoint), data=data, headers=headers)
+                elif type == "DELETE" and not self.readonly:
+                    response = self.oauth.delete(self.route(endpoint), data=data, headers=headers)
+                else:
+                    print(f"INFO: not sending {type} requests to {self.route(endpoint)} in read-only mode!")
+                    return None
+            except TokenExpiredError:
+                if attempt:
+                    raise
+                # if the token expired anyway, re-auth and re-submit the request
+                if self.verbosity > 0:
+                    print("INFO: token expired, try to re-auth and re-submit request")
+                self.token_manager.invalidate(token)
+                continue
+            if response.status_code == 401 and not attempt:
+                # the server doesn't accept the token (anymore), e.g. a cached one that has been revoked
+                if self.verbosity > 0:
+                    print("INFO: token refused, try to re-auth and re-submit request")
+                self.token_manager.invalidate(token)
+                continue
+            return response
         return response
 
 
-    def _exec_other(self, endpoint, type="GET", data={}, json_data={}):
+    def _exec_other(self, endpoint, type="GET", data={}, json_data={}, headers={}):
         if self.verbosity > 2:
             print(f"query: {self.route(endpoint)}")
+        headers = dict(self.headers, **headers)
         if type == "GET":
-            response = requests.get(self.route(endpoint), data=data, headers=self.headers, auth=self.auth)
+            response = self.session.get(self.route(endpoint), data=data, headers=headers, auth=self.auth)
         elif type == "POST" and not self.readonly:
-            response = requests.post(self.route(endpoint), data=data, headers=self.headers, auth=self.auth)
+            response = self.session.post(self.route(endpoint), data=data, headers=headers, auth=self.auth)
         elif type == "PUT" and not self.readonly:
-            response = requests.put(self.route(endpoint), data=data, headers=self.headers, auth=self.auth)
+            response = self.session.put(self.route(endpoint), data=data, headers=headers, auth=self.auth)
         elif type == "DELETE" and not self.readonly:
-            response = requests.delete(self.route(endpoint), data=data, headers=self.headers, auth=self.auth)
+            response = self.session.delete(self.route(endpoint), data=data, headers=headers, auth=self.auth)
         else:
                 print(f"INFO: not sending {type} requests to {self.route(endpoint)} in read-only mode!")
                 response = None
         return response
 
 
-    def execute(self, endpoint, type="GET", data={}, json_data={}):
-        self.counter += 1
+    def execute(self, endpoint, type="GET", data={}, json_data={}, idempotent=None, retry_check=None):
+        ''' sends the request and retries it according to the retry policy. only GETs are taken as idempotent
+            by default; other requests may pass idempotent=True if sending them twice does no harm, or a
+            retry_check that is called before each retry and returns the result of the request if it turns out
+            it has been processed after all (so it must not be sent again) or something falsy otherwise'''
+        self.count_request()
         if self.verbosity > 2:
             print(f"Payload for the {type} request to {endpoint}:")
-            print(json.dumps(data, indent=2))
-        if self.auth_type == "oauth2":
-            response = self._exec_oauth(self.route(endpoint), type=type, data=data)
-        else:
-            response = self._exec_other(self.route(endpoint), type=type, data=data, json_data=json_data)
+            if isinstance(data, StreamingFormBody):
+                print(json.dumps(dict(data.fields, **{k: '<streamed>' for k in data.streams}), indent=2))
+            else:
+                print(json.dumps(data, indent=2))
+        if idempotent is None:
+            idempotent = type == "GET"
+        body, headers = self._encode_body(type=type, data=data)
+        attempt = 0
+        while True:
+            response, error = None, None
+            self.rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                if self.auth_type == "oauth2":
+                    response = self._exec_oauth(self.route(endpoint), type=type, data=body, headers=headers)
+                else:
+                    response = self._exec_other(self.route(endpoint), type=type, data=body, json_data=json_data,
+                                                headers=headers)
+            except requests.exceptions.ConnectionError as e:
+                error = e
+            finally:
+                latency = time.monotonic() - started
+                self.rate_limiter.release(latency=latency, status_code=getattr(response, 'status_code', None))
+            if response is not None or error is not None:
+                # the body is sent again on a retry, so what was sent is kept apart from it
+                sent = response.request.body if response is not None else None
+                self.stats.record_request(method=type, endpoint=endpoint, model=data.get('model'),
+                                          status_code=getattr(response, 'status_code', None), latency=latency,
+                                          bytes_sent=len(sent or ''),
+                                          bytes_received=len(response.content) if response is not None else 0)
+            delay = self.retry_policy.get_retry_delay(attempt=attempt, idempotent=idempotent or bool(retry_check),
+                                status_code=getattr(response, 'status_code', None), error=error,
+                                retry_after=response.headers.get('Retry-After') if response is not None else None)
+            if delay is None:
+                break
+            if retry_check:
+                result = retry_check()
+                if result:
+                    if self.verbosity > 0:
+                        print(f"INFO: the {type} request to {endpoint} has been processed, not sending it again")
+                    return result
+            time.sleep(delay)
+            attempt += 1
+        if error is not None:
+            raise RestAPIError(f"ERROR: connection error sending the {type} request to {self.route(endpoint)} - "
+                               f"please check the (host) url: {error}")
+        if response is not None and response.status_code in self.retry_policy.retry_statuses:
+            raise RestAPIError(f"ERROR: the {type} request to {self.route(endpoint)} failed with status "
+                               f"{response.status_code} ({response.reason}) after {attempt + 1} attempt(s)")
         status_code = None
         try:
             status_code = response.status_code
         except:
             # something went wrong
             print("ERROR: something went wrong sending the request")
+            self.count_error()
             if self.verbosity > 2:
                 pprint(inspect.getmembers(response))
             return []
         if status_code != 200:
+            self.count_error()
             if self.verbosity > 0:
                 print('Status Code: {}'.format(response.status_code))
                 print('Reason: {}'.format(response.reason))
@@ -220,17 +773,644 @@ class RestAPI:
 
 
 
+    def _read_page(self, data={}):
+        ''' sends the search_read of one page, returns its records and the requests and errors it took'''
+        requests_before, errors_before = self.get_thread_counter(), self.get_thread_error_count()
+        records = self.execute('search_read', type="GET", data=data) or []
+        return records, self.get_thread_counter() - requests_before, self.get_thread_error_count() - errors_before
+
+
+    def iter_search_read_pages(self, get_page_data=None, prefetch=True):
+        ''' yields the records of a search_read that is sent page by page: get_page_data returns the data of the
+            request for the next page given the records of the previous one (None for the first page), or None
+            if there are no more pages. with prefetch the next page is already read in a background thread
+            while the records of the current one are processed, the requests count for the current thread'''
+        data = get_page_data(None)
+        if not prefetch:
+            while data is not None:
+                records = self.execute('search_read', type="GET", data=data) or []
+                yield from records
+                data = get_page_data(records)
+            return
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self._read_page, data) if data is not None else None
+            while future:
+                records, requests, errors = future.result()
+                self.add_thread_counts(requests=requests, errors=errors)
+                data = get_page_data(records)
+                future = executor.submit(self._read_page, data) if data is not None else None
+                yield from records
+
+
+    def iter_search_read(self, model='', domain=[], fields=[], page_size=1000, prefetch=True):
+        ''' yields all the records of the model matching the domain in the order of their ids, read page by page:
+            each page continues after the last id of the previous one - unlike an offset that doesn't skip or
+            repeat records if some are created or deleted meanwhile'''
+        def _get_page_data(records):
+            if records is not None and len(records) < page_size:
+                return None
+            return {
+                'model': model,
+                'domain': json.dumps(domain + [['id', '>', records[-1].get('id') if records else 0]]),
+                'fields': json.dumps(fields),
+                'order': 'id',
+                'limit': page_size,
+            }
+        return self.iter_search_read_pages(get_page_data=_get_page_data, prefetch=prefetch)
+
+
+
+class AsyncRestAPI:
+    """asyncio counterpart of RestAPI with the same execute(endpoint, type, data) contract. the requests are
+    pipelined over one aiohttp session, with at most max_concurrency of them in flight at any time.
+    authentication is left to the (already authenticated) RestAPI it is created from, which also keeps counting
+    the requests. use it as an async context manager, so the session is closed in the event loop it belongs to"""
+    def __init__(self, api=None, max_concurrency=8):
+        if aiohttp is None:
+            raise Exception("ERROR: async requests need the aiohttp package - please install it or don't use "
+                            "async requests")
+        if api.auth_type == 'digest':
+            raise Exception("ERROR: async requests don't support digest authentication")
+        self.api = api
+        self.verbosity = api.verbosity
+        self.readonly = api.readonly
+        self.max_concurrency = max_concurrency
+        self.semaphore = None
+        self.session = None
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.session = aiohttp.ClientSession(headers=dict(self.api.headers,
+                                                          **{'Accept-Encoding': self.api.get_accept_encoding()}),
+                                             connector=aiohttp.TCPConnector(limit=self.max_concurrency))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+
+    async def _get_auth(self):
+        ''' returns the aiohttp auth and the additional headers to authenticate the request with. a new token
+            is fetched in a worker thread, so the other requests in flight don't wait for it'''
+        if self.api.auth_type == 'basic':
+            return aiohttp.BasicAuth(self.api.username, self.api.password), {}
+        elif self.api.auth_type == 'oauth2':
+            token = self.api.token_manager.get_fresh_token() or \
+                    await asyncio.to_thread(self.api.token_manager.get_token)
+            return None, {'Authorization': f"Bearer {token.get('access_token')}"}
+        return None, {}
+
+
+    async def execute(self, endpoint, type="GET", data={}):
+        if type != "GET" and self.readonly:
+            print(f"INFO: not sending {type} requests to {self.api.route(endpoint)} in read-only mode!")
+            return []
+        self.api.count_request()
+        if self.verbosity > 2:
+            print(f"Payload for the {type} request to {endpoint}:")
+            print(json.dumps(data, indent=2))
+            print(f"query: {type} {self.api.route(endpoint)}")
+        # aiohttp only form-encodes strings
+        data = {k: v if isinstance(v, str) else json.dumps(v) for k, v in data.items()}
+        attempt, re_auth = 0, False
+        async with self.semaphore:
+            while True:
+                auth, headers = await self._get_auth()
+                token = self.api.token_manager.token
+                status_code, retry_after, error = None, None, None
+                await self.api.rate_limiter.acquire_async()
+                started = time.monotonic()
+                try:
+                    async with self.session.request(type, self.api.route(endpoint), data=data, auth=auth,
+                                                    headers=headers) as response:
+                        status_code, reason, content = response.status, response.reason, await response.read()
+                        retry_after = response.headers.get('Retry-After')
+                except aiohttp.ClientConnectionError as e:
+                    error = e
+                finally:
+                    latency = time.monotonic() - started
+                    self.api.rate_limiter.release(latency=latency, status_code=status_code)
+                self.api.stats.record_request(method=type, endpoint=endpoint, model=data.get('model'),
+                                              status_code=status_code, latency=latency,
+                                              bytes_sent=len(urlencode(data)),
+                                              bytes_received=len(content) if error is None else 0)
+                if status_code == 401 and self.api.auth_type == 'oauth2' and not re_auth:
+                    # the token probably expired, try to re-auth and re-submit the request
+                    if self.verbosity > 0:
+                        print("INFO: token expired, try to re-auth and re-submit request")
+                    self.api.token_manager.invalidate(token)
+                    re_auth = True
+                    continue
+                delay = self.api.retry_policy.get_retry_delay(attempt=attempt, idempotent=type == "GET",
+                                        status_code=status_code, retry_after=retry_after, error=error)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+                attempt += 1
+        if error is not None:
+            raise RestAPIError(f"ERROR: connection error sending the {type} request to {self.api.route(endpoint)} "
+                               f"- please check the (host) url: {error}")
+        if status_code in self.api.retry_policy.retry_statuses:
+            raise RestAPIError(f"ERROR: the {type} request to {self.api.route(endpoint)} failed with status "
+                               f"{status_code} ({reason}) after {attempt + 1} attempt(s)")
+        if status_code != 200:
+            self.api.count_error()
+            if self.verbosity > 0:
+                print('Status Code: {}'.format(status_code))
+                print('Reason: {}'.format(reason))
+                if self.verbosity > 1:
+                    print('Content:')
+                    pprint(content)
+            return []
+        result = json.loads(content)
+        if self.verbosity > 1:
+            print(f"Response for the {type} request to {endpoint}:")
+            print(json.dumps(result, indent=2))
+        return result
+
+
+
+class ThreadOutput:
+    """Stands in for sys.stdout while tasks run in worker threads and collects everything each task prints,
+    so the output of tasks running in parallel can be printed in a deterministic order without interleaving.
+    output of threads not running a task goes straight through to the original stream"""
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.local = threading.local()
+
+    def __enter__(self):
+        sys.stdout = self
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.stdout = self.stream
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def run(self, func, *args, **kwargs):
+        ''' runs the function collecting its output and returns the output along with the function's result
+            and the exception raised (if any), which is left to the caller to deal with '''
+        self.local.buffer = io.StringIO()
+        result, error = None, None
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            error = e
+        output = self.local.buffer.getvalue()
+        self.local.buffer = None
+        return output, result, error
+
+
+
+class ReferenceCacheStore:
+    """Keeps the reference caches of DataStructureSync in a SQLite database between runs. the entries are stored
+    per connection and Odoo server version, as the ids of models, fields and languages only are valid for one
+    instance, and they expire after ttl seconds"""
+    def __init__(self, cache_dir=None, connection=None, server_version=None, ttl=86400, verbosity=0):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.file_name = os.path.join(cache_dir, 'reference_cache.sqlite3')
+        self.connection = connection
+        self.server_version = server_version or ''
+        self.ttl = ttl
+        self.verbosity = verbosity
+        self.db = sqlite3.connect(self.file_name)
+        self.db.execute("CREATE TABLE IF NOT EXISTS reference_cache (connection TEXT, server_version TEXT, "
+                        "cache TEXT, key TEXT, value TEXT, stored_at REAL, "
+                        "PRIMARY KEY (connection, server_version, cache, key))")
+        self.db.execute("DELETE FROM reference_cache WHERE stored_at < ?", (time.time() - self.ttl,))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def clear(self):
+        ''' drops all entries of the connection, e.g. to refresh the cache'''
+        self.db.execute("DELETE FROM reference_cache WHERE connection = ?", (self.connection,))
+        self.db.commit()
+
+    def load(self, cache_name=''):
+        ''' returns a dict of all the entries stored for the cache. the keys keep their type (json encoded)
+            as the same cache holds ids when exporting and names when importing'''
+        rows = self.db.execute("SELECT key, value FROM reference_cache WHERE connection = ? AND "
+                               "server_version = ? AND cache = ?", (self.connection, self.server_version,
+                               cache_name)).fetchall()
+        if self.verbosity > 2:
+            print(f"loaded {len(rows)} entries of {cache_name} from {self.file_name}")
+        return {json.loads(key): json.loads(value) for key, value in rows}
+
+    def save(self, cache_name='', cache={}):
+        ''' stores the entries of the cache not stored yet - entries that were already stored keep their age,
+            so they still expire in time. lookups that didn't find anything are not stored'''
+        now = time.time()
+        rows = [(self.connection, self.server_version, cache_name, json.dumps(key), json.dumps(value), now)
+                for key, value in cache.items()
+                if value and not (isinstance(value, dict) and not value.get('id'))]
+        self.db.executemany("INSERT OR IGNORE INTO reference_cache VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.db.commit()
+        if self.verbosity > 2:
+            print(f"saved {len(rows)} entries of {cache_name} to {self.file_name}")
+
+
+
+class CheckpointJournal:
+    """An append-only journal of the progress of an export or import, one json object per line, so a run that
+    has stopped midway can be resumed where it stopped (see DataStructureSync.open_journal). every entry is
+    flushed to disk as it is recorded, a last line cut off by a crash is ignored when the journal is read"""
+    def __init__(self, file_name='checkpoint_journal.jsonl', resume=False, verbosity=0):
+        self.file_name = file_name
+        self.verbosity = verbosity
+        self.lock = threading.Lock()
+        self.resume = resume
+        self.entries = self._load() if resume else []
+        # the file is only written once there is something to record
+        self.file = None
+
+    def _load(self):
+        ''' returns the entries of the journal. a last line cut off by a crash is cut from the file too (or
+            just ended if the entry is complete), so the entries recorded while resuming start on a new line'''
+        entries = []
+        if not os.path.exists(self.file_name):
+            return entries
+        complete_size, ended = 0, True
+        with open(self.file_name, 'rb') as journal_file:
+            for line in journal_file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    print(f"WARNING: skipping an incomplete entry of the journal {self.file_name}")
+                    if not line.endswith(b'\n'):
+                        break
+                complete_size += len(line)
+                ended = line.endswith(b'\n')
+        if complete_size < os.path.getsize(self.file_name):
+            with open(self.file_name, 'r+b') as journal_file:
+                journal_file.truncate(complete_size)
+        elif not ended:
+            with open(self.file_name, 'ab') as journal_file:
+                journal_file.write(b'\n')
+        if self.verbosity > 0:
+            print(f"INFO: resuming from the {len(entries)} entries of the journal {self.file_name}")
+        return entries
+
+    def record(self, **entry):
+        entry['recorded_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock:
+            if not self.file:
+                self.file = open(self.file_name, 'a' if self.resume else 'w')
+            self.entries.append(entry)
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def find(self, **match):
+        ''' returns the entries with the given values'''
+        with self.lock:
+            return [e for e in self.entries if all(e.get(k) == v for k, v in match.items())]
+
+    def close(self, remove=False):
+        if self.file:
+            self.file.close()
+        if remove and os.path.exists(self.file_name):
+            os.remove(self.file_name)
+
+
+
+class RecordSpool:
+    """Keeps records in a temporary file instead of memory, only their offsets stay in memory. used to write
+    exports of huge structures, whose records arrive level by level but are written depth-first"""
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.offsets = {}
+
+    def __contains__(self, rec_id):
+        return rec_id in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def add(self, rec_id=0, record={}):
+        self.file.seek(0, os.SEEK_END)
+        self.offsets[rec_id] = self.file.tell()
+        self.file.write(json.dumps(record).encode('utf-8') + b'\n')
+
+    def get(self, rec_id=0):
+        self.file.seek(self.offsets[rec_id])
+        return json.loads(self.file.readline())
+
+    def close(self):
+        self.file.close()
+
+
+
+class StreamingJSONWriter:
+    """Writes a json object entry by entry to a file, nested objects can be opened and closed as entries are
+    coming in. the result is the same json.dump(..., indent=indent) writes for the whole object at once, or its
+    most compact form without indent"""
+    def __init__(self, stream=None, indent=2):
+        self.stream = stream
+        self.indent = indent
+        # the number of entries written per open object
+        self.entries = []
+
+    def _write_key(self, key=None):
+        if self.entries and self.entries[-1]:
+            self.stream.write(',')
+        if self.indent is not None:
+            self.stream.write('\n' + ' ' * self.indent * len(self.entries))
+        if self.entries:
+            self.stream.write(json.dumps(key if isinstance(key, str) else str(key)) +
+                              (': ' if self.indent is not None else ':'))
+            self.entries[-1] += 1
+
+    def begin(self, key=None):
+        ''' opens an object, nested into the current one under key, if any is open'''
+        if self.entries:
+            self._write_key(key)
+        self.stream.write('{')
+        self.entries.append(0)
+
+    def write(self, key=None, value=None):
+        self._write_key(key)
+        if self.indent is None:
+            self.stream.write(json.dumps(value, separators=(',', ':')))
+        else:
+            self.stream.write(json.dumps(value, indent=self.indent).replace(
+                                '\n', '\n' + ' ' * self.indent * len(self.entries)))
+
+    def end(self):
+        if self.entries.pop() and self.indent is not None:
+            self.stream.write('\n' + ' ' * self.indent * len(self.entries))
+        self.stream.write('}')
+
+
+
+class LazyRecords(Mapping):
+    """The records of one section of a data file (e.g. the generator_structures), each kept as its json text and
+    only decoded when it is accessed - so a loaded file doesn't take more memory than its size. accessing a record
+    returns a new copy every time, changing it doesn't change the stored record"""
+    def __init__(self):
+        self.texts = {}
+
+    def __getitem__(self, key):
+        return json.loads(self.texts[key])
+
+    def __contains__(self, key):
+        return key in self.texts
+
+    def __iter__(self):
+        return iter(self.texts)
+
+    def __len__(self):
+        return len(self.texts)
+
+
+
+class DataFileScanner:
+    """Reads a data file piece by piece: the values of the top level keys are decoded, except the records of the
+    sections given, which are only indexed by their id as LazyRecords. see load()"""
+    def __init__(self, stream=None, lazy_keys=[], chunk_size=1048576):
+        self.stream = stream
+        self.lazy_keys = lazy_keys
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        ''' reads the next chunk of the file, returns False at its end'''
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # drop what has been consumed already
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _next_char(self):
+        ''' skips the whitespace and returns the next character without consuming it'''
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def _expect(self, chars=''):
+        char = self._next_char()
+        if not char or char not in chars:
+            raise Exception(f"ERROR: invalid data file, expected one of '{chars}' but found '{char}'")
+        self.pos += 1
+        return char
+
+    def _decode(self):
+        ''' decodes the next value, returns it along with its json text'''
+        self._next_char()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a number at the end of the buffer might go on in the next chunk
+                if end < len(self.buffer) or self.eof or not isinstance(value, (int, float)):
+                    break
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+        text, self.pos = self.buffer[self.pos:end], end
+        return value, text
+
+    def _iter_object(self):
+        ''' yields the keys of the object at the current position, the caller has to consume their values'''
+        self._expect('{')
+        if self._next_char() == '}':
+            self.pos += 1
+            return
+        while True:
+            key, text = self._decode()
+            self._expect(':')
+            yield key
+            if self._expect(',}') == '}':
+                return
+
+    def load(self):
+        data = {}
+        for key in self._iter_object():
+            if key in self.lazy_keys and self._next_char() == '{':
+                records = LazyRecords()
+                for rec_id in self._iter_object():
+                    value, records.texts[rec_id] = self._decode()
+                data[key] = records
+            else:
+                data[key], text = self._decode()
+        return data
+
+
+
+class StreamingFormBody:
+    """A form encoded request body whose values are produced piece by piece while it is sent, e.g. a huge create
+    payload that doesn't need to be held in memory as a whole. the small fields are given as they are, the large
+    ones as functions returning an iterable of its text. the body is produced twice: once to find its length, so
+    it is sent with a Content-Length instead of chunked, and once to send it (or more often on retries)"""
+    def __init__(self, fields={}, streams={}, block_size=65536):
+        self.fields = fields
+        self.streams = streams
+        self.block_size = block_size
+        self.length = None
+
+    def get(self, key=None, default=None):
+        return self.fields.get(key, default)
+
+    def _iter_chunks(self):
+        for i, (key, value) in enumerate(itertools.chain(self.fields.items(), self.streams.items())):
+            yield ('&' if i else '') + quote_plus(str(key)) + '='
+            if key in self.streams:
+                for chunk in value():
+                    yield quote_plus(chunk)
+            else:
+                yield quote_plus(str(value))
+
+    def __iter__(self):
+        block, size = [], 0
+        for chunk in self._iter_chunks():
+            block.append(chunk)
+            size += len(chunk)
+            if size >= self.block_size:
+                yield ''.join(block).encode('ascii')
+                block, size = [], 0
+        if block:
+            yield ''.join(block).encode('ascii')
+
+    def __len__(self):
+        if self.length is None:
+            # quoted, everything is ascii
+            self.length = sum(len(chunk) for chunk in self._iter_chunks())
+        return self.length
+
+
+
+class ColumnarDataFile:
+    """Compact alternative to the exported json, used for data files ending in .dsc, .dsc.gz or .dsc.zst.
+    the records of each kind are grouped by the fields they have and stored column by column, and every
+    distinct value - like the value types or the resolved names such as model_id.model that repeat on many
+    records - is stored only once in a table the columns refer to by index. the whole is compressed with gzip
+    or zstd depending on the extension. loading it returns the same data as loading the exported json"""
+    extensions = {'.dsc.zst': 'zstd', '.dsc.gz': 'gzip', '.dsc': None}
+    record_kinds = ['generator_structures', 'language_mappings', 'parser_structures']
+    format_name = 'data-structure-columnar'
+    format_version = 1
+
+    def __init__(self, file_name=''):
+        self.file_name = file_name
+        self.compression = next(c for e, c in self.extensions.items() if file_name.lower().endswith(e))
+        if self.compression == 'zstd' and not zstandard:
+            raise Exception(f"ERROR: the python package zstandard is needed for the file {file_name}, install it "
+                            "or use a .dsc.gz file instead")
+
+    @classmethod
+    def is_columnar(cls, file_name=''):
+        return bool(file_name) and file_name.lower().endswith(tuple(cls.extensions))
+
+    def _compress(self, content=b''):
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(content)
+        if self.compression == 'gzip':
+            return gzip.compress(content, compresslevel=9, mtime=0)
+        return content
+
+    def _decompress(self, content=b''):
+        if self.compression == 'zstd':
+            return zstandard.ZstdDecompressor().decompress(content)
+        if self.compression == 'gzip':
+            return gzip.decompress(content)
+        return content
+
+    def dumps(self, data_structure={}):
+        ''' returns the content of the file for the data structure as bytes'''
+        values, value_index = [], {}
+
+        def _intern(value):
+            # lists (like the m2o [id, name] pairs) can't be hashed, True == 1 must not be merged
+            key = (type(value), json.dumps(value) if isinstance(value, (list, dict)) else value)
+            if key not in value_index:
+                value_index[key] = len(values)
+                values.append(value)
+            return value_index[key]
+
+        document = {'format': self.format_name, 'version': self.format_version, 'values': values,
+                    'header': {k: v for k, v in data_structure.items()
+                               if k not in self.record_kinds and k != 'data_structure'}}
+        if 'data_structure' in data_structure:
+            document['data_structure'] = data_structure['data_structure']
+        for kind in self.record_kinds:
+            records = data_structure.get(kind) or {}
+            groups, group_index, order = [], {}, []
+            for rec_id, record in records.items():
+                fields = tuple(record)
+                if fields not in group_index:
+                    group_index[fields] = len(groups)
+                    groups.append({'fields': list(fields), 'ids': [], 'columns': [[] for f in fields]})
+                group = groups[group_index[fields]]
+                group['ids'].append(str(rec_id))
+                for column, value in zip(group['columns'], record.values()):
+                    column.append(_intern(value))
+                order.append(group_index[fields])
+            document[kind] = {'order': order, 'groups': groups}
+        return self._compress(json.dumps(document, separators=(',', ':')).encode('utf-8'))
+
+    def dump(self, data_structure={}):
+        with open(self.file_name, 'wb') as data_file:
+            data_file.write(self.dumps(data_structure))
+
+    def loads(self, content=b''):
+        ''' returns the data structure stored in the content of a file. equal values are the same objects in
+            all the records having them, so lists like the m2o pairs are not to be changed in place'''
+        document = json.loads(self._decompress(content))
+        if document.get('format') != self.format_name or document.get('version') != self.format_version:
+            raise Exception(f"ERROR: {self.file_name} is not a data structure file of a known format")
+        values = document['values']
+        data_structure = dict(document['header'])
+        if 'data_structure' not in document:
+            return data_structure
+        data_structure['data_structure'] = document['data_structure']
+        for kind in self.record_kinds:
+            # rows are turned into records group by group, then put back into the original order
+            rows = []
+            for group in document[kind]['groups']:
+                fields = group['fields']
+                rows.append(iter(zip(group['ids'], [dict(zip(fields, map(values.__getitem__, row)))
+                                                    for row in zip(*group['columns'])])))
+            data_structure[kind] = dict(next(rows[group]) for group in document[kind]['order'])
+        return data_structure
+
+    def load(self):
+        with open(self.file_name, 'rb') as data_file:
+            return self.loads(data_file.read())
+
+
+
 class DataStructureSync:
     """This class can read a data structure including recursingly the generate or parse structures from Odoo 
     and save it as a json file or read a json file and create a new data structure including recusrively
     their generator and parser structures"""
-    def __init__(self, verbosity=0, readonly=False, cred_file_name="default_credentials.json"):
+    def __init__(self, verbosity=0, readonly=False, cred_file_name="default_credentials.json", cache_dir=None,
+                 cache_ttl=86400, refresh_cache=False):
         # object data
         self.odoo_api = None # this will hold the connection to Odoo after the api init
         self.cred_file_name = cred_file_name
         self.data_file_name = "{}.json"
         self.verbosity = verbosity
         self.readonly = readonly
+        # optional on-disk store of the reference caches, shared across runs
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.refresh_cache = refresh_cache
+        self.cache_store = None
 
         # default values to work with (or export as scafforld)
         self.connection = 'example_connection'
@@ -241,10 +1421,40 @@ class DataStructureSync:
         self.client_id = "insert client id/key here"
         self.client_secret = "insert client secret here"
         self.token_url = 'https://odoo.example.com/api/v2/authentication/oauth2/token'
+        self.username = None
+        self.password = None
+        self.pool_maxsize = 10
+        self.keep_alive = True
+        # retries of failed requests, see RetryPolicy
+        self.max_retries = 5
+        self.retry_budget = 100
+        self.retry_backoff = 0.5
+        self.retry_backoff_max = 30.0
+        # throttling of the requests, see RateLimiter - unlimited by default
+        self.rate_limit = 0.0
+        self.rate_burst = 1
+        self.max_in_flight = 0
+        self.adaptive_concurrency = False
+        self.target_latency = None
+        # gzip large create and write requests, the server has to support gzipped request bodies
+        self.compress_requests = False
+        self.compress_min_size = 65536
+        # concurrency of the async requests and the number of ids read per request of a tree level
+        self.max_concurrency = 8
+        self.async_chunk_size = 200
+        # the number of records read per request when streaming an export, which bounds its memory use
+        self.stream_chunk_size = 1000
+        # the number of records per page when reading all records of a model, e.g. for a snapshot
+        self.page_size = 1000
+        # the max number of records sent per request when creating a structure, 0 sends it with one create
+        self.create_chunk_size = 0
         self.odoo_api_version = ""
         self.odoo_server_serie= 0.0
         self.odoo_server_Version= "0.0+c"
         self.odoo_api_version_info = {}
+        # the api and user info of the connection, read once in init_api and stored with every export
+        self.odoo_api_info = {}
+        self.odoo_user_info = {}
 
         # format defaults
         self.dt_format_odoo = '%Y-%m-%d %H:%M:%S'
@@ -259,6 +1469,15 @@ class DataStructureSync:
         self.ir_model_cache = {}
         self.ir_model_fields_cache = {}
         self.res_lang_cache = {}
+        self.cache_names = ['data_structure_cache', 'ir_model_cache', 'ir_model_fields_cache', 'res_lang_cache']
+        # the caches are shared by all worker threads when exporting structures in parallel
+        self.cache_lock = threading.RLock()
+        # instrumentation of the requests and the caches, see RequestStats
+        self.stats = RequestStats()
+        # the sessions for other connections recording to the same stats, see get_session
+        self.sessions = []
+        # the progress of exports and imports for resuming them, see open_journal
+        self.journal = None
 
         # lists of fields to be processed
         # data.structure fields
@@ -455,6 +1674,7 @@ class DataStructureSync:
             if not credentials:
                 raise Exception("ERROR: could not load credentials file data. aborting.")
         if connection in credentials:
+            self.connection = connection
             # use connection parameters from credentials file if they exist and sanitize them
             if 'host_url' in credentials[connection]:
                 self.host_url = credentials[connection]['host_url']
@@ -481,6 +1701,48 @@ class DataStructureSync:
                     print(f"using client_id {self.client_id}")
             if 'client_secret' in credentials[connection]:
                 self.client_secret = credentials[connection]['client_secret']
+            if 'auth_type' in credentials[connection]:
+                self.auth_type = credentials[connection]['auth_type']
+                if self.verbosity > 2:
+                    print(f"using auth type {self.auth_type}")
+            if 'username' in credentials[connection]:
+                self.username = credentials[connection]['username']
+            if 'password' in credentials[connection]:
+                self.password = credentials[connection]['password']
+            # optional settings for the connection pool of the api's session
+            if 'pool_maxsize' in credentials[connection]:
+                self.pool_maxsize = int(credentials[connection]['pool_maxsize'])
+            if 'keep_alive' in credentials[connection]:
+                self.keep_alive = bool(credentials[connection]['keep_alive'])
+            # optional settings for retrying failed requests
+            if 'max_retries' in credentials[connection]:
+                self.max_retries = int(credentials[connection]['max_retries'])
+            if 'retry_budget' in credentials[connection]:
+                self.retry_budget = int(credentials[connection]['retry_budget'])
+            if 'retry_backoff' in credentials[connection]:
+                self.retry_backoff = float(credentials[connection]['retry_backoff'])
+            if 'retry_backoff_max' in credentials[connection]:
+                self.retry_backoff_max = float(credentials[connection]['retry_backoff_max'])
+            # optional throttling of the requests sent to the connection
+            if 'rate_limit' in credentials[connection]:
+                self.rate_limit = float(credentials[connection]['rate_limit'])
+            if 'rate_burst' in credentials[connection]:
+                self.rate_burst = int(credentials[connection]['rate_burst'])
+            if 'max_in_flight' in credentials[connection]:
+                self.max_in_flight = int(credentials[connection]['max_in_flight'])
+            if 'adaptive_concurrency' in credentials[connection]:
+                self.adaptive_concurrency = bool(credentials[connection]['adaptive_concurrency'])
+            if 'target_latency' in credentials[connection]:
+                self.target_latency = float(credentials[connection]['target_latency'])
+            if 'compress_requests' in credentials[connection]:
+                self.compress_requests = bool(credentials[connection]['compress_requests'])
+            if 'compress_min_size' in credentials[connection]:
+                self.compress_min_size = int(credentials[connection]['compress_min_size'])
+            if 'page_size' in credentials[connection]:
+                self.page_size = int(credentials[connection]['page_size'])
+            # optional chunked creation of large structures
+            if 'create_chunk_size' in credentials[connection]:
+                self.create_chunk_size = int(credentials[connection]['create_chunk_size'])
             if 'token_url' in credentials[connection]:
                 self.token_url = credentials[connection]['token_url']
             else:
@@ -549,15 +1811,40 @@ class DataStructureSync:
         return
 
 
+    def get_connections(self, patterns=[], cred_file_name=None):
+        ''' returns the names of the connections in the credentials file matching any of the given names or
+            glob patterns (like customer_*), in the order of the file'''
+        if not cred_file_name:
+            cred_file_name = self.cred_file_name
+        with open(cred_file_name) as credentials_file:
+            credentials = json.load(credentials_file)
+        return [c for c in credentials if any(fnmatch.fnmatchcase(c, pattern) for pattern in patterns)]
+
+
     def init_api(self):
         # init API
         if self.verbosity > 0:
             print("INFO: Initialize API and authenticate")
         self.odoo_api = RestAPI(auth_type=self.auth_type, headers={}, client_id=self.client_id, 
-                        client_secret=self.client_secret, base_url=self.base_url, 
-                        token_url=self.token_url, readonly=self.readonly,
-                        verbosity=self.verbosity)
-        #self.odoo_api._get_access_token() # this is just for testing different libraries
+                        client_secret=self.client_secret, username=self.username, password=self.password,
+                        base_url=self.base_url, token_url=self.token_url, readonly=self.readonly,
+                        verbosity=self.verbosity, pool_maxsize=self.pool_maxsize, keep_alive=self.keep_alive,
+                        retry_policy=RetryPolicy(max_retries=self.max_retries, retry_budget=self.retry_budget,
+                                                 backoff_base=self.retry_backoff, backoff_max=self.retry_backoff_max,
+                                                 verbosity=self.verbosity),
+                        # the adaptive limit can't usefully grow beyond the connections of the pool
+                        rate_limiter=RateLimiter(rate=self.rate_limit, burst=self.rate_burst,
+                                                 max_in_flight=self.max_in_flight or
+                                                               (self.pool_maxsize if self.adaptive_concurrency else 0),
+                                                 adaptive=self.adaptive_concurrency, target_latency=self.target_latency,
+                                                 verbosity=self.verbosity),
+                        # the oauth2 tokens are kept along with the reference caches
+                        token_cache_file_name=os.path.join(self.cache_dir, 'oauth2_tokens.json') if self.cache_dir
+                                              else None,
+                        token_cache_key=f"{self.connection}:{self.client_id}@{self.token_url}", stats=self.stats,
+                        compress_requests=self.compress_requests, compress_min_size=self.compress_min_size)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
         if not self.odoo_api.authenticate():
             return False
 
@@ -566,6 +1853,8 @@ class DataStructureSync:
         if not api:
             return False
         user = self.odoo_api.execute('/user')
+        self.odoo_api_info = api
+        self.odoo_user_info = user
         self.odoo_api_version = api.get('api_version', None)
         self.odoo_server_version= api.get('server_version', None)
         self.odoo_api_version_info = api.get('server_version_info', None)
@@ -577,9 +1866,146 @@ class DataStructureSync:
         if self.verbosity > 1:
             print(f"INFO: successfully authenticated with user {user.get('name', 'unknown')} on Odoo "
                   f"version {self.odoo_server_version}")
+        self.load_reference_caches()
         return True
 
 
+    def get_session(self, connection=None, init_api=True):
+        ''' returns a new sync object with the same settings for another connection of the credentials file,
+            with its own api session and reference caches but recording to the same stats. init_api also
+            authenticates it right away'''
+        session = DataStructureSync(cred_file_name=self.cred_file_name, verbosity=self.verbosity,
+                                    readonly=self.readonly, cache_dir=self.cache_dir, cache_ttl=self.cache_ttl,
+                                    refresh_cache=self.refresh_cache)
+        # the requests of all sessions are recorded together, so --stats covers them
+        session.stats = self.stats
+        self.sessions.append(session)
+        if init_api:
+            session.open_session(connection=connection)
+        return session
+
+
+    def open_session(self, connection=None):
+        ''' loads the credentials of the connection and initializes the api, raises if that fails'''
+        self.load_credentials(connection=connection)
+        if not self.init_api():
+            raise Exception(f"ERROR: Could not initialize api for {connection} - please check the connection "
+                            "credentials")
+
+
+    def close_api(self):
+        ''' releases the pooled connections of the api once all operations of a run are done and keeps the
+            reference caches for the next run if requested'''
+        self.save_reference_caches()
+        if self.odoo_api:
+            retry_stats = self.odoo_api.get_retry_stats()
+            if retry_stats['retries'] and self.verbosity > 0:
+                print(f"INFO: {retry_stats['retries']} request(s) have been retried ({retry_stats['retry_reasons']}), "
+                      f"waiting {retry_stats['retry_wait']:.2f}s in total; gave up {retry_stats['given_up']} time(s)")
+            throttle_stats = self.odoo_api.get_throttle_stats()
+            if throttle_stats['throttled'] and self.verbosity > 0:
+                print(f"INFO: {throttle_stats['throttled']} request(s) have been throttled, waiting "
+                      f"{throttle_stats['throttle_wait']:.2f}s in total"
+                      + (f"; requests in flight between {int(throttle_stats['min_limit'])} and "
+                         f"{int(throttle_stats['max_limit'])}, ending at {int(throttle_stats['limit'])}"
+                         if self.adaptive_concurrency else ""))
+            self.odoo_api.close()
+
+
+    def open_journal(self, journal_file_name='checkpoint_journal.jsonl', resume=False):
+        ''' starts recording the progress of the exports and creates to the journal file. with resume the
+            entries of the previous run are kept and the work recorded there is skipped, otherwise the journal
+            starts over - unless a run that didn't complete has left its progress there, which would be lost'''
+        if not resume and os.path.exists(journal_file_name) and os.path.getsize(journal_file_name):
+            raise Exception(f"ERROR: the journal {journal_file_name} holds the progress of a run that didn't "
+                            "complete. continue it with --resume, record to another file with --journal or remove "
+                            "the journal to start over.")
+        self.journal = CheckpointJournal(file_name=journal_file_name, resume=resume, verbosity=self.verbosity)
+
+
+    def close_journal(self, completed=False):
+        ''' a journal is only needed to resume a run that didn't complete, so then it's removed'''
+        if self.journal:
+            completed = completed or not self.journal.entries
+            self.journal.close(remove=completed)
+            if not completed:
+                print(f"INFO: the progress has been recorded to {self.journal.file_name}, use --resume to continue")
+            self.journal = None
+
+
+    def _get_stats_extra(self):
+        ''' the totals of the api to go along with the request stats, summed up over the apis of the sessions
+            for other connections (see get_session)'''
+        apis = [session.odoo_api for session in [self] + self.sessions if session.odoo_api]
+        if not apis:
+            return {}
+        extra = {'requests': 0, 'retries': 0, 'retry_wait_seconds': 0.0, 'throttled': 0, 'throttle_wait_seconds': 0.0}
+        for api in apis:
+            retry_stats = api.get_retry_stats()
+            throttle_stats = api.get_throttle_stats()
+            extra['requests'] += api.get_counter()
+            extra['retries'] += retry_stats['retries']
+            extra['retry_wait_seconds'] += retry_stats['retry_wait']
+            extra['throttled'] += throttle_stats['throttled']
+            extra['throttle_wait_seconds'] += throttle_stats['throttle_wait']
+        return extra
+
+
+    def print_stats(self):
+        print(self.stats.summary())
+        print(', '.join(f"{k}: {round(v, 2)}" for k, v in self._get_stats_extra().items()))
+
+
+    def write_stats(self, stats_file_name=None):
+        ''' dumps the stats to the file, in the prometheus textfile format for .prom files or as json'''
+        with open(stats_file_name, 'w') as stats_file:
+            if stats_file_name.endswith('.prom'):
+                stats_file.write(self.stats.to_prometheus(extra={f"run_{k}": v
+                                                                 for k, v in self._get_stats_extra().items()}))
+            else:
+                json.dump(self.stats.to_json(extra={'totals': self._get_stats_extra()}), stats_file, indent=2)
+        if self.verbosity > 0:
+            print(f"INFO: the request stats have been written to {stats_file_name}")
+
+
+    def load_reference_caches(self):
+        ''' fills the reference caches from the on-disk store of the connection, if one is used'''
+        if not self.cache_dir:
+            return
+        self.cache_store = ReferenceCacheStore(cache_dir=self.cache_dir, connection=self.connection,
+                                               server_version=self.odoo_server_version, ttl=self.cache_ttl,
+                                               verbosity=self.verbosity)
+        if self.refresh_cache:
+            if self.verbosity > 0:
+                print(f"INFO: refreshing the reference cache of connection {self.connection}")
+            self.cache_store.clear()
+            return
+        with self.cache_lock:
+            for cache_name in self.cache_names:
+                getattr(self, cache_name).update(self.cache_store.load(cache_name=cache_name))
+
+
+    def _get_cache_name(self, cache={}):
+        return next((name for name in self.cache_names if getattr(self, name) is cache), 'unknown_cache')
+
+
+    def _count_cache_lookup(self, cache_name='', keys=[]):
+        ''' counts the keys found in the reference cache as hits and the others as misses'''
+        cache = getattr(self, cache_name)
+        hits = sum(1 for key in keys if key in cache)
+        self.stats.record_cache(cache_name=cache_name, hits=hits, misses=len(keys) - hits)
+
+
+    def save_reference_caches(self):
+        if not self.cache_store:
+            return
+        with self.cache_lock:
+            for cache_name in self.cache_names:
+                self.cache_store.save(cache_name=cache_name, cache=getattr(self, cache_name))
+        self.cache_store.close()
+        self.cache_store = None
+
+
     def get_record_by_id(self, model='', rec_id=0, fields=[]):
         ''' takes a model, a record id and a list of fields
             returns a dict with the records' values for the requested fields
@@ -607,10 +2033,12 @@ class DataStructureSync:
             return False
         data_structure_id = data_structure_id[0] if type(data_structure_id) in [list, tuple] \
                                                  else data_structure_id
-        if not data_structure_id in self.data_structure_cache:
-            self.data_structure_cache[data_structure_id] = self.get_record_by_id(model='data.structure',
-                                                rec_id=data_structure_id, fields=['id', 'name'])
-        return self.data_structure_cache[data_structure_id]['name']
+        with self.cache_lock:
+            self._count_cache_lookup(cache_name='data_structure_cache', keys=[data_structure_id])
+            if not data_structure_id in self.data_structure_cache:
+                self.data_structure_cache[data_structure_id] = self.get_record_by_id(model='data.structure',
+                                                    rec_id=data_structure_id, fields=['id', 'name'])
+            return self.data_structure_cache[data_structure_id]['name']
 
 
     def get_model_by_id(self, model_id=0):
@@ -620,10 +2048,12 @@ class DataStructureSync:
         if not model_id:
             return False
         model_id = model_id[0] if type(model_id) in [list, tuple] else model_id
-        if not model_id in self.ir_model_cache:
-            self.ir_model_cache[model_id] = self.get_record_by_id(model='ir.model', rec_id=model_id,
-                                                fields=['id', 'name', 'model'])
-        return self.ir_model_cache[model_id]['model']
+        with self.cache_lock:
+            self._count_cache_lookup(cache_name='ir_model_cache', keys=[model_id])
+            if not model_id in self.ir_model_cache:
+                self.ir_model_cache[model_id] = self.get_record_by_id(model='ir.model', rec_id=model_id,
+                                                    fields=['id', 'name', 'model'])
+            return self.ir_model_cache[model_id]['model']
 
 
     def get_field_by_id(self, field_id=0):
@@ -633,12 +2063,13 @@ class DataStructureSync:
         if not field_id:
             return False
         field_id = field_id[0] if type(field_id) in [list, tuple] else field_id
-        if not field_id in self.ir_model_fields_cache:
-            field_record = self.get_record_by_id(model='ir.model.fields', rec_id=field_id,
-                                           fields=['id', 'name', 'model_id'])
-            field_record['model'] = self.get_model_by_id(model_id=field_record['model_id'])
-            self.ir_model_fields_cache[field_id] = field_record
-        return self.ir_model_fields_cache[field_id]['name'], self.ir_model_fields_cache[field_id]['model']
+        with self.cache_lock:
+            self._count_cache_lookup(cache_name='ir_model_fields_cache', keys=[field_id])
+            if not field_id in self.ir_model_fields_cache:
+                # ir.model.fields holds the model's technical name itself, so no further request is needed
+                self.ir_model_fields_cache[field_id] = self.get_record_by_id(model='ir.model.fields',
+                                               rec_id=field_id, fields=['id', 'name', 'model_id', 'model'])
+            return self.ir_model_fields_cache[field_id]['name'], self.ir_model_fields_cache[field_id]['model']
 
 
     def get_lang_by_id(self, lang_id=0):
@@ -648,219 +2079,854 @@ class DataStructureSync:
         if not lang_id:
             return False
         lang_id = lang_id[0] if type(lang_id) in [list, tuple] else lang_id
-        if not lang_id in self.res_lang_cache:
-            self.res_lang_cache[lang_id] = self.get_record_by_id(model='res.lang', rec_id=lang_id,
-                                                fields=['id', 'name', 'code'])
-        return self.res_lang_cache[lang_id]['code']
+        with self.cache_lock:
+            self._count_cache_lookup(cache_name='res_lang_cache', keys=[lang_id])
+            if not lang_id in self.res_lang_cache:
+                self.res_lang_cache[lang_id] = self.get_record_by_id(model='res.lang', rec_id=lang_id,
+                                                    fields=['id', 'name', 'code'])
+            return self.res_lang_cache[lang_id]['code']
 
 
     def export_structures(self, data_structure_names=[], data_file_name=None, 
-                        export_meta=False, export_no_import=False, export_ilike=False):
+                        export_meta=False, export_no_import=False, export_ilike=False, jobs=1,
+                        use_async=False, incremental=False, manifest_file_name='export_manifest.json',
+                        stream=False, compact=False, resume=False):
         ''' query all structures identified by the nargs list of data structure names optionally matched with
             ilike and call export_structures() to export each of the result individually.
             for each export the placeholder {} in the data file name is replaced with a sanitized data
-            structure name if present, otherwise each export would overwrite the last one (todo: warn...)'''
+            structure name if present, otherwise each export would overwrite the last one.
+            with more than one job the structures are exported in parallel by a pool of worker threads sharing
+            the api's session and the reference caches, their output is printed in the original order.
+            with async requests the reads within each structure are sent concurrently.
+            an incremental export skips the structures whose records haven't changed since they were last
+            exported to the same file, as recorded in the manifest file.
+            with an open journal every file written is recorded, resume skips the ones written by a previous
+            run that stopped midway'''
         operator = 'ilike' if export_ilike else '='
         domain = (len(data_structure_names)-1) * ['|'] + [['name', operator, s] for s in data_structure_names]
         if self.verbosity > 1:
             print(f"INFO: data.structure to export {domain}")
-        data = {
-            'model': "data.structure",
-            'domain': json.dumps(domain),
-            'fields': json.dumps(['name']),
-        }
-        response = self.odoo_api.execute('search_read', type="GET", data=data)
+        response = list(self.odoo_api.iter_search_read(model="data.structure", domain=domain,
+                        fields=['name'] + (['generator_ids', 'parser_ids', 'write_date'] if incremental else []),
+                        page_size=self.page_size))
+        # structures written to the same file are kept together in one task, so they are still exported one
+        # after the other and the last one wins like it always did
+        exports = {}
         for r in response:
             structure = r.get('name', '')
-            file_name = re.sub(r'[^0-9a-zA-Z]',r'',structure)
-            if data_file_name:
-                file_name = data_file_name.replace('{}',file_name)
-            if file_name[-5:].lower() != '.json':
-                file_name = f"{file_name}.json"
-            if self.verbosity > 0:
-                print(f"exporting data structure '{structure}' to file '{file_name}'")
-            self.export_structure(data_structure_name=structure, data_file_name=file_name, 
-                                    export_meta=export_meta, export_no_import=export_no_import)
+            file_name = self._get_export_file_name(data_file_name=data_file_name, data_structure_name=structure)
+            if file_name in exports:
+                print(f"WARNING: the data structures '{exports[file_name][-1]}' and '{structure}' are both "
+                      f"exported to file '{file_name}', only the latter will be kept")
+            exports.setdefault(file_name, []).append(structure)
+
+        manifest, fingerprints = {}, {}
+        if incremental:
+            manifest = self.load_export_manifest(manifest_file_name=manifest_file_name)
+            fingerprints = self.get_structure_fingerprints(structures=response, export_meta=export_meta,
+                                                           export_no_import=export_no_import, compact=compact)
+            for file_name in list(exports):
+                if manifest.get(file_name, {}).get('fingerprint') == fingerprints[exports[file_name][-1]] and \
+                        os.path.exists(file_name):
+                    if self.verbosity > 0:
+                        print(f"INFO: data structure '{exports[file_name][-1]}' didn't change since its last "
+                              f"export to file '{file_name}', skipping it")
+                    del exports[file_name]
+
+        if resume and self.journal:
+            for file_name in list(exports):
+                if self.journal.find(op='export', event='done', file=file_name, structure=exports[file_name][-1]) \
+                        and os.path.exists(file_name):
+                    if self.verbosity > 0:
+                        print(f"INFO: data structure '{exports[file_name][-1]}' has already been exported to file "
+                              f"'{file_name}', skipping it")
+                    del exports[file_name]
+
+        def _export(file_name, structures):
+            for structure in structures:
+                if self.verbosity > 0:
+                    print(f"exporting data structure '{structure}' to file '{file_name}'")
+                self.export_structure(data_structure_name=structure, data_file_name=file_name, 
+                                        export_meta=export_meta, export_no_import=export_no_import,
+                                        use_async=use_async, stream=stream, compact=compact)
+            if self.journal:
+                self.journal.record(op='export', event='done', file=file_name, structure=structures[-1])
+
+        # the manifest is kept up to date for all the files written, even if a later export fails
+        exported = []
+        try:
+            if jobs <= 1 or len(exports) <= 1:
+                for file_name, structures in exports.items():
+                    _export(file_name, structures)
+                    exported.append(file_name)
+                return
+
+            with ThreadOutput() as output, ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = {file_name: executor.submit(output.run, _export, file_name, structures)
+                           for file_name, structures in exports.items()}
+                for file_name, future in futures.items():
+                    task_output, result, error = future.result()
+                    output.stream.write(task_output)
+                    if error:
+                        executor.shutdown(wait=True, cancel_futures=True)
+                        raise error
+                    exported.append(file_name)
+        finally:
+            if incremental and exported:
+                for file_name in exported:
+                    manifest[file_name] = {
+                        'structure': exports[file_name][-1],
+                        'fingerprint': fingerprints[exports[file_name][-1]],
+                        'exported_at': datetime.now(timezone.utc).strftime(self.dt_format_odoo),
+                    }
+                self.save_export_manifest(manifest_file_name=manifest_file_name, manifest=manifest)
+
+
+    def _get_export_file_name(self, data_file_name=None, data_structure_name=''):
+        ''' the file a data structure is exported to: the placeholder {} in the data file name is replaced
+            with the sanitized name of the structure'''
+        file_name = re.sub(r'[^0-9a-zA-Z]',r'',data_structure_name)
+        if data_file_name:
+            file_name = data_file_name.replace('{}',file_name)
+        if file_name[-5:].lower() != '.json' and not ColumnarDataFile.is_columnar(file_name):
+            file_name = f"{file_name}.json"
+        return file_name
+
+
+    def snapshot(self, data_file_name='{}.json', archive_file_name=None, export_meta=False,
+                 export_no_import=False, page_size=None, compact=False):
+        ''' exports all the data structures of the instance at once: all the data structure, generator,
+            language mapping and parser records are read page by page and the references of all of them are
+            resolved together, then they are split into the single structures locally. so the number of
+            requests depends on the number of records and the page size, not on the number of structures or
+            the shape of their trees.
+            each structure is written to its own file like export does, or all of them to one archive if an
+            archive file name is given (a .zip, .tar, .tar.gz or .tgz file)'''
+        requests_before = self.odoo_api.get_counter()
+        errors_before = self.odoo_api.get_thread_error_count()
+        export_fields = self._get_export_fields(export_meta=export_meta, export_no_import=export_no_import)
+        records = {}
+        for model, fields in export_fields.items():
+            if self.verbosity > 1:
+                print(f"reading all {model} records")
+            records[model] = self.search_read_all(model=model, fields=fields, page_size=page_size)
+        if self.odoo_api.get_thread_error_count() > errors_before:
+            raise Exception(f"ERROR: {self.odoo_api.get_thread_error_count() - errors_before} request(s) failed "
+                            "while reading the records, the snapshot would be incomplete. aborting.")
+        self.resolve_references(data_structures=records['data.structure'].values(),
+                                generator_structures=records['generate.data.structure'].values(),
+                                language_mappings=records['language.mapping'].values(),
+                                parser_structures=records['parse.data.structure'].values())
+
+        # the records are split into the structures just like they would have been exported one by one
+        exports = {}
+        for data_structure_data in records['data.structure'].values():
+            generator_structures = self._order_tree(records=records['generate.data.structure'],
+                                                    root_ids=data_structure_data.get('generator_ids') or [])
+            language_mappings = {mapping_id: records['language.mapping'][mapping_id]
+                                 for mapping_id in self._get_mapping_ids(generator_structures)
+                                 if mapping_id in records['language.mapping']}
+            parser_structures = self._order_tree(records=records['parse.data.structure'],
+                                                 root_ids=data_structure_data.get('parser_ids') or [])
+            data_structure = {'api': self.odoo_api_info, 'user': self.odoo_user_info, 'host': self.host_url}
+            data_structure.update(self._assemble_structure(data_structure_data=data_structure_data,
+                                                           generator_structures=generator_structures,
+                                                           language_mappings=language_mappings,
+                                                           parser_structures=parser_structures))
+            file_name = self._get_export_file_name(data_file_name=data_file_name,
+                                                   data_structure_name=data_structure_data.get('name', ''))
+            if file_name in exports:
+                print(f"WARNING: the data structures '{exports[file_name]['data_structure'].get('name')}' and "
+                      f"'{data_structure_data.get('name')}' are both exported to file '{file_name}', only the "
+                      "latter will be kept")
+            exports[file_name] = data_structure
+
+        if archive_file_name:
+            self._write_snapshot_archive(archive_file_name=archive_file_name, exports=exports, compact=compact)
+        else:
+            for file_name, data_structure in exports.items():
+                self.write_data_file(data_file_name=file_name, data_structure=data_structure, compact=compact)
+        print(f"INFO: the snapshot of {len(records['data.structure'])} data structures with "
+              f"{len(records['generate.data.structure'])} generators, {len(records['language.mapping'])} "
+              f"language mappings and {len(records['parse.data.structure'])} parsers has been read in "
+              f"{self.odoo_api.get_counter() - requests_before} requests and written to "
+              + (f"the archive {archive_file_name}" if archive_file_name else f"{len(exports)} files"))
+
+
+    def _write_snapshot_archive(self, archive_file_name='', exports={}, compact=False):
+        ''' writes the exported structures as files of a zip or tar archive, depending on its file name.
+            the archive only depends on the exported data, so two snapshots of the same data can be compared
+            by their checksum: each file gets the newest write_date among its records as its time (only exported
+            with the meta fields, the epoch otherwise) and the gzip header of a .tar.gz doesn't get any time'''
+        def _dump(file_name, data_structure):
+            if ColumnarDataFile.is_columnar(file_name):
+                return ColumnarDataFile(file_name=file_name).dumps(data_structure)
+            if compact:
+                return json.dumps(data_structure, separators=(',', ':')).encode('utf-8')
+            return json.dumps(data_structure, indent=2).encode('utf-8')
+
+        def _mtime(data_structure):
+            records = [data_structure.get('data_structure') or {}]
+            for kind in ['generator_structures', 'language_mappings', 'parser_structures']:
+                records.extend((data_structure.get(kind) or {}).values())
+            write_dates = [record['write_date'] for record in records if record.get('write_date')]
+            if not write_dates:
+                return 0
+            newest = datetime.strptime(max(write_dates)[:19], self.dt_format_odoo)
+            return int(newest.replace(tzinfo=timezone.utc).timestamp())
+
+        if archive_file_name.lower().endswith('.zip'):
+            with zipfile.ZipFile(archive_file_name, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for file_name, data_structure in exports.items():
+                    # zip files can't hold times before 1980
+                    date_time = max(datetime.fromtimestamp(_mtime(data_structure), timezone.utc),
+                                    datetime(1980, 1, 1, tzinfo=timezone.utc))
+                    info = zipfile.ZipInfo(filename=file_name, date_time=date_time.timetuple()[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    archive.writestr(info, _dump(file_name, data_structure))
+            return
+        with open(archive_file_name, 'wb') as archive_file:
+            fileobj = archive_file
+            if archive_file_name.lower().endswith(('.tar.gz', '.tgz')):
+                fileobj = gzip.GzipFile(filename='', mode='wb', fileobj=archive_file, mtime=0)
+            with fileobj, tarfile.open(fileobj=fileobj, mode='w') as archive:
+                for file_name, data_structure in exports.items():
+                    content = _dump(file_name, data_structure)
+                    info = tarfile.TarInfo(name=file_name)
+                    info.size = len(content)
+                    info.mtime = _mtime(data_structure)
+                    archive.addfile(info, io.BytesIO(content))
+
+
+    def load_export_manifest(self, manifest_file_name='export_manifest.json'):
+        ''' returns the manifest of the previous exports, mapping the file names to the exported structure and
+            its fingerprint at the time, or an empty dict if there is none yet'''
+        if not os.path.exists(manifest_file_name):
+            return {}
+        with open(manifest_file_name) as manifest_file:
+            return json.load(manifest_file)
+
+
+    def save_export_manifest(self, manifest_file_name='export_manifest.json', manifest={}):
+        with open(manifest_file_name, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        if self.verbosity > 1:
+            print(f"INFO: the export manifest has been written to {manifest_file_name}")
+
+
+    def get_structure_fingerprints(self, structures=[], export_meta=False, export_no_import=False,
+                                   compact=False):
+        ''' takes data.structure records (with their generator_ids, parser_ids and write_date) and returns a
+            fingerprint per structure name built from the ids and write dates of all of its records and the
+            export options changing what is written to the file. the trees of all the structures are walked
+            together level by level reading nothing but ids and write dates, so the number of requests depends on
+            the depth of the deepest tree and not on the number of structures'''
+        stamps = {s['id']: [['options', self.host_url, export_meta, export_no_import, compact],
+                            ['data.structure', s['id'], s.get('write_date')]] for s in structures}
+        mapping_owners = {}
+        for model, o2m_field in [('generate.data.structure', 'generator_ids'), ('parse.data.structure', 'parser_ids')]:
+            owners = {rec_id: s['id'] for s in structures for rec_id in s.get(o2m_field) or []}
+            level_ids = list(owners)
+            fields = ['child_ids', 'write_date'] + (['lang_mapping_ids'] if model == 'generate.data.structure' else [])
+            while level_ids:
+                records = self.read_records_by_ids(model=model, rec_ids=level_ids, fields=fields)
+                level_ids = []
+                for rec_id, record in records.items():
+                    stamps[owners[rec_id]].append([model, rec_id, record.get('write_date')])
+                    for child_id in record.get('child_ids') or []:
+                        if child_id not in owners:
+                            owners[child_id] = owners[rec_id]
+                            level_ids.append(child_id)
+                    for mapping_id in record.get('lang_mapping_ids') or []:
+                        mapping_owners[mapping_id] = owners[rec_id]
+        records = self.read_records_by_ids(model='language.mapping', rec_ids=list(mapping_owners),
+                                           fields=['write_date'])
+        for rec_id, record in records.items():
+            stamps[mapping_owners[rec_id]].append(['language.mapping', rec_id, record.get('write_date')])
+        fingerprints = {}
+        for s in structures:
+            stamp = json.dumps(sorted(stamps[s['id']], key=str))
+            fingerprints[s.get('name', '')] = hashlib.sha1(stamp.encode('utf-8')).hexdigest()
+        return fingerprints
 
 
     def export_structure(self, data_structure_name=None, data_file_name=None,
-                            export_meta=False, export_no_import=False):
+                            export_meta=False, export_no_import=False, use_async=False, stream=False,
+                            compact=False):
         ''' exports a single data structure in whole to the file specified
-            the generator and parser sub-structures are derived recursively
+            the generator and parser sub-structures are read level by level, one request per tree level
             the resulting json stores each record in a flat structure that can be used in various ways
             for related records that are not exported (model, fields, language), identifiable fields other
             than their ID is stored too, because the ids would generally be different in another system
-            (especially when using the script to export from test systems and import to prod systems)'''
-        # building the list of fields to be exported depending on args
-        data_structure_fields_export = self._get_model_fields(model='data.structure', importable=True,
-            meta=export_meta, no_import=export_no_import)
-        generator_structure_fields_export = self._get_model_fields(model='generate.data.structure',
-            importable=True, meta=export_meta, no_import=export_no_import)
-        parser_structure_fields_export = self._get_model_fields(model='parse.data.structure', importable=True,
-            meta=export_meta, no_import=export_no_import)
-        language_mapping_fields_export = self._get_model_fields(model='language.mapping', importable=True,
-            meta=export_meta, no_import=export_no_import)
-
+            (especially when using the script to export from test systems and import to prod systems)
+            huge structures can be streamed to the file instead of being held in memory (see
+            export_structure_stream), compact drops the indentation of the json'''
         # holding the final data structure to export
         data_structure = {}
-
-        # first get some meta-data that better allows to identify the exported data if ever necessary
-        data_structure['api'] = self.odoo_api.execute('')
-        data_structure['user'] = self.odoo_api.execute('/user')
+        # other structures might be exported by other threads at the same time
+        requests_before = self.odoo_api.get_thread_counter()
+        errors_before = self.odoo_api.get_thread_error_count()
+
+        # first some meta-data that better allows to identify the exported data if ever necessary, it's the
+        # same for all structures exported from the connection
+        data_structure['api'] = self.odoo_api_info
+        data_structure['user'] = self.odoo_user_info
         data_structure['host'] = self.host_url
 
-        # get main data structure
-        if self.verbosity > 1:
-            print(f"looking for and exporting the data.structure named {data_structure_name}")
-        data = {
-            'model': "data.structure",
-            'domain': json.dumps([['name', '=', data_structure_name]]),
-            'fields': json.dumps(data_structure_fields_export),
-            'limit': 1
-        }
-        response = self.odoo_api.execute('search_read', type="GET", data=data)
-        if response:
-            data_structure_data = next(iter(response))
-            # the m2o to model and field would generally have different ids in other systems
-            # so get identifiable data from those models to be stored alongside the ids
-            child_id = data_structure_data.get('child_id', False)
-            if child_id:
-                data_structure_data['child_id.name'] = \
-                        self.get_data_structure_by_id(data_structure_id=child_id)
-            model_id = data_structure_data.get('model_id', False)
-            if model_id:
-                data_structure_data['model_id.model'] = self.get_model_by_id(model_id=model_id)
-            field_id = data_structure_data.get('filter_date_field_id', False)
-            if field_id:
-                data_structure_data['filter_date_field_id.name'],  \
-                  data_structure_data['filter_date_field_id.model']  = self.get_field_by_id(field_id=field_id)
-            # add it to the final data structure
-            data_structure['data_structure'] = data_structure_data
-
-            # get all generator structures
-            generator_structures = {}
-            for generator_id in data_structure_data.get('generator_ids'):
-                generator_structures.update(self.read_generator_structure(generator_id = generator_id, 
-                            fields = generator_structure_fields_export))
-            data_structure['generator_structures'] = generator_structures
-
-            # get all language mappings on the generators
-            language_mappings = {}
-            for generator_id in generator_structures:
-                mapping_ids = generator_structures[generator_id].get('lang_mapping_ids', [])
-                if self.verbosity > 2:
-                    print(f"checking generator {generator_id} for language mappings and found {mapping_ids}")
-                if mapping_ids:
-                    language_mappings.update(self.read_language_mappings(
-                            mapping_ids = mapping_ids, fields = language_mapping_fields_export))
-            data_structure['language_mappings'] = language_mappings
-
-            # get all parser structures
-            parser_structures = {}
-            for parser_id in data_structure_data.get('parser_ids'):
-                parser_structures.update(self.read_parser_structure(parser_id = parser_id,
-                            fields = parser_structure_fields_export))
-            data_structure['parser_structures'] = parser_structures
+        # get main data structure with all its sub-structures
+        if stream and ColumnarDataFile.is_columnar(data_file_name):
+            raise Exception(f"ERROR: streamed exports are written as json only, not to {data_file_name}")
+        if stream:
+            if use_async and self.verbosity > 0:
+                print("INFO: streamed exports don't use async requests")
+            self.export_structure_stream(data_structure_name=data_structure_name, data_file_name=data_file_name,
+                                         header=data_structure, export_meta=export_meta,
+                                         export_no_import=export_no_import, indent=None if compact else 2)
+        elif use_async:
+            data_structure.update(asyncio.run(self.read_structure_async(data_structure_name=data_structure_name,
+                                    export_meta=export_meta, export_no_import=export_no_import)))
         else:
-            if self.verbosity > 1:
-                print('INFO: did not get any response, finishing')
+            data_structure.update(self.read_structure(data_structure_name=data_structure_name,
+                                    export_meta=export_meta, export_no_import=export_no_import))
+
+        # a failed read would leave records out of the export without anyone noticing
+        if self.odoo_api.get_thread_error_count() > errors_before:
+            raise Exception(f"ERROR: {self.odoo_api.get_thread_error_count() - errors_before} request(s) failed "
+                            f"while reading the data structure {data_structure_name}, its export would be "
+                            "incomplete. aborting." + (f" the file {data_file_name} is incomplete." if stream else ""))
 
         # write json
-        if self.verbosity > 1:
-            print("got the following data in the end")
-            pprint(data_structure)
-        with open(data_file_name, 'w') as data_structure_file:
-            json.dump(data_structure, data_structure_file, indent=2)
+        if not stream:
+            if self.verbosity > 1:
+                print("got the following data in the end")
+                pprint(data_structure)
+            self.write_data_file(data_file_name=data_file_name, data_structure=data_structure, compact=compact)
         if self.verbosity > 0:
             print(f"INFO: the data structure {data_structure_name} "
-                  f"has been read in {self.odoo_api.get_counter()} requests "
+                  f"has been read in {self.odoo_api.get_thread_counter() - requests_before} requests "
                   f"and was written to the file {data_file_name}")
 
 
-    def read_generator_structure(self, generator_id=None, fields=[]):
-        generator_structures = {}
+    def write_data_file(self, data_file_name=None, data_structure={}, compact=False):
+        ''' writes the data structure to the file as json, or as a columnar data file if its extension says so
+            (see ColumnarDataFile). compact drops the indentation of the json'''
+        if ColumnarDataFile.is_columnar(data_file_name):
+            ColumnarDataFile(file_name=data_file_name).dump(data_structure)
+            return
+        with open(data_file_name, 'w') as data_structure_file:
+            if compact:
+                json.dump(data_structure, data_structure_file, separators=(',', ':'))
+            else:
+                json.dump(data_structure, data_structure_file, indent=2)
+
+
+    def _merge_reference_ids(self, reference_fills=[], fills=[]):
+        ''' adds the ids of the fills of _get_reference_ids to the ones collected so far'''
+        for reference_fill, fill in zip(reference_fills, fills):
+            reference_fill['rec_ids'] = list(dict.fromkeys(reference_fill['rec_ids'] + fill['rec_ids']))
+
+
+    def read_structure_tree_spooled(self, model='', root_ids=[], fields=[], spool=None, kind='',
+                                    reference_fills=[]):
+        ''' spooled counterpart of read_structure_tree: the records of each level are put into the spool as they
+            arrive and only their child_ids and lang_mapping_ids are kept. returns those for the ids of the tree
+            in depth-first order. the ids of the references of the records of the kind (as in _get_reference_ids)
+            are added to the reference_fills. the levels are read in chunks of stream_chunk_size records, so
+            not even a whole level needs to be held in memory'''
+        skeleton = {}
+        level_ids = list(dict.fromkeys(root_ids))
+        depth = 0
+        while level_ids:
+            if self.verbosity > 1:
+                print(f"looking for and exporting {len(level_ids)} {model} records on level {depth}")
+            started = time.monotonic()
+            level_skeleton = {}
+            for i in range(0, len(level_ids), self.stream_chunk_size):
+                chunk_records = self.read_records_by_ids(model=model, rec_ids=level_ids[i:i + self.stream_chunk_size],
+                                                         fields=fields)
+                for rec_id, record in chunk_records.items():
+                    spool.add(rec_id, record)
+                    level_skeleton[rec_id] = {k: record.get(k) for k in ['child_ids', 'lang_mapping_ids']
+                                              if k in record}
+                self._merge_reference_ids(reference_fills=reference_fills,
+                                          fills=self._get_reference_ids(**{kind: chunk_records.values()}))
+            self.stats.record_level(model=model, depth=depth, records=len(level_skeleton),
+                                    seconds=time.monotonic() - started)
+            skeleton.update(level_skeleton)
+            level_ids = self._get_next_level_ids(level_ids=level_ids, level_records=level_skeleton, records=skeleton)
+            depth += 1
+        return self._order_tree(records=skeleton, root_ids=root_ids)
+
+
+    def export_structure_stream(self, data_structure_name=None, data_file_name=None, header={},
+                                export_meta=False, export_no_import=False, indent=2):
+        ''' exports a data structure like export_structure does, but without ever holding all its records in
+            memory: they are spooled to temporary files as they are read and written to the json one by one,
+            only the ids, the tree structure and the referenced models, fields and languages are kept.
+            the resulting file is the same as the one export_structure writes'''
+        export_fields = self._get_export_fields(export_meta=export_meta, export_no_import=export_no_import)
+        data = self._get_structure_search_data(data_structure_name=data_structure_name,
+                                               fields=export_fields['data.structure'])
+        response = self.odoo_api.execute('search_read', type="GET", data=data)
+        data_structure_data = next(iter(response or []), None)
+        if not data_structure_data and self.verbosity > 1:
+            print('INFO: did not get any response, finishing')
+
+        spools = {kind: RecordSpool() for kind in ['generator_structures', 'language_mappings', 'parser_structures']}
+        try:
+            ordered_ids = {}
+            if data_structure_data:
+                # the references are resolved in one pass just like in read_structure, but only their ids are
+                # kept while reading
+                reference_fills = self._get_reference_ids(data_structures=[data_structure_data])
+                ordered_ids['generator_structures'] = self.read_structure_tree_spooled(
+                                model="generate.data.structure",
+                                root_ids=data_structure_data.get('generator_ids') or [],
+                                fields=export_fields['generate.data.structure'], spool=spools['generator_structures'],
+                                kind='generator_structures', reference_fills=reference_fills)
+                mapping_ids = self._get_mapping_ids(ordered_ids['generator_structures'])
+                if self.verbosity > 1:
+                    print(f"looking for and exporting the language.mapping with ids {mapping_ids}")
+                mappings = self.read_records_by_ids(model="language.mapping", rec_ids=mapping_ids,
+                                                    fields=export_fields['language.mapping'])
+                for mapping_id, mapping in mappings.items():
+                    spools['language_mappings'].add(mapping_id, mapping)
+                self._merge_reference_ids(reference_fills=reference_fills,
+                                          fills=self._get_reference_ids(language_mappings=mappings.values()))
+                ordered_ids['language_mappings'] = [i for i in mapping_ids if i in mappings]
+                del mappings
+                ordered_ids['parser_structures'] = self.read_structure_tree_spooled(
+                                model="parse.data.structure", root_ids=data_structure_data.get('parser_ids') or [],
+                                fields=export_fields['parse.data.structure'], spool=spools['parser_structures'],
+                                kind='parser_structures', reference_fills=reference_fills)
+                for fill in reference_fills:
+                    self._fill_cache(**fill)
+                self.add_data_structure_references(data_structure_data)
+
+            add_references = {
+                'generator_structures': self.add_generator_references,
+                'language_mappings': self.add_language_mapping_references,
+                'parser_structures': self.add_parser_references,
+            }
+            with open(data_file_name, 'w') as data_structure_file:
+                writer = StreamingJSONWriter(stream=data_structure_file, indent=indent)
+                writer.begin()
+                for key, value in header.items():
+                    writer.write(key, value)
+                if data_structure_data:
+                    writer.write('data_structure', data_structure_data)
+                    for kind, spool in spools.items():
+                        writer.begin(kind)
+                        for rec_id in ordered_ids[kind]:
+                            record = spool.get(rec_id)
+                            add_references[kind](record)
+                            writer.write(rec_id, record)
+                        writer.end()
+                writer.end()
+        finally:
+            for spool in spools.values():
+                spool.close()
+
+
+
+    def _get_export_fields(self, export_meta=False, export_no_import=False):
+        ''' building the lists of fields to be exported per model depending on args'''
+        return {model: self._get_model_fields(model=model, importable=True, meta=export_meta,
+                                              no_import=export_no_import)
+                for model in ['data.structure', 'generate.data.structure', 'language.mapping',
+                              'parse.data.structure']}
+
+
+    def _get_structure_search_data(self, data_structure_name=None, fields=[]):
         if self.verbosity > 1:
-            print(f"looking for and exporting the generate.data.structure with id {generator_id}")
-        data = {
-            'model': "generate.data.structure",
-            'domain': json.dumps([['id', '=', generator_id]]),
+            print(f"looking for and exporting the data.structure named {data_structure_name}")
+        return {
+            'model': "data.structure",
+            'domain': json.dumps([['name', '=', data_structure_name]]),
             'fields': json.dumps(fields),
             'limit': 1
         }
+
+
+    def _get_mapping_ids(self, generator_structures={}):
+        ''' collects the ids of the language mappings of all generators in the order of the generators'''
+        mapping_ids = []
+        for generator_id in generator_structures:
+            generator_mapping_ids = generator_structures[generator_id].get('lang_mapping_ids', [])
+            if self.verbosity > 2:
+                print(f"checking generator {generator_id} for language mappings and found "
+                      f"{generator_mapping_ids}")
+            mapping_ids += generator_mapping_ids or []
+        return mapping_ids
+
+
+    def _assemble_structure(self, data_structure_data={}, generator_structures={}, language_mappings={},
+                            parser_structures={}):
+        ''' adds the identifiable data of the resolved references to all the records and returns them in the
+            layout of the exported json'''
+        self.add_data_structure_references(data_structure_data)
+        for generator_structure in generator_structures.values():
+            self.add_generator_references(generator_structure)
+        for language_mapping in language_mappings.values():
+            self.add_language_mapping_references(language_mapping)
+        for parser_structure in parser_structures.values():
+            self.add_parser_references(parser_structure)
+        return {
+            'data_structure': data_structure_data,
+            'generator_structures': generator_structures,
+            'language_mappings': language_mappings,
+            'parser_structures': parser_structures,
+        }
+
+
+    def read_structure(self, data_structure_name=None, export_meta=False, export_no_import=False,
+                       on_records=None):
+        ''' reads a data structure with all its generator, language mapping and parser records and the
+            identifiable data of their references, returns an empty dict if the structure isn't found.
+            on_records is called with the kind (as the arguments of resolve_references) and the records as soon
+            as each level has been read, before their references are resolved (see sync)'''
+        def _on_level(kind):
+            return (lambda records: on_records(kind, records)) if on_records else None
+
+        export_fields = self._get_export_fields(export_meta=export_meta, export_no_import=export_no_import)
+        data = self._get_structure_search_data(data_structure_name=data_structure_name,
+                                               fields=export_fields['data.structure'])
         response = self.odoo_api.execute('search_read', type="GET", data=data)
-        if response:
-            generator_structure = next(iter(response))
-            # the m2o to model, field and language would generally have different ids in other systems
-            # so get identifiable data from those models to be stored alongside the ids
-            model_id = generator_structure.get('model_id', None)
-            if model_id:
-                generator_structure['model_id.model'] = self.get_model_by_id(model_id=model_id)
-            field_id = generator_structure.get('filter_date_field_id', None)
-            if field_id:
-                generator_structure['filter_date_field_id.name'],  \
-                  generator_structure['filter_date_field_id.model']  = self.get_field_by_id(field_id=field_id)
-            lang_id = generator_structure.get('lang_id', None)
-            if lang_id:
-                generator_structure['lang_id.code'] = self.get_lang_by_id(lang_id=lang_id)
-            generator_structures = {generator_id: generator_structure}
-
-            # get all sub generator structures
-            for sub_generator_id in generator_structure.get('child_ids'):
-                generator_structures.update(self.read_generator_structure(generator_id=sub_generator_id))
-        return generator_structures
+        if not response:
+            if self.verbosity > 1:
+                print('INFO: did not get any response, finishing')
+            return {}
+        data_structure_data = next(iter(response))
+        if on_records:
+            on_records('data_structures', {data_structure_data.get('id'): data_structure_data})
+
+        # get all generator structures, level by level
+        generator_structures = self.read_generator_structures(
+                        generator_ids = data_structure_data.get('generator_ids') or [],
+                        fields = export_fields['generate.data.structure'],
+                        on_level = _on_level('generator_structures'))
+
+        # get all language mappings on the generators in one go
+        language_mappings = self.read_language_mappings(
+                        mapping_ids = self._get_mapping_ids(generator_structures),
+                        fields = export_fields['language.mapping'])
+        if on_records:
+            on_records('language_mappings', language_mappings)
+
+        # get all parser structures, level by level
+        parser_structures = self.read_parser_structures(
+                        parser_ids = data_structure_data.get('parser_ids') or [],
+                        fields = export_fields['parse.data.structure'],
+                        on_level = _on_level('parser_structures'))
+
+        # the m2o to model, field and language would generally have different ids in other systems
+        # so get identifiable data from those models to be stored alongside the ids - all referenced
+        # records are resolved in one pass, before they are added to the records
+        self.resolve_references(data_structures=[data_structure_data],
+                                generator_structures=generator_structures.values(),
+                                language_mappings=language_mappings.values(),
+                                parser_structures=parser_structures.values())
+        return self._assemble_structure(data_structure_data=data_structure_data,
+                                        generator_structures=generator_structures,
+                                        language_mappings=language_mappings,
+                                        parser_structures=parser_structures)
+
+
+    def search_read_all(self, model='', domain=[], fields=[], page_size=None):
+        ''' reads all the records of the model matching the domain page by page (see RestAPI.iter_search_read),
+            returns a dict mapping the ids to the records'''
+        return {record.get('id'): record for record in self.odoo_api.iter_search_read(model=model, domain=domain,
+                                                                fields=fields, page_size=page_size or self.page_size)}
+
+
+    def _get_read_data(self, model='', rec_ids=[], fields=[]):
+        if self.verbosity > 2:
+            print(f"query records {rec_ids} of model {model} for fields {fields}")
+        return {
+            'model': model,
+            'domain': json.dumps([['id', 'in', list(rec_ids)]]),
+            'fields': json.dumps(fields),
+        }
+
+
+    def read_records_by_ids(self, model='', rec_ids=[], fields=[]):
+        ''' takes a model, a list of record ids and a list of fields
+            returns a dict mapping each found id to the record's values for the requested fields
+            the ids are read with one request per page_size of them instead of one request per id, the next
+            page is requested while the previous one is processed'''
+        if not rec_ids:
+            return {}
+        rec_ids = list(rec_ids)
+        pages = iter(range(0, len(rec_ids), self.page_size))
+
+        def _get_page_data(records):
+            start = next(pages, None)
+            if start is None:
+                return None
+            return self._get_read_data(model=model, rec_ids=rec_ids[start:start + self.page_size], fields=fields)
+
+        # a single page is read right away instead of in the background
+        return {record.get('id'): record for record in self.odoo_api.iter_search_read_pages(
+                                            get_page_data=_get_page_data, prefetch=len(rec_ids) > self.page_size)}
+
+
+    def _get_next_level_ids(self, level_ids=[], level_records={}, records={}):
+        # the check against the already read records guards against (broken) cyclic structures
+        next_level_ids = [child_id for rec_id in level_ids if rec_id in level_records
+                          for child_id in level_records[rec_id].get('child_ids') or []]
+        return [i for i in dict.fromkeys(next_level_ids) if i not in records]
+
+
+    def _order_tree(self, records={}, root_ids=[]):
+        ''' rebuilds the depth-first order of a tree read level by level'''
+        tree = {}
+        stack = list(reversed(root_ids))
+        while stack:
+            rec_id = stack.pop()
+            if rec_id in tree or rec_id not in records:
+                continue
+            tree[rec_id] = records[rec_id]
+            stack.extend(reversed(records[rec_id].get('child_ids') or []))
+        return tree
+
+
+    def read_structure_tree(self, model='', root_ids=[], fields=[], on_level=None):
+        ''' reads a whole generator or parser tree starting at the given root ids breadth-first, so each level
+            of the tree costs one request regardless of how many nodes it holds.
+            the records are returned in the same depth-first order the former recursive export produced them,
+            which keeps the exported json identical. on_level is called with the records of each level as
+            soon as it has been read'''
+        records = {}
+        level_ids = list(dict.fromkeys(root_ids))
+        depth = 0
+        while level_ids:
+            if self.verbosity > 1:
+                print(f"looking for and exporting {len(level_ids)} {model} records on level {depth}")
+            started = time.monotonic()
+            level_records = self.read_records_by_ids(model=model, rec_ids=level_ids, fields=fields)
+            self.stats.record_level(model=model, depth=depth, records=len(level_records),
+                                    seconds=time.monotonic() - started)
+            records.update(level_records)
+            if on_level:
+                on_level(level_records)
+            level_ids = self._get_next_level_ids(level_ids=level_ids, level_records=level_records, records=records)
+            depth += 1
+        return self._order_tree(records=records, root_ids=root_ids)
+
+
+    def read_generator_structures(self, generator_ids=[], fields=[], on_level=None):
+        return self.read_structure_tree(model="generate.data.structure", root_ids=generator_ids, fields=fields,
+                                        on_level=on_level)
 
 
     def read_language_mappings(self, mapping_ids=[], fields=[]):
-        language_mappings = {}
         if self.verbosity > 1:
             print(f"looking for and exporting the language.mapping with ids {mapping_ids}")
         if not mapping_ids:
             return {}
-        data = {
-            'model': "language.mapping",
-            'domain': json.dumps([['id', '=', mapping_ids]]),
-            'fields': json.dumps(fields),
-        }
-        response = self.odoo_api.execute('search_read', type="GET", data=data)
-        if response:
-            for language_mapping in response:
-                # the m2o to language would generally have different ids in other systems
-                # so get identifiable data from that model to be stored alongside the ids
-                lang_id = language_mapping.get('lang_id', None)
-                if lang_id:
-                    language_mapping['lang_id.code'] = self.get_lang_by_id(lang_id=lang_id)
-                language_mappings.update({language_mapping.get('id'): language_mapping})
-        return language_mappings
-
-
-    def read_parser_structure(self, parser_id=None, fields=[]):
-        parser_structures = {}
-        if self.verbosity > 1:
-            print(f"looking for and exporting the parse.data.structure with id {parser_id}")
-        data = {
-            'model': "parse.data.structure",
-            'domain': json.dumps([['id', '=', parser_id]]),
-            'fields': json.dumps(fields),
-            'limit': 1
-        }
-        response = self.odoo_api.execute('search_read', type="GET", data=data)
-        if response:
-            parser_structure = next(iter(response))
-            # the m2o to model, field and language would generally have different ids in other systems
-            # so get identifiable data from those models to be stored alongside the ids
-            model_id = parser_structure.get('odoo_model_id', None)
-            if model_id:
-                parser_structure['odoo_model_id.model'] = self.get_model_by_id(model_id=model_id)
-            field_id = parser_structure.get('field_id', None)
-            if field_id:
-                parser_structure['field_id.name'],  \
-                  parser_structure['field_id.model']  = self.get_field_by_id(field_id=field_id)
-            parser_structures = {parser_id: parser_structure}
-
-            # get all sub parser structures
-            for sub_parser_id in parser_structure.get('child_ids'):
-                parser_structures.update(self.read_parser_structure(parser_id=sub_parser_id))
-        return parser_structures
+        response = self.read_records_by_ids(model="language.mapping", rec_ids=mapping_ids, fields=fields)
+        # keep the order of the given ids, so the result doesn't depend on how the mappings were batched
+        return {mapping_id: response[mapping_id] for mapping_id in mapping_ids if mapping_id in response}
+
+
+    def read_parser_structures(self, parser_ids=[], fields=[], on_level=None):
+        return self.read_structure_tree(model="parse.data.structure", root_ids=parser_ids, fields=fields,
+                                        on_level=on_level)
+
+
+    def _fill_cache(self, cache={}, model='', rec_ids=[], fields=[]):
+        ''' reads all records of the given ids that are not cached yet with one request and adds them to the
+            cache. ids that could not be read are left out and will be looked up individually if needed'''
+        # the lock is held while reading, so parallel exports wait for each other's results instead of
+        # requesting the same references again
+        with self.cache_lock:
+            self._count_cache_lookup(cache_name=self._get_cache_name(cache), keys=list(dict.fromkeys(rec_ids)))
+            missing_ids = [rec_id for rec_id in dict.fromkeys(rec_ids) if rec_id not in cache]
+            if not missing_ids:
+                return
+            if self.verbosity > 2:
+                print(f"resolving {len(missing_ids)} references to {model} in one request")
+            cache.update(self.read_records_by_ids(model=model, rec_ids=missing_ids, fields=fields))
+
+
+    def _get_reference_ids(self, data_structures=[], generator_structures=[], language_mappings=[],
+                           parser_structures=[]):
+        ''' collects every distinct model, field, language and data structure referenced by the given records
+            and returns them per kind as the arguments of _fill_cache'''
+        def _ids(records, *field_names):
+            for record in records:
+                for field_name in field_names:
+                    value = record.get(field_name, False)
+                    if value:
+                        yield value[0] if type(value) in [list, tuple] else value
+
+        data_structures = list(data_structures)
+        generator_structures = list(generator_structures)
+        language_mappings = list(language_mappings)
+        parser_structures = list(parser_structures)
+        model_ids = list(_ids(data_structures, 'model_id')) + list(_ids(generator_structures, 'model_id')) + \
+                    list(_ids(parser_structures, 'odoo_model_id'))
+        field_ids = list(_ids(data_structures, 'filter_date_field_id')) + \
+                    list(_ids(generator_structures, 'filter_date_field_id')) + \
+                    list(_ids(parser_structures, 'field_id'))
+        lang_ids = list(_ids(generator_structures, 'lang_id')) + list(_ids(language_mappings, 'lang_id'))
+        structure_ids = list(_ids(data_structures, 'child_id'))
+        return [
+            {'cache': self.ir_model_cache, 'model': 'ir.model', 'rec_ids': model_ids,
+             'fields': ['id', 'name', 'model']},
+            {'cache': self.ir_model_fields_cache, 'model': 'ir.model.fields', 'rec_ids': field_ids,
+             'fields': ['id', 'name', 'model_id', 'model']},
+            {'cache': self.res_lang_cache, 'model': 'res.lang', 'rec_ids': lang_ids,
+             'fields': ['id', 'name', 'code']},
+            {'cache': self.data_structure_cache, 'model': 'data.structure', 'rec_ids': structure_ids,
+             'fields': ['id', 'name']},
+        ]
+
+
+    def resolve_references(self, data_structures=[], generator_structures=[], language_mappings=[],
+                           parser_structures=[]):
+        ''' collects every distinct model, field, language and data structure referenced by the given records
+            and resolves each kind with a single request, so that the get_*_by_id methods afterwards are
+            served from the caches'''
+        for fill in self._get_reference_ids(data_structures=data_structures,
+                                            generator_structures=generator_structures,
+                                            language_mappings=language_mappings,
+                                            parser_structures=parser_structures):
+            self._fill_cache(**fill)
+
+
+    async def read_records_by_ids_async(self, api=None, model='', rec_ids=[], fields=[]):
+        ''' async counterpart of read_records_by_ids using the given AsyncRestAPI'''
+        if not rec_ids:
+            return {}
+        data = self._get_read_data(model=model, rec_ids=rec_ids, fields=fields)
+        response = await api.execute('search_read', type="GET", data=data)
+        return {record.get('id'): record for record in response or []}
+
+
+    async def read_structure_tree_async(self, api=None, model='', root_ids=[], fields=[]):
+        ''' async counterpart of read_structure_tree, the nodes of a level are read in chunks that are all in
+            flight at the same time'''
+        records = {}
+        level_ids = list(dict.fromkeys(root_ids))
+        depth = 0
+        while level_ids:
+            if self.verbosity > 1:
+                print(f"looking for and exporting {len(level_ids)} {model} records on level {depth}")
+            chunks = [level_ids[i:i + self.async_chunk_size]
+                      for i in range(0, len(level_ids), self.async_chunk_size)]
+            level_records = {}
+            started = time.monotonic()
+            for chunk_records in await asyncio.gather(*[self.read_records_by_ids_async(api=api, model=model,
+                                                        rec_ids=chunk, fields=fields) for chunk in chunks]):
+                level_records.update(chunk_records)
+            self.stats.record_level(model=model, depth=depth, records=len(level_records),
+                                    seconds=time.monotonic() - started)
+            records.update(level_records)
+            level_ids = self._get_next_level_ids(level_ids=level_ids, level_records=level_records, records=records)
+            depth += 1
+        return self._order_tree(records=records, root_ids=root_ids)
+
+
+    async def _fill_cache_async(self, api=None, cache={}, model='', rec_ids=[], fields=[]):
+        with self.cache_lock:
+            self._count_cache_lookup(cache_name=self._get_cache_name(cache), keys=list(dict.fromkeys(rec_ids)))
+            missing_ids = [rec_id for rec_id in dict.fromkeys(rec_ids) if rec_id not in cache]
+        if not missing_ids:
+            return
+        if self.verbosity > 2:
+            print(f"resolving {len(missing_ids)} references to {model} in one request")
+        records = await self.read_records_by_ids_async(api=api, model=model, rec_ids=missing_ids, fields=fields)
+        with self.cache_lock:
+            cache.update(records)
+
+
+    async def read_structure_async(self, data_structure_name=None, export_meta=False, export_no_import=False):
+        ''' async counterpart of read_structure: the generator tree (followed by its language mappings) and the
+            parser tree are read at the same time, as are all kinds of references afterwards'''
+        export_fields = self._get_export_fields(export_meta=export_meta, export_no_import=export_no_import)
+        async with AsyncRestAPI(api=self.odoo_api, max_concurrency=self.max_concurrency) as api:
+            data = self._get_structure_search_data(data_structure_name=data_structure_name,
+                                                   fields=export_fields['data.structure'])
+            response = await api.execute('search_read', type="GET", data=data)
+            if not response:
+                if self.verbosity > 1:
+                    print('INFO: did not get any response, finishing')
+                return {}
+            data_structure_data = next(iter(response))
+
+            async def _read_generators_and_mappings():
+                generator_structures = await self.read_structure_tree_async(api=api,
+                        model="generate.data.structure", root_ids=data_structure_data.get('generator_ids') or [],
+                        fields=export_fields['generate.data.structure'])
+                mapping_ids = self._get_mapping_ids(generator_structures)
+                response = await self.read_records_by_ids_async(api=api, model="language.mapping",
+                        rec_ids=mapping_ids, fields=export_fields['language.mapping'])
+                language_mappings = {mapping_id: response[mapping_id] for mapping_id in mapping_ids
+                                     if mapping_id in response}
+                return generator_structures, language_mappings
+
+            (generator_structures, language_mappings), parser_structures = await asyncio.gather(
+                    _read_generators_and_mappings(),
+                    self.read_structure_tree_async(api=api, model="parse.data.structure",
+                        root_ids=data_structure_data.get('parser_ids') or [],
+                        fields=export_fields['parse.data.structure']))
+
+            await asyncio.gather(*[self._fill_cache_async(api=api, **fill) for fill in self._get_reference_ids(
+                                    data_structures=[data_structure_data],
+                                    generator_structures=generator_structures.values(),
+                                    language_mappings=language_mappings.values(),
+                                    parser_structures=parser_structures.values())])
+        return self._assemble_structure(data_structure_data=data_structure_data,
+                                        generator_structures=generator_structures,
+                                        language_mappings=language_mappings,
+                                        parser_structures=parser_structures)
+
+
+    def add_data_structure_references(self, data_structure_data={}):
+        child_id = data_structure_data.get('child_id', False)
+        if child_id:
+            data_structure_data['child_id.name'] = self.get_data_structure_by_id(data_structure_id=child_id)
+        model_id = data_structure_data.get('model_id', False)
+        if model_id:
+            data_structure_data['model_id.model'] = self.get_model_by_id(model_id=model_id)
+        field_id = data_structure_data.get('filter_date_field_id', False)
+        if field_id:
+            data_structure_data['filter_date_field_id.name'],  \
+              data_structure_data['filter_date_field_id.model']  = self.get_field_by_id(field_id=field_id)
+        return data_structure_data
+
+
+    def add_generator_references(self, generator_structure={}):
+        model_id = generator_structure.get('model_id', None)
+        if model_id:
+            generator_structure['model_id.model'] = self.get_model_by_id(model_id=model_id)
+        field_id = generator_structure.get('filter_date_field_id', None)
+        if field_id:
+            generator_structure['filter_date_field_id.name'],  \
+              generator_structure['filter_date_field_id.model']  = self.get_field_by_id(field_id=field_id)
+        lang_id = generator_structure.get('lang_id', None)
+        if lang_id:
+            generator_structure['lang_id.code'] = self.get_lang_by_id(lang_id=lang_id)
+        return generator_structure
+
+
+    def add_language_mapping_references(self, language_mapping={}):
+        lang_id = language_mapping.get('lang_id', None)
+        if lang_id:
+            language_mapping['lang_id.code'] = self.get_lang_by_id(lang_id=lang_id)
+        return language_mapping
+
+
+    def add_parser_references(self, parser_structure={}):
+        model_id = parser_structure.get('odoo_model_id', None)
+        if model_id:
+            parser_structure['odoo_model_id.model'] = self.get_model_by_id(model_id=model_id)
+        field_id = parser_structure.get('field_id', None)
+        if field_id:
+            parser_structure['field_id.name'],  \
+              parser_structure['field_id.model']  = self.get_field_by_id(field_id=field_id)
+        return parser_structure
 
 
     def get_record_id_by_domain(self, model='', domain=[]):
@@ -885,6 +2951,7 @@ class DataStructureSync:
             uses the cache to avoid multiple requests for the same data'''
         if not name:
             return False
+        self._count_cache_lookup(cache_name='data_structure_cache', keys=[name])
         if not name in self.data_structure_cache:
             self.data_structure_cache[name] = self.get_record_id_by_domain(model='data.structure',
                                                 domain=[['name', '=', name]])
@@ -899,6 +2966,7 @@ class DataStructureSync:
             uses the cache to avoid multiple requests for the same data'''
         if not model:
             return False
+        self._count_cache_lookup(cache_name='ir_model_cache', keys=[model])
         if not model in self.ir_model_cache:
             self.ir_model_cache[model] = self.get_record_id_by_domain(model='ir.model',
                                                 domain=[['model', '=', model]])
@@ -913,8 +2981,8 @@ class DataStructureSync:
         if not name or not model:
             return False
         field = f"{model}.{name}"
+        self._count_cache_lookup(cache_name='ir_model_fields_cache', keys=[field])
         if not field in self.ir_model_fields_cache:
-            model_id = self.get_model_id_by_model(model=model)
             self.ir_model_fields_cache[field] = self.get_record_id_by_domain(model='ir.model.fields',
                                                 domain=[['name','=',name],['model', '=', model]])
         if not self.ir_model_fields_cache[field]:
@@ -927,18 +2995,241 @@ class DataStructureSync:
             uses the cache to avoid multiple requests for the same data'''
         if not code:
             return False
+        self._count_cache_lookup(cache_name='res_lang_cache', keys=[code])
         if not code in self.res_lang_cache:
             self.res_lang_cache[code] = self.get_record_id_by_domain(model='res.lang',
                                                 domain=[['code', '=', code]])
         return self.res_lang_cache[code]
 
 
-    def create_structure(self, data_structure_name=None, data_file_name=None):
+    def get_record_ids_by_values(self, model='', key_field='', values=[]):
+        ''' takes a model, an identifying field and a list of its values to return a dict mapping each value
+            found on the target system to its record id, all values are looked up with one single search, the
+            result is read in pages'''
+        if not values:
+            return {}
+        if self.verbosity > 2:
+            print(f"query ids of {len(values)} records of model {model} by {key_field}")
+        return {record.get(key_field): record.get('id') for record in self.odoo_api.iter_search_read(model=model,
+                        domain=[[key_field, 'in', list(values)]], fields=['id', key_field], page_size=self.page_size)}
+
+
+    def resolve_target_references(self, data_structure={}):
+        ''' scans the loaded data once for every model, field, language and data structure referenced and
+            looks up their ids on the target system with one request per kind, filling the caches used by the
+            get_*_id_by_* methods while building the structure.
+            missing models, fields and data structures are reported all at once and abort the import, missing
+            languages are only reported as they have never stopped an import'''
+        models, fields, langs, names = {}, {}, {}, {}
+
+        def _collect(record, model_key=None, field_key=None, lang_key=None, name_key=None):
+            if model_key and record.get(model_key):
+                models[record[model_key]] = True
+            if field_key and record.get(f"{field_key}.name") and record.get(f"{field_key}.model"):
+                fields[(record[f"{field_key}.model"], record[f"{field_key}.name"])] = True
+            if lang_key and record.get(lang_key):
+                langs[record[lang_key]] = True
+            if name_key and record.get(name_key):
+                names[record[name_key]] = True
+
+        _collect(data_structure.get('data_structure', {}), model_key='model_id.model',
+                 field_key='filter_date_field_id', name_key='child_id.name')
+        for generator_structure in (data_structure.get('generator_structures') or {}).values():
+            _collect(generator_structure, model_key='model_id.model', field_key='filter_date_field_id',
+                     lang_key='lang_id.code')
+        for language_mapping in (data_structure.get('language_mappings') or {}).values():
+            _collect(language_mapping, lang_key='lang_id.code')
+        for parser_structure in (data_structure.get('parser_structures') or {}).values():
+            _collect(parser_structure, model_key='odoo_model_id.model', field_key='field_id')
+
+        self._count_cache_lookup(cache_name='ir_model_cache', keys=list(models))
+        self._count_cache_lookup(cache_name='ir_model_fields_cache', keys=[f"{f[0]}.{f[1]}" for f in fields])
+        self._count_cache_lookup(cache_name='res_lang_cache', keys=list(langs))
+        self._count_cache_lookup(cache_name='data_structure_cache', keys=list(names))
+        models = [m for m in models if m not in self.ir_model_cache]
+        fields = [f for f in fields if f"{f[0]}.{f[1]}" not in self.ir_model_fields_cache]
+        langs = [l for l in langs if l not in self.res_lang_cache]
+        names = [n for n in names if n not in self.data_structure_cache]
+        if self.verbosity > 1:
+            print(f"resolving {len(models)} models, {len(fields)} fields, {len(langs)} languages and "
+                  f"{len(names)} data structures on the target system")
+
+        self.ir_model_cache.update(self.get_record_ids_by_values(model='ir.model', key_field='model',
+                                                                 values=models))
+        if fields:
+            # one search for the fields of all models - the resulting superset is narrowed down locally
+            response = self.odoo_api.iter_search_read(model='ir.model.fields',
+                            domain=[['model', 'in', list({f[0] for f in fields})],
+                                    ['name', 'in', list({f[1] for f in fields})]],
+                            fields=['id', 'name', 'model'], page_size=self.page_size)
+            wanted = set(fields)
+            self.ir_model_fields_cache.update({f"{r.get('model')}.{r.get('name')}": r.get('id')
+                            for r in response if (r.get('model'), r.get('name')) in wanted})
+        self.res_lang_cache.update(self.get_record_ids_by_values(model='res.lang', key_field='code',
+                                                                 values=langs))
+        self.data_structure_cache.update(self.get_record_ids_by_values(model='data.structure', key_field='name',
+                                                                       values=names))
+
+        # everything not found is cached as such, so it won't be looked up again one by one
+        missing_models = [m for m in models if not self.ir_model_cache.setdefault(m, False)]
+        missing_fields = [f"{f[0]}.{f[1]}" for f in fields
+                          if not self.ir_model_fields_cache.setdefault(f"{f[0]}.{f[1]}", False)]
+        missing_langs = [l for l in langs if not self.res_lang_cache.setdefault(l, False)]
+        missing_names = [n for n in names if not self.data_structure_cache.setdefault(n, False)]
+        if missing_langs:
+            print(f"WARNING: on the target system no id for the languages {', '.join(missing_langs)} could be "
+                   "found, generators and language mappings using them will be created without a language")
+        if missing_models or missing_fields or missing_names:
+            raise Exception("ERROR: on the target system the following references could not be found, aborting:"
+                            + (f"\n  models: {', '.join(missing_models)}" if missing_models else "")
+                            + (f"\n  fields: {', '.join(missing_fields)}" if missing_fields else "")
+                            + (f"\n  data structures: {', '.join(missing_names)}" if missing_names else ""))
+        return True
+
+
+    def load_data_file(self, data_file_name=None, lazy=False):
+        ''' reads a data structure stored in the json file, returns False if it doesn't hold one.
+            lazy reads the file piece by piece and keeps the generators, language mappings and parsers as
+            LazyRecords, which are only decoded when they are used. columnar data files (see ColumnarDataFile)
+            are recognized by their extension and always loaded in whole, they are small and fast to decode'''
+        if not(data_file_name):
+            data_file_name = self.data_file_name
+        if not(data_file_name):
+            raise Exception("ERROR: no data file given")
+        columnar = ColumnarDataFile.is_columnar(data_file_name)
+        if columnar:
+            data_structure = ColumnarDataFile(file_name=data_file_name).load()
+        else:
+            with open(data_file_name) as data_structure_file:
+                if lazy:
+                    data_structure = DataFileScanner(stream=data_structure_file, lazy_keys=['generator_structures',
+                                                     'language_mappings', 'parser_structures']).load()
+                else:
+                    data_structure = json.load(data_structure_file)
+        if not data_structure:
+            raise Exception(f"ERROR: could not load data structure from file {data_file_name}. aborting.")
+        if self.verbosity > 1 and (lazy or columnar):
+            print(f"Loaded data structure {data_structure.get('data_structure', {}).get('name')} with "
+                  f"{len(data_structure.get('generator_structures') or {})} generators, "
+                  f"{len(data_structure.get('language_mappings') or {})} language mappings and "
+                  f"{len(data_structure.get('parser_structures') or {})} parsers")
+        elif self.verbosity > 1:
+            print("Loaded data:")
+            pprint(data_structure)
+        if not 'data_structure' in data_structure:
+            print(f"ERROR: could not find data_structure in data from {data_file_name}, aborting.")
+            return False
+        return data_structure
+
+
+    def validate_data_structure(self, data_structure={}):
+        ''' checks loaded data before it is sent anywhere, returns the problems found: generators, language
+            mappings and parsers referenced but missing in the data'''
+        if not data_structure.get('data_structure'):
+            return ["there is no data_structure in the data"]
+        problems = []
+        generator_structures = data_structure.get('generator_structures') or {}
+        language_mappings = data_structure.get('language_mappings') or {}
+        parser_structures = data_structure.get('parser_structures') or {}
+
+        def _check(owner, ids, records, kind):
+            missing = [str(i) for i in ids or [] if str(i) not in records]
+            if missing:
+                problems.append(f"{owner} references the missing {kind} {', '.join(missing)}")
+
+        _check('the data structure', data_structure['data_structure'].get('generator_ids'), generator_structures,
+               'generators')
+        _check('the data structure', data_structure['data_structure'].get('parser_ids'), parser_structures,
+               'parsers')
+        for generator_id, generator_structure in generator_structures.items():
+            _check(f"generator {generator_id}", generator_structure.get('child_ids'), generator_structures,
+                   'generators')
+            _check(f"generator {generator_id}", generator_structure.get('lang_mapping_ids'), language_mappings,
+                   'language mappings')
+        for parser_id, parser_structure in parser_structures.items():
+            _check(f"parser {parser_id}", parser_structure.get('child_ids'), parser_structures, 'parsers')
+        return problems
+
+
+    def _get_data_structure_values(self, record={}):
+        ''' the values of a stored data structure for the target system, without the o2m'''
+        # start with the simple fields
+        data_structure_values = {k: v for k, v in record.items() if k in self.data_structure_fields_simple}
+
+        # the m2o fields need the record ids of the target system, so those have to be obtained if set
+        child_name = record.get('child_id.name', False)
+        if child_name:
+            data_structure_values['child_id'] = self.get_data_structure_id_by_name(name=child_name)
+        field_name = record.get('filter_date_field_id.name', False)
+        field_model = record.get('filter_date_field_id.model', False)
+        if field_name and field_model:
+            data_structure_values['filter_date_field_id'] = self.get_field_id_by_name_model( \
+                                                             name=field_name, model=field_model)
+        model_model = record.get('model_id.model', False)
+        if model_model:
+            data_structure_values['model_id'] = self.get_model_id_by_model(model=model_model)
+        return data_structure_values
+
+
+    def _get_generator_values(self, record={}):
+        ''' the values of a stored generator for the target system, without the o2m'''
+        # the simple fields are added as stored
+        generator_structure = {k: v for k, v in record.items() if k in self.generator_structure_fields_simple}
+
+        # the m2o fields need the record ids of the target system, so those have to be obtained if set
+        field_name = record.get('filter_date_field_id.name', False)
+        field_model = record.get('filter_date_field_id.model', False)
+        if field_name and field_model:
+            generator_structure['filter_date_field_id'] = self.get_field_id_by_name_model( \
+                            name=field_name, model=field_model)
+        lang_code = record.get('lang_id.code', False)
+        if lang_code:
+            generator_structure['lang_id'] = self.get_lang_id_by_code(code=lang_code)
+        model_model = record.get('model_id.model', False)
+        if model_model:
+            generator_structure['model_id'] = self.get_model_id_by_model(model=model_model)
+        return generator_structure
+
+
+    def _get_language_mapping_values(self, record={}):
+        ''' the values of a stored language mapping for the target system'''
+        return {
+            'keyword': record['keyword'],
+            'lang_id': self.get_lang_id_by_code(code=record.get('lang_id.code', False)),
+        }
+
+
+    def _get_parser_values(self, record={}):
+        ''' the values of a stored parser for the target system, without the o2m'''
+        # the simple fields are added as stored
+        parser_structure = {k: v for k, v in record.items() if k in self.parser_structure_fields_simple}
+
+        # the m2o fields need the record ids of the target system, so those have to be obtained if set
+        field_name = record.get('field_id.name', False)
+        field_model = record.get('field_id.model', False)
+        if field_name and field_model:
+            parser_structure['field_id'] = self.get_field_id_by_name_model( \
+                            name=field_name, model=field_model)
+        model_model = record.get('odoo_model_id.model', False)
+        if model_model:
+            parser_structure['odoo_model_id'] = self.get_model_id_by_model(model=model_model)
+        return parser_structure
+
+
+    def create_structure(self, data_structure_name=None, data_file_name=None, chunk_size=None, resume=False,
+                         data_structure=None):
+        ''' creates a new data structure from the data file with one create request, or in chunks of at most
+            chunk_size records per request (defaults to the create_chunk_size of the connection), see
+            create_structure_chunked. resume continues a chunked create that has stopped midway, using the
+            progress recorded to the journal if one is open, and skips a create the journal has as completed.
+            the data can be given already loaded from the file as data_structure'''
+        if chunk_size is None:
+            chunk_size = self.create_chunk_size
         if not(data_structure_name):
             raise Exception("WARNING: no data structure name given - will use the one found in the data")
         if not(data_file_name):
             data_file_name = self.data_file_name
-        if not(data_file_name):
+        if not(data_file_name) and data_structure is None:
             raise Exception("ERROR: no data file given")
 
         # first check if the data structure with the given name already exists.
@@ -953,22 +3244,26 @@ class DataStructureSync:
             'limit': 1
         }
         response = self.odoo_api.execute('search_read', type="GET", data=data)
-        if response:
+        target_data = next(iter(response)) if response else None
+        journal_entries = self.journal.find(op='create', structure=data_structure_name, file=data_file_name) \
+                            if resume and self.journal and target_data else []
+        if [e for e in journal_entries if e['event'] == 'done' and e.get('target_id') == target_data['id']]:
+            print(f"INFO: the data structure {data_structure_name} has already been created with id "
+                  f"{target_data['id']}, skipping it")
+            return target_data['id']
+        if response and not (resume and chunk_size):
             print(f"ERROR: There is already an existing data.structure named {data_structure_name}, "
                    "no other structure can be created with that name. Consider changing the name or"
                    "using the update function if so desired.")
             return False
 
-        # read data file
-        with open(data_file_name) as data_structure_file:    
-            data_structure = json.load(data_structure_file)
-            if not data_structure:
-                raise Exception(f"ERROR: could not load data structure from file {data_file_name}. aborting.")
-        if self.verbosity > 1:
-            print("Loaded data:")
-            pprint(data_structure)
-        if not 'data_structure' in data_structure:
-            print(f"ERROR: could not find data_structure in data from {data_file_name}, aborting.")
+        # read data file, the records are only decoded as they are needed
+        data_structure = data_structure or self.load_data_file(data_file_name=data_file_name, lazy=True)
+        if not data_structure:
+            return False
+
+        # look up all the records referenced by the data on the target system before building the structure
+        self.resolve_target_references(data_structure=data_structure)
 
         ''' general idea on how to process the read data to create the structure:
             directly create the whole structure for one create call to in Odoo by making use of the Odoo
@@ -994,57 +3289,358 @@ class DataStructureSync:
             processes would be needed;
             meta and no-import fields are not imported'''
 
-        # start with the simple fields
-        data_structure_values = {k: v for k, v in data_structure['data_structure'].items() \
-                                        if k in self.data_structure_fields_simple}
+        # start with the simple and m2o fields, for the latter the ids of the target system are used
+        data_structure_values = self._get_data_structure_values(data_structure['data_structure'])
 
-        # the m2o fields need the record ids of the target system, so those have to be obtained if set
-        child_name = data_structure['data_structure'].get('child_id.name', False)
-        if child_name:
-            data_structure_values['child_id'] = self.get_data_structure_id_by_name(name=child_name)
-        field_name = data_structure['data_structure'].get('filter_date_field_id.name', False)
-        field_model = data_structure['data_structure'].get('filter_date_field_id.model', False)
-        if field_name and field_model:
-            data_structure_values['filter_date_field_id'] = self.get_field_id_by_name_model( \
-                                                             name=field_name, model=field_model)
-        model_model = data_structure['data_structure'].get('model_id.model', False)
-        if model_model:
-            data_structure_values['model_id'] = self.get_model_id_by_model(model=model_model)
-
-        # the o2m relations are added by adding the tuples with the instruction, id and data
+        # the o2m relations are added by adding the tuples with the instruction, id and data. they are not built
+        # in memory but written to the request while it is sent, see iter_structure_json
         data_structure_values.update({k: [] for k in self.data_structure_fields_o2m})
-        if 'generator_structures' in data_structure and data_structure['generator_structures']:
-            for generator_id in data_structure['data_structure'].get('generator_ids', []):
-                data_structure_values['generator_ids'] += [(0, 0, 
-                                self.create_generator_tuple(generator_id=str(generator_id), 
-                                generator_structures=data_structure['generator_structures'],
-                                language_mappings=data_structure['language_mappings'])
-                                )]
-        if 'parser_structures' in data_structure and data_structure['parser_structures']:
-            for parser_id in data_structure['data_structure'].get('parser_ids', []):
-                data_structure_values['parser_ids'] += [(0, 0, 
-                                self.create_parser_tuple(parser_id=str(parser_id), 
-                                parser_structures=data_structure['parser_structures'])
-                                )]
 
         # setting the required new name
         if data_structure_name:
             data_structure_values['name'] = data_structure_name
+        if chunk_size:
+            journal_nodes = None
+            if [e for e in journal_entries if e['event'] == 'root' and e.get('target_id') == target_data['id']]:
+                journal_nodes = {(e['kind'], source_id): e.get('target_id') for e in journal_entries
+                                 if e['event'] == 'write' and e.get('root_id') == target_data['id']
+                                 for source_id in e['source_ids']}
+            return self.create_structure_chunked(data_structure=data_structure,
+                        data_structure_values=data_structure_values, chunk_size=chunk_size, target_data=target_data,
+                        data_file_name=data_file_name, journal_nodes=journal_nodes)
 
         # this should be directly creatable in Odoo
         if self.verbosity > 1:
             print(f"now creating new data structure {data_structure_name} with the following values:")
             pprint(data_structure_values)
-        data = {
-            'model': "data.structure",
-            'values': json.dumps(data_structure_values),
-        }
-        response = self.odoo_api.execute('create', type="POST", data=data)
+            print(f"and {len(data_structure['data_structure'].get('generator_ids', []))} generators and "
+                  f"{len(data_structure['data_structure'].get('parser_ids', []))} parsers as o2m commands")
+        data = StreamingFormBody(fields={'model': "data.structure"}, streams={
+            'values': lambda: self.iter_structure_json(data_structure=data_structure,
+                                                       data_structure_values=data_structure_values),
+        })
+        response = self._send_structure_create(data=data, data_structure_name=data_structure_values.get('name'))
         if response:
             print(f"Result: a new data structure has been created with id {response}")
+            if self.journal:
+                self.journal.record(op='create', event='done', structure=data_structure_name, file=data_file_name,
+                                    target_id=response[0] if isinstance(response, list) else response)
+            return response
+        print("WARNING: there seems to have been a problem creating the structure in Odoo, "
+              "check the previous messages or increase verbosity.")
+        return False
+
+
+    def _send_structure_create(self, data={}, data_structure_name=None, existing_ids=[]):
+        # creating the structure twice would be worse than failing, so a failed create is only sent again as
+        # long as no new structure with its name has turned up in the meantime. the callers have already made
+        # sure there is none with the name (or know the existing_ids), so the search is only sent on a retry
+        def _get_created_ids():
+            search_data = {
+                'model': "data.structure",
+                'domain': json.dumps([['name', '=', data_structure_name]]),
+            }
+            return [i for i in self.odoo_api.execute('search', type="GET", data=search_data) or []
+                    if i not in existing_ids]
+
+        return self.odoo_api.execute('create', type="POST", data=data, retry_check=_get_created_ids)
+
+
+    def create_structure_chunked(self, data_structure={}, data_structure_values={}, chunk_size=1000,
+                                 target_data=None, data_file_name=None, journal_nodes=None):
+        ''' creates the data structure without its generators and parsers first, then attaches their trees
+            with writes of (0, 0, {values}) commands on the o2m of their parents, each write holding at most
+            chunk_size records (generators, language mappings and parsers): as many whole subtrees as fit, a
+            subtree too large for one write has its root node written alone and its children attached the same
+            way. so no single request gets too large or takes too long.
+            with the target_data of a data structure created that way but not finished, the creation is resumed:
+            its trees are read and matched to the stored ones by position, as the children of every parent are
+            created in the stored order (and each write is all or nothing), then only what is missing is added.
+            with the journal_nodes, the nodes the journal has recorded as written mapped to their target ids, the
+            trees aren't read, only the children of the parents still missing some are checked'''
+        counts = {'create': 0, 'write': 0}
+        data_structure_name = data_structure_values.get('name')
+        if target_data and journal_nodes is not None:
+            root_id = target_data['id']
+            print(f"INFO: resuming the creation of the data structure {data_structure_name} with id {root_id} "
+                  f"after the {len(journal_nodes)} records written according to the journal")
+            target_data = {'generator_ids': None, 'parser_ids': None}
+            target_trees = {'generator': {}, 'parser': {}}
+        elif target_data:
+            root_id = target_data['id']
+            print(f"INFO: resuming the creation of the data structure {data_structure_name} with id {root_id}")
+            target_trees = {
+                'generator': self.read_structure_tree(model='generate.data.structure',
+                                    root_ids=target_data.get('generator_ids') or [], fields=['child_ids']),
+                'parser': self.read_structure_tree(model='parse.data.structure',
+                                    root_ids=target_data.get('parser_ids') or [], fields=['child_ids']),
+            }
+        else:
+            if self.verbosity > 1:
+                print(f"now creating new data structure {data_structure_name} with the following values:")
+                pprint(data_structure_values)
+            data = {
+                'model': "data.structure",
+                'values': json.dumps(data_structure_values),
+            }
+            response = self._send_structure_create(data=data, data_structure_name=data_structure_name)
+            if not response:
+                print("WARNING: there seems to have been a problem creating the structure in Odoo, "
+                      "check the previous messages or increase verbosity.")
+                return False
+            root_id = response[0] if isinstance(response, list) else response
+            counts['create'] += 1
+            target_data = {'generator_ids': [], 'parser_ids': []}
+            target_trees = {'generator': {}, 'parser': {}}
+        journal_entry = {'op': 'create', 'structure': data_structure_name, 'file': data_file_name, 'root_id': root_id}
+        if self.journal and counts['create']:
+            self.journal.record(event='root', target_id=root_id, **journal_entry)
+
+        for kind, records_key, o2m_field in [('generator', 'generator_structures', 'generator_ids'),
+                                             ('parser', 'parser_structures', 'parser_ids')]:
+            if not data_structure.get(records_key):
+                continue
+            source_ids = [str(i) for i in data_structure['data_structure'].get(o2m_field, [])]
+            sizes, children = self._get_subtree_sizes(records=data_structure[records_key], root_ids=source_ids,
+                                                      count_mappings=kind == 'generator')
+            target_ids = target_data[o2m_field] if journal_nodes is not None else target_data.get(o2m_field) or []
+            self._attach_subtrees(kind=kind, parent=('data.structure', root_id, o2m_field), source_ids=source_ids,
+                                  target_ids=target_ids, target_tree=target_trees[kind], sizes=sizes,
+                                  children=children, data_structure=data_structure, chunk_size=chunk_size,
+                                  counts=counts, journal_nodes=journal_nodes, journal_entry=journal_entry)
+        if self.journal:
+            self.journal.record(event='done', target_id=root_id, **journal_entry)
+        print(f"Result: the data structure {data_structure_name} with id {root_id} has been created with "
+              f"{counts['create']} create and {counts['write']} write requests")
+        return root_id
+
+
+    def _get_subtree_sizes(self, records={}, root_ids=[], count_mappings=False):
+        ''' returns the number of records in the subtree of every node and the child ids of every node'''
+        sizes, children = {}, {}
+        order = []
+        stack = list(reversed(root_ids))
+        while stack:
+            rec_id = stack.pop()
+            if rec_id in children or rec_id not in records:
+                continue
+            record = records[rec_id]
+            children[rec_id] = [str(i) for i in record.get('child_ids', [])]
+            sizes[rec_id] = 1 + (len(record.get('lang_mapping_ids', [])) if count_mappings else 0)
+            order.append(rec_id)
+            stack.extend(reversed(children[rec_id]))
+        # children come after their parents in the depth-first order, so they are summed up first
+        for rec_id in reversed(order):
+            sizes[rec_id] += sum(sizes.get(child_id, 1) for child_id in children[rec_id])
+        return sizes, children
+
+
+    def _get_child_ids(self, kind='', parent=()):
+        ''' returns the ids of the records on the o2m of the parent (model, id, field) in the order of creation'''
+        model = 'generate.data.structure' if kind == 'generator' else 'parse.data.structure'
+        if parent[0] == 'data.structure':
+            domain = [['structure_id', '=', parent[1]], ['parent_id', '=', False]]
+        else:
+            domain = [['parent_id', '=', parent[1]]]
+        data = {
+            'model': model,
+            'domain': json.dumps(domain),
+        }
+        return sorted(self.odoo_api.execute('search', type="GET", data=data) or [])
+
+
+    def _write_subtrees(self, kind='', parent=(), source_ids=[], known_count=0, data_structure={},
+                        with_children=True):
+        ''' writes the given stored nodes as new records on the o2m of the parent (model, id, field) which has
+            known_count records on it so far, returns something falsy if the write failed'''
+        if self.verbosity > 1:
+            print(f"adding {len(source_ids)} {kind}s{'' if with_children else ' without children'} to "
+                  f"{parent[0]} {parent[1]}")
+        if kind == 'generator':
+            iter_json = lambda source_id: self.iter_generator_json(generator_id=source_id,
+                            generator_structures=data_structure['generator_structures'],
+                            language_mappings=data_structure['language_mappings'], with_children=with_children)
         else:
-            print("WARNING: there seems to have been a problem creating the structure in Odoo, "
-                  "check the previous messages or increase verbosity.")
+            iter_json = lambda source_id: self.iter_parser_json(parser_id=source_id,
+                            parser_structures=data_structure['parser_structures'], with_children=with_children)
+        data = StreamingFormBody(fields={'model': parent[0], 'ids': json.dumps([parent[1]])}, streams={
+            'values': lambda: self._iter_values_json(values={parent[2]: []}, o2m_chunks={
+                            parent[2]: self._iter_create_commands_json(iter_json(i) for i in source_ids)}),
+        })
+        # like the create, a failed write is only sent again as long as it hasn't added the records after all
+        return self.odoo_api.execute('write', type="PUT", data=data, retry_check=lambda:
+                                     self._get_child_ids(kind=kind, parent=parent)[known_count:])
+
+
+    def _attach_subtrees(self, kind='', parent=(), source_ids=[], target_ids=[], target_tree={}, sizes={},
+                         children={}, data_structure={}, chunk_size=1000, counts={}, journal_nodes=None,
+                         journal_entry={}):
+        ''' adds the subtrees of the stored nodes to the parent (model, id, field) in batches of at most
+            chunk_size records, skipping the nodes the target already has (see create_structure_chunked).
+            the target_ids are None when resuming from the journal_nodes'''
+        model = 'generate.data.structure' if kind == 'generator' else 'parse.data.structure'
+        from_journal = target_ids is None
+        if from_journal:
+            target_ids = [journal_nodes[(kind, i)]
+                          for i in itertools.takewhile(lambda i: (kind, i) in journal_nodes, source_ids)]
+            if len(target_ids) < len(source_ids):
+                child_ids = self._get_child_ids(kind=kind, parent=parent)
+                if len(child_ids) != len(target_ids):
+                    # the journal has missed a write, so the parent's children are matched by position
+                    print(f"WARNING: the {kind}s of {parent[0]} {parent[1]} don't match the journal, they are "
+                          "matched by position instead")
+                    from_journal = False
+                    target_ids = child_ids
+                    target_tree.update(self.read_structure_tree(model=model, root_ids=child_ids,
+                                                                fields=['child_ids']))
+        target_ids = target_ids if from_journal else sorted(target_ids)
+        if len(target_ids) > len(source_ids):
+            raise Exception(f"ERROR: {parent[0]} {parent[1]} has more {kind}s than the stored data, the existing "
+                            "data structure can't be the one created from it. aborting.")
+        # the nodes already there are complete, unless they have been written without children
+        for source_id, target_id in zip(source_ids, target_ids):
+            if from_journal and not target_id:
+                continue
+            self._attach_subtrees(kind=kind, parent=(model, target_id, 'child_ids'),
+                                  source_ids=children.get(source_id, []),
+                                  target_ids=None if from_journal else
+                                             (target_tree.get(target_id) or {}).get('child_ids') or [],
+                                  target_tree=target_tree, sizes=sizes, children=children,
+                                  data_structure=data_structure, chunk_size=chunk_size, counts=counts,
+                                  journal_nodes=journal_nodes, journal_entry=journal_entry)
+        known_count = len(target_ids)
+        batch, batch_size = [], 0
+        for source_id in source_ids[len(target_ids):] + [None]:
+            size = sizes.get(source_id, 1)
+            alone = source_id is not None and size > chunk_size and children.get(source_id)
+            if batch and (source_id is None or alone or batch_size + size > chunk_size):
+                if not self._write_subtrees(kind=kind, parent=parent, source_ids=batch, known_count=known_count,
+                                            data_structure=data_structure):
+                    raise Exception(f"ERROR: could not add {len(batch)} {kind}s to {parent[0]} {parent[1]}, "
+                                    "resume the creation once the problem is solved. aborting.")
+                counts['write'] += 1
+                known_count += len(batch)
+                if self.journal:
+                    self.journal.record(event='write', kind=kind, parent=list(parent), source_ids=batch,
+                                        target_id=None, **journal_entry)
+                batch, batch_size = [], 0
+            if source_id is None:
+                break
+            if not alone:
+                batch.append(source_id)
+                batch_size += size
+                continue
+            # too large for one write: the node goes alone, its children are attached to it afterwards
+            if not self._write_subtrees(kind=kind, parent=parent, source_ids=[source_id], known_count=known_count,
+                                        data_structure=data_structure, with_children=False):
+                raise Exception(f"ERROR: could not add the {kind} {source_id} to {parent[0]} {parent[1]}, "
+                                "resume the creation once the problem is solved. aborting.")
+            counts['write'] += 1
+            new_ids = self._get_child_ids(kind=kind, parent=parent)
+            if len(new_ids) <= known_count:
+                raise Exception(f"ERROR: the {kind} {source_id} added to {parent[0]} {parent[1]} could not be "
+                                "found. aborting.")
+            known_count += 1
+            if self.journal:
+                self.journal.record(event='write', kind=kind, parent=list(parent), source_ids=[source_id],
+                                    target_id=new_ids[known_count - 1], **journal_entry)
+            self._attach_subtrees(kind=kind, parent=(model, new_ids[known_count - 1], 'child_ids'),
+                                  source_ids=children[source_id], target_ids=[], target_tree=target_tree,
+                                  sizes=sizes, children=children, data_structure=data_structure,
+                                  chunk_size=chunk_size, counts=counts, journal_nodes=journal_nodes,
+                                  journal_entry=journal_entry)
+
+
+    def _iter_values_json(self, values={}, o2m_chunks={}):
+        ''' yields the json text of the values just like json.dumps would write it, but with the o2m fields
+            given as iterables of their json text'''
+        yield '{'
+        for i, (key, value) in enumerate(values.items()):
+            yield (', ' if i else '') + json.dumps(key) + ': '
+            if key in o2m_chunks:
+                yield from o2m_chunks[key]
+            else:
+                yield json.dumps(value)
+        yield '}'
+
+
+    def _iter_create_commands_json(self, values_chunks=[]):
+        ''' yields the json text of a list of (0, 0, values) commands, with the values as iterables of text'''
+        yield '['
+        for i, chunks in enumerate(values_chunks):
+            yield ', [0, 0, ' if i else '[0, 0, '
+            yield from chunks
+            yield ']'
+        yield ']'
+
+
+    def iter_generator_json(self, generator_id=None, generator_structures={}, language_mappings={},
+                            with_children=True):
+        ''' streaming counterpart of create_generator_tuple, yields the json text of the generator's values.
+            without children only the generator and its language mappings are included'''
+        if self.verbosity > 2:
+            print(f"iter_generator_json: build generator {generator_id}")
+        if not generator_id or not generator_structures or not generator_id in generator_structures:
+            print(f"WARNING: iter_generator_json: missing data for generator_id {generator_id}")
+            yield '[]'
+            return
+        record = generator_structures[generator_id]
+        generator_structure = self._get_generator_values(record)
+        generator_structure.update({k: [] for k in self.generator_structure_fields_o2m})
+        language_mapping_values = []
+        for language_mapping in record.get('lang_mapping_ids', []):
+            language_mapping = language_mappings[str(language_mapping)]
+            if language_mapping.get('lang_id.code', False):
+                language_mapping_values.append([json.dumps(self._get_language_mapping_values(language_mapping))])
+        child_ids = record.get('child_ids', []) if with_children else []
+        del record
+        yield from self._iter_values_json(values=generator_structure, o2m_chunks={
+            'lang_mapping_ids': self._iter_create_commands_json(language_mapping_values),
+            'child_ids': self._iter_create_commands_json(
+                            self.iter_generator_json(generator_id=str(child_id),
+                                                     generator_structures=generator_structures,
+                                                     language_mappings=language_mappings)
+                            for child_id in child_ids),
+        })
+
+
+    def iter_parser_json(self, parser_id=None, parser_structures={}, with_children=True):
+        ''' streaming counterpart of create_parser_tuple, yields the json text of the parser's values.
+            without children only the parser itself is included'''
+        if self.verbosity > 2:
+            print(f"iter_parser_json: build parser {parser_id}")
+        if not parser_id or not parser_structures or not parser_id in parser_structures:
+            print(f"WARNING: iter_parser_json: missing data for parser_id {parser_id}")
+            yield '[]'
+            return
+        record = parser_structures[parser_id]
+        parser_structure = self._get_parser_values(record)
+        parser_structure.update({k: [] for k in self.parser_structure_fields_o2m})
+        child_ids = record.get('child_ids', []) if with_children else []
+        del record
+        yield from self._iter_values_json(values=parser_structure, o2m_chunks={
+            'child_ids': self._iter_create_commands_json(
+                            self.iter_parser_json(parser_id=str(child_id), parser_structures=parser_structures)
+                            for child_id in child_ids),
+        })
+
+
+    def iter_structure_json(self, data_structure={}, data_structure_values={}):
+        ''' yields the json text of the values to create the whole data structure with, the same text json.dumps
+            writes for the values create_structure used to build in memory'''
+        o2m_chunks = {}
+        if data_structure.get('generator_structures'):
+            o2m_chunks['generator_ids'] = self._iter_create_commands_json(
+                            self.iter_generator_json(generator_id=str(generator_id),
+                                                     generator_structures=data_structure['generator_structures'],
+                                                     language_mappings=data_structure['language_mappings'])
+                            for generator_id in data_structure['data_structure'].get('generator_ids', []))
+        if data_structure.get('parser_structures'):
+            o2m_chunks['parser_ids'] = self._iter_create_commands_json(
+                            self.iter_parser_json(parser_id=str(parser_id),
+                                                  parser_structures=data_structure['parser_structures'])
+                            for parser_id in data_structure['data_structure'].get('parser_ids', []))
+        yield from self._iter_values_json(values=data_structure_values, o2m_chunks=o2m_chunks)
 
 
     def create_generator_tuple(self, generator_id=None, generator_structures={}, language_mappings={}):
@@ -1054,34 +3650,17 @@ class DataStructureSync:
         if not generator_id or not generator_structures or not generator_id in generator_structures:
             print(f"WARNING: create_generator_tuple: missing data for generator_id {generator_id}")
             return []
-        # the simple fields are added as stored
-        generator_structure = {k: v for k, v in generator_structures[generator_id].items() 
-                                        if k in self.generator_structure_fields_simple}
-
-        # the m2o fields need the record ids of the target system, so those have to be obtained if set
-        field_name = generator_structures[generator_id].get('filter_date_field_id.name', False)
-        field_model = generator_structures[generator_id].get('filter_date_field_id.model', False)
-        if field_name and field_model:
-            generator_structure['filter_date_field_id'] = self.get_field_id_by_name_model( \
-                            name=field_name, model=field_model)
-        lang_code = generator_structures[generator_id].get('lang_id.code', False)
-        if lang_code:
-            generator_structure['lang_id'] = self.get_lang_id_by_code(code=lang_code)
-        model_model = generator_structures[generator_id].get('model_id.model', False)
-        if model_model:
-            generator_structure['model_id'] = self.get_model_id_by_model(model=model_model)
+        # the simple fields are added as stored, the m2o fields with the record ids of the target system
+        generator_structure = self._get_generator_values(generator_structures[generator_id])
 
         # for the o2m first empty lists are added, to populate them next
         generator_structure.update({k: [] for k in self.generator_structure_fields_o2m})
 
         # for the language mapping o2m new records are added using the tuples
         for language_mapping in generator_structures[generator_id].get('lang_mapping_ids', []):
-            lang_code = language_mappings[str(language_mapping)].get('lang_id.code', False)
-            if lang_code:
-                generator_structure['lang_mapping_ids'] += [(0, 0, {
-                            'keyword': language_mappings[str(language_mapping)]['keyword'],
-                            'lang_id': self.get_lang_id_by_code(code=lang_code),
-                            })]
+            if language_mappings[str(language_mapping)].get('lang_id.code', False):
+                generator_structure['lang_mapping_ids'] += [(0, 0, 
+                            self._get_language_mapping_values(language_mappings[str(language_mapping)]))]
 
         # for the o2m child_ids list are populated recursively
         for child_id in generator_structures[generator_id].get('child_ids', []):
@@ -1098,19 +3677,8 @@ class DataStructureSync:
         if not parser_id or not parser_structures or not parser_id in parser_structures:
             print(f"WARNING: create_parser_tuple: missing data for parser_id {parser_id}")
             return []
-        # the simple fields are added as stored
-        parser_structure = {k: v for k, v in parser_structures[parser_id].items() 
-                                        if k in self.parser_structure_fields_simple}
-
-        # the m2o fields need the record ids of the target system, so those have to be obtained if set
-        field_name = parser_structures[parser_id].get('field_id.name', False)
-        field_model = parser_structures[parser_id].get('field_id.model', False)
-        if field_name and field_model:
-            parser_structure['field_id'] = self.get_field_id_by_name_model( \
-                            name=field_name, model=field_model)
-        model_model = parser_structures[parser_id].get('odoo_model_id.model', False)
-        if model_model:
-            parser_structure['odoo_model_id'] = self.get_model_id_by_model(model=model_model)
+        # the simple fields are added as stored, the m2o fields with the record ids of the target system
+        parser_structure = self._get_parser_values(parser_structures[parser_id])
 
         # for the o2m first empty lists are added, to populate them next
         parser_structure.update({k: [] for k in self.parser_structure_fields_o2m})
@@ -1122,15 +3690,541 @@ class DataStructureSync:
         return parser_structure
 
 
-    def update_structure(self, data_structure_name=None, data_file_name=None, unlink_records=False):
+    def update_structure(self, data_structure_name=None, data_file_name=None, unlink_records=False,
+                         data_structure=None):
         ''' update is upsert really, as for non-existing data structures a new one will be created
             automatically, if not inhibited.
             additionally the unlink-records flag will used to determine if records found on the target system
-            but are not in the stored data should be unlinked or not.'''
-        print(f"WARNING: updating structures in Odoo isn't implemented yet")
+            but are not in the stored data should be unlinked or not.
+            the target's current structure is read in batch and its generator, language mapping and parser
+            records are matched against the stored ones by their stable keys per parent, then a single write
+            sends only what differs: (1, ID, {changed values}) for changed records, (0, 0, {values}) for new
+            ones and (2, ID) for records not in the stored data if they should be unlinked.
+            the data can be given already loaded from the file as data_structure'''
+        if not(data_structure_name):
+            raise Exception("ERROR: no data structure name given")
+        data_structure = data_structure or self.load_data_file(data_file_name=data_file_name)
+        if not data_structure:
+            return False
+
+        if self.verbosity > 1:
+            print(f"reading the existing data.structure named {data_structure_name}")
+        target_structure = self.read_structure(data_structure_name=data_structure_name)
+        if not target_structure:
+            print(f"INFO: there is no data.structure named {data_structure_name} yet, creating it")
+            return self.create_structure(data_structure_name=data_structure_name, data_file_name=data_file_name,
+                                         data_structure=data_structure)
+
+        # look up all the records referenced by the data on the target system before comparing
+        self.resolve_target_references(data_structure=data_structure)
+
+        counts = {'create': 0, 'update': 0, 'unlink': 0}
+        source_data = data_structure['data_structure']
+        target_data = target_structure['data_structure']
+        data_structure_values = self._get_data_structure_values(source_data)
+        data_structure_values.pop('name', None) # the structure keeps its name
+        data_structure_values = self._get_changed_values(values=data_structure_values, target_record=target_data,
+                                                         m2o_fields=self.data_structure_fields_m2o)
+        if data_structure_values:
+            counts['update'] += 1
+        commands = self._get_update_commands(kind='generator',
+                        source_ids=source_data.get('generator_ids', []),
+                        target_ids=target_data.get('generator_ids', []),
+                        data_structure=data_structure, target_structure=target_structure,
+                        unlink_records=unlink_records, counts=counts)
+        if commands:
+            data_structure_values['generator_ids'] = commands
+        commands = self._get_update_commands(kind='parser',
+                        source_ids=source_data.get('parser_ids', []),
+                        target_ids=target_data.get('parser_ids', []),
+                        data_structure=data_structure, target_structure=target_structure,
+                        unlink_records=unlink_records, counts=counts)
+        if commands:
+            data_structure_values['parser_ids'] = commands
+
+        if not data_structure_values:
+            print(f"Result: the data structure {data_structure_name} is already up to date")
+            return True
+        if self.verbosity > 1:
+            print(f"now updating data structure {data_structure_name} with the following values:")
+            pprint(data_structure_values)
+        data = {
+            'model': "data.structure",
+            'ids': json.dumps([target_data['id']]),
+            'values': json.dumps(data_structure_values),
+        }
+        response = self.odoo_api.execute('write', type="PUT", data=data)
+        if response:
+            print(f"Result: the data structure {data_structure_name} has been updated: {counts['create']} "
+                  f"records created, {counts['update']} updated and {counts['unlink']} unlinked")
+            return True
+        print("WARNING: there seems to have been a problem updating the structure in Odoo, "
+              "check the previous messages or increase verbosity.")
         return False
 
 
+    def deploy(self, connections=[], data_file_name=None, data_structure_name=None, update=False, jobs=4,
+               chunk_size=None, unlink_records=True, report_file_name=None):
+        ''' creates the data structure from the data file on all the connections matching the given names or
+            glob patterns, or updates it there with update. the file is loaded and checked only once before
+            anything is sent, then a pool of jobs worker threads deploys to the targets at the same time, each
+            with its own api session, authentication and reference caches. a target failing doesn't stop the
+            others, the report at the end lists the result and the time taken per target (also written to the
+            report file as json if given). returns True if the deployment succeeded on all targets'''
+        targets = self.get_connections(patterns=connections)
+        if not targets:
+            raise Exception(f"ERROR: no connection in {self.cred_file_name} matches {', '.join(connections)}")
+        data_structure = self.load_data_file(data_file_name=data_file_name, lazy=not update)
+        if not data_structure:
+            return False
+        problems = self.validate_data_structure(data_structure=data_structure)
+        if problems:
+            raise Exception(f"ERROR: the data in {data_file_name} is inconsistent, nothing has been deployed:\n  "
+                            + "\n  ".join(problems))
+        data_structure_name = data_structure_name or data_structure['data_structure'].get('name')
+        if self.verbosity > 0:
+            print(f"INFO: deploying the data structure {data_structure_name} to {len(targets)} connections: "
+                  f"{', '.join(targets)}")
+
+        def _deploy(connection):
+            started = time.monotonic()
+            result = {'connection': connection, 'success': False, 'seconds': 0.0, 'requests': 0, 'message': ''}
+            target = self.get_session(init_api=False)
+            try:
+                target.open_session(connection=connection)
+                if update:
+                    response = target.update_structure(data_structure_name=data_structure_name,
+                                    data_file_name=data_file_name, unlink_records=unlink_records,
+                                    data_structure=data_structure)
+                else:
+                    response = target.create_structure(data_structure_name=data_structure_name,
+                                    data_file_name=data_file_name, chunk_size=chunk_size,
+                                    data_structure=data_structure)
+                result['success'] = bool(response)
+                if not response:
+                    result['message'] = "failed, see its output"
+                elif not update:
+                    result['message'] = f"created with id {response[0] if isinstance(response, list) else response}"
+            except Exception as e:
+                result['message'] = str(e)
+                print(e)
+            finally:
+                if target.odoo_api:
+                    result['requests'] = target.odoo_api.get_counter()
+                    target.close_api()
+                result['seconds'] = round(time.monotonic() - started, 3)
+            return result
+
+        # the output of each target is printed in one piece, in the order of the targets
+        results = []
+        with ThreadOutput() as output, ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = [executor.submit(output.run, _deploy, connection) for connection in targets]
+            for connection, future in zip(targets, futures):
+                task_output, result, error = future.result()
+                if self.verbosity > 0 or not result['success']:
+                    output.stream.write(f"--- {connection}\n{task_output}")
+                results.append(result)
+
+        print(f"{'connection':<24} {'result':<7} {'seconds':>8} {'requests':>8}  message")
+        for result in results:
+            print(f"{result['connection']:<24} {'ok' if result['success'] else 'FAILED':<7} "
+                  f"{result['seconds']:>8.2f} {result['requests']:>8}  {result['message']}")
+        failed = [result['connection'] for result in results if not result['success']]
+        print(f"Result: the data structure {data_structure_name} has been deployed to "
+              f"{len(results) - len(failed)} of {len(results)} connections"
+              + (f", it failed on {', '.join(failed)}" if failed else ""))
+        if report_file_name:
+            with open(report_file_name, 'w') as report_file:
+                json.dump({'data_file': data_file_name, 'structure': data_structure_name,
+                           'update': update, 'targets': results}, report_file, indent=2)
+        return not failed
+
+
+    def sync(self, source_connection=None, target_connection=None, data_structure_name=None,
+             target_structure_name=None, update=False, chunk_size=None, unlink_records=True, export_meta=False):
+        ''' copies the data structure from the source connection to the target connection (as target structure
+            name if given) without an intermediate file. both connections are authenticated at the same time,
+            then the structure is read level by level from the source while workers resolve the references of
+            the levels read so far, first on the source and then on the target, so when the last level arrives
+            only the create (or the update with update) is left. missing references on the target stop the read
+            right away.
+            returns the result of the create or update'''
+        target_structure_name = target_structure_name or data_structure_name
+        if not(data_structure_name):
+            raise Exception("ERROR: no data structure name given")
+        started = time.monotonic()
+        source = self.get_session(init_api=False)
+        target = self.get_session(init_api=False)
+        try:
+            with ThreadOutput() as output, ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(output.run, source.open_session, connection=source_connection),
+                           executor.submit(output.run, target.open_session, connection=target_connection)]
+                for future in futures:
+                    task_output, result, error = future.result()
+                    output.stream.write(task_output)
+                    if error:
+                        raise error
+
+            # the records read from the source pass two stages in worker threads: first their references are
+            # resolved on the source, then the identifiable data of those is looked up on the target
+            source_pending, target_pending = queue.Queue(), queue.Queue()
+            errors = []
+            add_references = {
+                'data_structures': source.add_data_structure_references,
+                'generator_structures': source.add_generator_references,
+                'language_mappings': source.add_language_mapping_references,
+                'parser_structures': source.add_parser_references,
+            }
+
+            def _resolve_source(kind, records):
+                source.resolve_references(**{kind: records.values()})
+                for record in records.values():
+                    add_references[kind](record)
+
+            def _resolve_target(kind, records):
+                if kind == 'exists':
+                    if target.get_record_id_by_domain(model='data.structure',
+                                                      domain=[['name', '=', target_structure_name]]):
+                        raise Exception(f"ERROR: There is already an existing data.structure named "
+                                        f"{target_structure_name} on {target_connection}, consider changing "
+                                        "the name or using update.")
+                elif kind == 'data_structures':
+                    target.resolve_target_references(data_structure={'data_structure': next(iter(records.values()))})
+                else:
+                    target.resolve_target_references(data_structure={kind: records})
+
+            def _run_stage(pending=None, process=None, next_pending=None):
+                for item in iter(pending.get, None):
+                    if not errors:
+                        try:
+                            process(*item)
+                        except Exception as e:
+                            errors.append(e)
+                    if next_pending:
+                        next_pending.put(item)
+                if next_pending:
+                    next_pending.put(None)
+
+            def _on_records(kind, records):
+                if errors:
+                    raise errors[0]
+                if self.verbosity > 1:
+                    print(f"resolving the references of {len(records)} {kind} on {target_connection}")
+                source_pending.put((kind, records))
+
+            # the target is checked for an existing structure while the source is still being read
+            if not update:
+                target_pending.put(('exists', None))
+            workers = [threading.Thread(target=_run_stage, daemon=True, kwargs={'pending': source_pending,
+                                        'process': _resolve_source, 'next_pending': target_pending}),
+                       threading.Thread(target=_run_stage, daemon=True, kwargs={'pending': target_pending,
+                                        'process': _resolve_target})]
+            for worker in workers:
+                worker.start()
+            errors_before = source.odoo_api.error_count
+            try:
+                data_structure = source.read_structure(data_structure_name=data_structure_name,
+                                                       export_meta=export_meta, on_records=_on_records)
+            finally:
+                source_pending.put(None)
+                for worker in workers:
+                    worker.join()
+            if errors:
+                raise errors[0]
+            if source.odoo_api.error_count > errors_before:
+                raise Exception(f"ERROR: {source.odoo_api.error_count - errors_before} request(s) failed while "
+                                f"reading the data structure {data_structure_name} from {source_connection}, "
+                                "its copy would be incomplete. aborting.")
+            if not data_structure:
+                print(f"ERROR: there is no data.structure named {data_structure_name} on {source_connection}")
+                return False
+            # the records are keyed by their ids as strings, as if the data had been loaded from an export
+            for kind in ['generator_structures', 'language_mappings', 'parser_structures']:
+                data_structure[kind] = {str(rec_id): record for rec_id, record in data_structure[kind].items()}
+            if self.verbosity > 0:
+                print(f"INFO: read the data structure {data_structure_name} from {source_connection} in "
+                      f"{source.odoo_api.get_counter()} requests, resolved its references on {target_connection}")
+
+            if update:
+                result = target.update_structure(data_structure_name=target_structure_name,
+                                                 unlink_records=unlink_records, data_structure=data_structure)
+            else:
+                result = target.create_structure(data_structure_name=target_structure_name, chunk_size=chunk_size,
+                                                 data_structure=data_structure)
+            if self.verbosity > 0:
+                print(f"INFO: synced the data structure {data_structure_name} from {source_connection} to "
+                      f"{target_connection} in {time.monotonic() - started:.2f}s, using "
+                      f"{source.odoo_api.get_counter()} requests on the source and "
+                      f"{target.odoo_api.get_counter()} on the target")
+            return result
+        finally:
+            for session in [source, target]:
+                if session.odoo_api:
+                    session.close_api()
+
+
+    def _get_match_key(self, kind='', record={}):
+        ''' the key records are matched by between the stored data and the target system among the records
+            of the same parent'''
+        if kind == 'generator':
+            return (record.get('keyword'), record.get('sequence'))
+        elif kind == 'parser':
+            return (record.get('keyword'),)
+        elif kind == 'language_mapping':
+            return (record.get('lang_id.code'),)
+        return ()
+
+
+    def match_records(self, kind='', source_items=[], target_items=[]):
+        ''' takes lists of (id, record) of the stored data and of the target system for the children of one
+            parent and matches them by their keys in linear time. records with the same key are matched in the
+            order they come in.
+            returns the list of matched (source id, target id) pairs and the lists of the unmatched source and
+            unmatched target ids'''
+        target_by_key = {}
+        for target_id, target_record in target_items:
+            target_by_key.setdefault(self._get_match_key(kind=kind, record=target_record), []).append(target_id)
+        for target_ids in target_by_key.values():
+            target_ids.reverse() # so pop() returns them in order
+        matched, added = [], []
+        for source_id, source_record in source_items:
+            target_ids = target_by_key.get(self._get_match_key(kind=kind, record=source_record))
+            if target_ids:
+                matched.append((source_id, target_ids.pop()))
+            else:
+                added.append(source_id)
+        matched_target_ids = {target_id for source_id, target_id in matched}
+        removed = [target_id for target_id, target_record in target_items if target_id not in matched_target_ids]
+        return matched, added, removed
+
+
+    def _get_changed_values(self, values={}, target_record={}, m2o_fields=[]):
+        ''' returns the values that differ from the target's record, m2o fields not set in the values are
+            compared as empty, so they get cleared on the target too'''
+        values = dict({f: False for f in m2o_fields if f in target_record}, **values)
+        changed = {}
+        for field_name, value in values.items():
+            target_value = target_record.get(field_name, False)
+            if type(target_value) in [list, tuple]:
+                target_value = target_value[0] if target_value else False
+            if (target_value if target_value is not None else False) != (value if value is not None else False):
+                changed[field_name] = value
+        return changed
+
+
+    def _get_update_commands(self, kind='', source_ids=[], target_ids=[], data_structure={}, target_structure={},
+                             unlink_records=False, counts={}):
+        ''' builds the o2m commands to turn the target's children (of one parent) into the stored ones,
+            recursing into the matched children'''
+        section = {'generator': 'generator_structures', 'parser': 'parser_structures',
+                   'language_mapping': 'language_mappings'}[kind]
+        source_records = data_structure.get(section) or {}
+        target_records = target_structure.get(section) or {}
+        source_items = [(source_id, source_records[str(source_id)]) for source_id in source_ids
+                        if str(source_id) in source_records]
+        target_items = [(target_id, target_records[target_id]) for target_id in target_ids
+                        if target_id in target_records]
+        matched, added, removed = self.match_records(kind=kind, source_items=source_items,
+                                                     target_items=target_items)
+        commands = []
+        for source_id, target_id in matched:
+            source_record, target_record = source_records[str(source_id)], target_records[target_id]
+            if kind == 'generator':
+                values = self._get_changed_values(values=self._get_generator_values(source_record),
+                                                  target_record=target_record,
+                                                  m2o_fields=self.generator_structure_fields_m2o +
+                                                             self.generator_structure_fields_m2o_14)
+            elif kind == 'parser':
+                values = self._get_changed_values(values=self._get_parser_values(source_record),
+                                                  target_record=target_record,
+                                                  m2o_fields=self.parser_structure_fields_m2o)
+            else:
+                values = self._get_changed_values(values=self._get_language_mapping_values(source_record),
+                                                  target_record=target_record)
+            if values:
+                counts['update'] += 1
+            o2m_fields = {'generator': [('child_ids', 'generator'), ('lang_mapping_ids', 'language_mapping')],
+                          'parser': [('child_ids', 'parser')]}.get(kind, [])
+            for o2m_field, child_kind in o2m_fields:
+                child_commands = self._get_update_commands(kind=child_kind,
+                                    source_ids=source_record.get(o2m_field) or [],
+                                    target_ids=target_record.get(o2m_field) or [],
+                                    data_structure=data_structure, target_structure=target_structure,
+                                    unlink_records=unlink_records, counts=counts)
+                if child_commands:
+                    values[o2m_field] = child_commands
+            if values:
+                commands.append((1, target_id, values))
+        for source_id in added:
+            if kind == 'generator':
+                commands.append((0, 0, self.create_generator_tuple(generator_id=str(source_id),
+                                    generator_structures=data_structure['generator_structures'],
+                                    language_mappings=data_structure.get('language_mappings') or {})))
+            elif kind == 'parser':
+                commands.append((0, 0, self.create_parser_tuple(parser_id=str(source_id),
+                                    parser_structures=data_structure['parser_structures'])))
+            elif source_records[str(source_id)].get('lang_id.code', False):
+                commands.append((0, 0, self._get_language_mapping_values(source_records[str(source_id)])))
+            else:
+                continue
+            counts['create'] += 1
+        if unlink_records:
+            commands += [(2, target_id) for target_id in removed]
+            counts['unlink'] += len(removed)
+        return commands
+
+
+    def _get_comparable_values(self, kind='', record={}):
+        ''' the values of an exported record that can be compared between systems: the simple fields and the
+            identifiable data of the references instead of their ids'''
+        if kind == 'data_structure':
+            fields = self.data_structure_fields_simple + self.data_structure_fields_simple_14 + \
+                     ['child_id.name', 'model_id.model', 'filter_date_field_id.name', 'filter_date_field_id.model']
+        elif kind == 'generator':
+            fields = self.generator_structure_fields_simple + self.generator_structure_fields_simple_14 + \
+                     ['lang_id.code', 'model_id.model', 'filter_date_field_id.name', 'filter_date_field_id.model']
+        elif kind == 'parser':
+            fields = self.parser_structure_fields_simple + \
+                     ['field_id.name', 'field_id.model', 'odoo_model_id.model']
+        else:
+            fields = self.language_mapping_fields_simple + ['lang_id.code']
+        # references are only exported if set, so a missing one is the same as an empty one
+        return {f: record.get(f, False) for f in fields if f in record or '.' in f}
+
+
+    def _get_signature(self, values={}):
+        return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+    def _get_subtree_signature(self, kind='', rec_id=None, data_structure={}, signatures={}):
+        ''' hashes a record's comparable values together with the signatures of its children and language
+            mappings, so two subtrees with the same signature are identical and need not be compared any
+            further. the signatures are memoized per record, so hashing a whole tree is linear'''
+        if (kind, rec_id) in signatures:
+            return signatures[(kind, rec_id)]
+        section = {'generator': 'generator_structures', 'parser': 'parser_structures',
+                   'language_mapping': 'language_mappings'}[kind]
+        record = (data_structure.get(section) or {}).get(rec_id)
+        if record is None:
+            return None
+        parts = [self._get_signature(self._get_comparable_values(kind=kind, record=record))]
+        o2m_fields = {'generator': [('child_ids', 'generator'), ('lang_mapping_ids', 'language_mapping')],
+                      'parser': [('child_ids', 'parser')]}.get(kind, [])
+        for o2m_field, child_kind in o2m_fields:
+            parts.append([self._get_subtree_signature(kind=child_kind, rec_id=self._get_key_type(child_id, rec_id),
+                          data_structure=data_structure, signatures=signatures)
+                          for child_id in record.get(o2m_field) or []])
+        signatures[(kind, rec_id)] = self._get_signature(parts)
+        return signatures[(kind, rec_id)]
+
+
+    def _get_key_type(self, rec_id=None, like=None):
+        ''' ids are int keys in freshly read data but str keys in data loaded from json'''
+        return str(rec_id) if isinstance(like, str) else rec_id
+
+
+    def diff_structure(self, data_structure_name=None, data_file_name=None, json_output=False):
+        ''' compares a data structure stored in the json file with the live data structure without writing
+            anything. generators, parsers and language mappings are matched per parent by the same keys the
+            update uses, and subtrees with the same signature are skipped, so the comparison stays linear in
+            the size of the trees.
+            returns the report of added (only in the file), removed (only live) and modified records'''
+        data_structure = self.load_data_file(data_file_name=data_file_name)
+        if not data_structure:
+            return False
+        if not data_structure_name:
+            data_structure_name = data_structure['data_structure'].get('name')
+        live_structure = self.read_structure(data_structure_name=data_structure_name)
+        if not live_structure:
+            print(f"ERROR: there is no data.structure named {data_structure_name} to compare with")
+            return False
+
+        report = {
+            'data_structure': {'name': data_structure_name, 'modified': {}},
+            'generators': {'added': [], 'removed': [], 'modified': []},
+            'language_mappings': {'added': [], 'removed': [], 'modified': []},
+            'parsers': {'added': [], 'removed': [], 'modified': []},
+        }
+        source_values = self._get_comparable_values(kind='data_structure', record=data_structure['data_structure'])
+        live_values = self._get_comparable_values(kind='data_structure', record=live_structure['data_structure'])
+        source_values.pop('name', None)
+        report['data_structure']['modified'] = {f: [live_values.get(f, False), v] for f, v in source_values.items()
+                                                if f in live_values and live_values[f] != v}
+        signatures = ({}, {})
+        for kind, o2m_field in [('generator', 'generator_ids'), ('parser', 'parser_ids')]:
+            self._diff_children(kind=kind, source_ids=data_structure['data_structure'].get(o2m_field) or [],
+                                live_ids=live_structure['data_structure'].get(o2m_field) or [],
+                                data_structure=data_structure, live_structure=live_structure, path='',
+                                signatures=signatures, report=report)
+
+        if json_output:
+            print(json.dumps(report, indent=2))
+        else:
+            self._print_diff_report(report=report)
+        return report
+
+
+    def _diff_children(self, kind='', source_ids=[], live_ids=[], data_structure={}, live_structure={}, path='',
+                       signatures=({}, {}), report={}):
+        section = {'generator': 'generator_structures', 'parser': 'parser_structures',
+                   'language_mapping': 'language_mappings'}[kind]
+        report_section = {'generator': 'generators', 'parser': 'parsers',
+                          'language_mapping': 'language_mappings'}[kind]
+        source_records = data_structure.get(section) or {}
+        live_records = live_structure.get(section) or {}
+        source_items = [(str(i), source_records[str(i)]) for i in source_ids if str(i) in source_records]
+        live_items = [(i, live_records[i]) for i in live_ids if i in live_records]
+        matched, added, removed = self.match_records(kind=kind, source_items=source_items, target_items=live_items)
+
+        def _path(record):
+            key = record.get('lang_id.code') if kind == 'language_mapping' else record.get('keyword')
+            return f"{path}/{key}"
+
+        for source_id in added:
+            report[report_section]['added'].append({'path': _path(source_records[source_id]), 'file_id': source_id})
+        for live_id in removed:
+            report[report_section]['removed'].append({'path': _path(live_records[live_id]), 'live_id': live_id})
+        for source_id, live_id in matched:
+            if self._get_subtree_signature(kind=kind, rec_id=source_id, data_structure=data_structure,
+                                           signatures=signatures[0]) == \
+               self._get_subtree_signature(kind=kind, rec_id=live_id, data_structure=live_structure,
+                                           signatures=signatures[1]):
+                continue # the whole subtree is the same
+            source_record, live_record = source_records[source_id], live_records[live_id]
+            source_values = self._get_comparable_values(kind=kind, record=source_record)
+            live_values = self._get_comparable_values(kind=kind, record=live_record)
+            changes = {f: [live_values.get(f, False), v] for f, v in source_values.items()
+                       if f in live_values and live_values[f] != v}
+            if changes:
+                report[report_section]['modified'].append({'path': _path(source_record), 'file_id': source_id,
+                                                           'live_id': live_id, 'changes': changes})
+            o2m_fields = {'generator': [('child_ids', 'generator'), ('lang_mapping_ids', 'language_mapping')],
+                          'parser': [('child_ids', 'parser')]}.get(kind, [])
+            for o2m_field, child_kind in o2m_fields:
+                self._diff_children(kind=child_kind, source_ids=source_record.get(o2m_field) or [],
+                                    live_ids=live_record.get(o2m_field) or [], data_structure=data_structure,
+                                    live_structure=live_structure, path=_path(source_record),
+                                    signatures=signatures, report=report)
+
+
+    def _print_diff_report(self, report={}):
+        for field_name, (live_value, file_value) in report['data_structure']['modified'].items():
+            print(f"~ data structure {report['data_structure']['name']}: {field_name}: {live_value!r} -> "
+                  f"{file_value!r}")
+        total = len(report['data_structure']['modified'])
+        for report_section, label in [('generators', 'generator'), ('language_mappings', 'language mapping'),
+                                      ('parsers', 'parser')]:
+            for entry in report[report_section]['added']:
+                print(f"+ {label} {entry['path']}")
+            for entry in report[report_section]['removed']:
+                print(f"- {label} {entry['path']}")
+            for entry in report[report_section]['modified']:
+                changes = ', '.join(f"{f}: {v[0]!r} -> {v[1]!r}" for f, v in entry['changes'].items())
+                print(f"~ {label} {entry['path']}: {changes}")
+            total += sum(len(report[report_section][k]) for k in ['added', 'removed', 'modified'])
+        if not total:
+            print(f"INFO: the data structure {report['data_structure']['name']} is the same as in the file")
+
 
 #################
 # main
@@ -1141,16 +4235,38 @@ class DataStructureSync:
 def export_structure(odoosync, args):
     odoosync.export_structures(data_structure_names=args.structure, data_file_name=args.datafile, 
                             export_meta=args.export_meta, export_no_import=args.export_no_import, 
-                            export_ilike=args.export_ilike)
+                            export_ilike=args.export_ilike, jobs=args.jobs, use_async=args.use_async,
+                            incremental=args.incremental, manifest_file_name=args.manifest,
+                            stream=args.stream, compact=args.compact, resume=args.resume)
+
+def snapshot(odoosync, args):
+    odoosync.snapshot(data_file_name=args.datafile, archive_file_name=args.archive, export_meta=args.export_meta,
+                            export_no_import=args.export_no_import, page_size=args.page_size,
+                            compact=args.compact)
 
 def create_structure(odoosync, args):
-    odoosync.create_structure(data_structure_name=args.structure, data_file_name=args.datafile)
+    return odoosync.create_structure(data_structure_name=args.structure, data_file_name=args.datafile,
+                            chunk_size=args.chunk_size, resume=args.resume)
 
 def update_structure(odoosync, args):
-    print("WARNING: updating an existing data structure isn't implemented yet")
-    return False
     odoosync.update_structure(data_structure_name=args.structure, data_file_name=args.datafile,
-                            unlink = not(args.preserve_records))
+                            unlink_records = not(args.preserve_records))
+
+def diff_structure(odoosync, args):
+    odoosync.diff_structure(data_structure_name=args.structure, data_file_name=args.datafile,
+                            json_output=args.json)
+
+def deploy(odoosync, args):
+    return odoosync.deploy(connections=args.connections, data_file_name=args.datafile,
+                            data_structure_name=args.structure, update=args.update, jobs=args.jobs,
+                            chunk_size=args.chunk_size, unlink_records=not(args.preserve_records),
+                            report_file_name=args.report)
+
+def sync(odoosync, args):
+    return odoosync.sync(source_connection=args.source, target_connection=args.target,
+                            data_structure_name=args.structure, target_structure_name=args.target_structure,
+                            update=args.update, chunk_size=args.chunk_size,
+                            unlink_records=not(args.preserve_records), export_meta=args.export_meta)
 
 def scaffold_credentials(odoosync, args):
     odoosync.write_scaffold_credentials(cred_file_name='example_credentials.json')
@@ -1175,6 +4291,24 @@ def main():
                         help="the script by default only prints warnings and errors; increase verbosity to "
                         "show the successfully exported structures (v), more details, like received data "
                         "(vv), even more details like also sent payloads (vvv), everything (vvvv)")
+    parser.add_argument("--cache-dir", action="store", default=None,
+                        help="keep the looked up models, fields, languages and data structures (and the oauth2 "
+                        "tokens) in a cache in this directory, so later runs against the same connection can skip "
+                        "those lookups. by default nothing is cached between runs.")
+    parser.add_argument("--cache-ttl", action="store", type=int, default=86400,
+                        help="seconds the cached lookups are kept, defaults to 86400 (one day).")
+    parser.add_argument("--refresh-cache", action="store_true", default=False,
+                        help="drop the cached lookups of the connection and look everything up again.")
+    parser.add_argument("--stats", action="store_true", default=False,
+                        help="print the number, latency and size of the requests per endpoint and model, the hits "
+                        "and misses of the reference caches and the time spent per tree level in the end.")
+    parser.add_argument("--stats-file", action="store", default=None,
+                        help="write those stats to this file, in the prometheus textfile format if it ends with "
+                        ".prom or as json otherwise.")
+    parser.add_argument("--journal", action="store", default='checkpoint_journal.jsonl',
+                        help="the file the progress of exports and creates is recorded to, so they can be "
+                        "continued with --resume if they stop midway. it's removed once they complete, while it "
+                        "exists other runs recording to it need --resume. defaults to checkpoint_journal.jsonl.")
 
     # add subparsers for individual functions: scaffold, export, create, update
     subparsers = parser.add_subparsers(title="command",
@@ -1198,7 +4332,9 @@ def main():
                         "the structure's sanitized name.")
     parser_export.add_argument("-d", "--datafile", action="store", default='{}.json',
                         help="specify the json file to write the data structure to, defaults to {}.json. "
-                        "the placeholder '{}' will be replaced with a sanitized structure name.")
+                        "the placeholder '{}' will be replaced with a sanitized structure name. a file ending in "
+                        ".dsc, .dsc.gz or .dsc.zst is written in the compact columnar format instead (uncompressed, "
+                        "gzip or zstd compressed - the latter needs the zstandard package).")
     parser_export.add_argument("-i", "--export-ilike", action="store_true",  default=False,
                         help="yield all structures partially matching the given name. "
                         "Default is a full match.")
@@ -1206,8 +4342,55 @@ def main():
                         help="also export meta data")
     parser_export.add_argument("-n", "--export-no-import", action="store_true",  default=False,
                         help="also export non-importable fields")
+    parser_export.add_argument("-j", "--jobs", action="store", type=int, default=1,
+                        help="number of data structures to export in parallel, defaults to 1.")
+    parser_export.add_argument("-a", "--async", action="store_true", default=False, dest="use_async",
+                        help="send independent requests of an export concurrently (needs the aiohttp package).")
+    parser_export.add_argument("--concurrency", action="store", type=int, default=8,
+                        help="maximum number of concurrent async requests per data structure, defaults to 8.")
+    parser_export.add_argument("--stream", action="store_true", default=False,
+                        help="stream the records to the file as they are read instead of holding the whole data "
+                        "structure in memory, for huge structures - the file is the same.")
+    parser_export.add_argument("--compact", action="store_true", default=False,
+                        help="write the json without indentation and spaces.")
+    parser_export.add_argument("--incremental", action="store_true", default=False,
+                        help="only export the data structures that changed since their last export to the same "
+                        "file, according to the manifest file.")
+    parser_export.add_argument("--manifest", action="store", default='export_manifest.json',
+                        help="the manifest file recording the previous exports for --incremental, defaults to "
+                        "export_manifest.json.")
+    parser_export.add_argument("--resume", action="store_true", default=False,
+                        help="skip the structures a previous run that stopped midway has already exported, as "
+                        "recorded in the journal file.")
     parser_export.set_defaults(func=export_structure, init_api=True)
 
+    # arguments to export all data structures at once
+    parser_snapshot = subparsers.add_parser('snapshot', help="this will read all data structures of the Odoo "
+                        "instance with a few bulk requests and save each of them to a local json file, or all of "
+                        "them to one archive")
+    parser_snapshot.add_argument("connection", help="the name of a connection to be used; the detailed "
+                        "connection parameters must be stored in a file containing the connection details "
+                        "and credentials as a dictionary stored in a json format. use --credentials-file to "
+                        "use a specific file, otherwise a default file named default_credentials.json will "
+                        "be used. Use the command scaffold to output an example credentials file to "
+                        "example_credentials.json.")
+    parser_snapshot.add_argument("-d", "--datafile", action="store", default='{}.json',
+                        help="specify the json file name to export each data structure to, the placeholder {} "
+                        "is replaced with its sanitized name. defaults to {}.json. files ending in .dsc, .dsc.gz "
+                        "or .dsc.zst are written in the compact columnar format (see export).")
+    parser_snapshot.add_argument("--archive", action="store", default=None,
+                        help="write all the files to this archive instead, a .zip, .tar, .tar.gz or .tgz file.")
+    parser_snapshot.add_argument("-m", "--export-meta", action="store_true",  default=False,
+                        help="also export meta data")
+    parser_snapshot.add_argument("-n", "--export-no-import", action="store_true",  default=False,
+                        help="also export non-importable fields")
+    parser_snapshot.add_argument("--page-size", action="store", type=int, default=None,
+                        help="the number of records read per request, defaults to the page_size of the "
+                        "connection or 1000.")
+    parser_snapshot.add_argument("--compact", action="store_true", default=False,
+                        help="write the json without indentation.")
+    parser_snapshot.set_defaults(func=snapshot, init_api=True)
+
     # arguments to create a data structure in Odoo using data from the local json file
     parser_create = subparsers.add_parser('create', help="this will read the data from the local json file "
                         "and create a new data structure in Odoo recursively")
@@ -1217,9 +4400,18 @@ def main():
                         "use a specific file, otherwise a default file named default_credentials.json will "
                         "be used. Use the command scaffold to output an example credentials file to "
                         "example_credentials.json.")
-    parser_create.add_argument("datafile", help="specify the json file to read the data structure from.")
+    parser_create.add_argument("datafile", help="specify the json file to read the data structure from, columnar "
+                        "files (.dsc, .dsc.gz or .dsc.zst, see export) are recognized by their extension.")
     parser_create.add_argument("structure", help="the name of the data structure to be created in Odoo. "
                         "Note that there must not be a data structure with the same name already.")
+    parser_create.add_argument("--chunk-size", action="store", type=int, default=None,
+                        help="create large structures in chunks: the data structure first, then its generators "
+                        "and parsers with writes of at most this many records each. defaults to the "
+                        "create_chunk_size of the connection, 0 creates the whole structure with one request.")
+    parser_create.add_argument("--resume", action="store_true", default=False,
+                        help="continue a chunked create of the data structure that has stopped midway, adding "
+                        "only the records that are still missing according to the journal file (or the records "
+                        "found in Odoo without one).")
     parser_create.set_defaults(func=create_structure, init_api=True)
 
     # arguments to update a data structure in Odoo using data from the local json file
@@ -1238,6 +4430,68 @@ def main():
                         "not in the stored data structure - otherwise they are unlinked.")
     parser_update.set_defaults(func=update_structure, init_api=True)
 
+    # arguments to compare a data structure in Odoo with the data from the local json file
+    parser_diff = subparsers.add_parser('diff', help="this will read the data from the local json file "
+                        "and compare it with an existing data structure in Odoo without changing anything")
+    parser_diff.add_argument("connection", help="the name of a connection to be used; the detailed "
+                        "connection parameters must be stored in a file containing the connection details "
+                        "and credentials as a dictionary stored in a json format. use --credentials-file to "
+                        "use a specific file, otherwise a default file named default_credentials.json will "
+                        "be used. Use the command scaffold to output an example credentials file to "
+                        "example_credentials.json.")
+    parser_diff.add_argument("datafile", help="specify the json file to read the data structure from.")
+    parser_diff.add_argument("structure", nargs='?', default=None, help="the name of the data structure in "
+                        "Odoo to compare with, defaults to the name of the data structure in the file.")
+    parser_diff.add_argument("--json", action="store_true", default=False,
+                        help="print the differences as json instead of as text.")
+    parser_diff.set_defaults(func=diff_structure, init_api=True)
+
+    # arguments to deploy a data structure from the local json file to many connections at once
+    parser_deploy = subparsers.add_parser('deploy', help="this will read the data from the local json file "
+                        "once and create (or update) the data structure on several Odoo connections in parallel")
+    parser_deploy.add_argument("datafile", help="specify the json file to read the data structure from.")
+    parser_deploy.add_argument("connections", nargs='+', help="the names of the connections to deploy to, or glob "
+                        "patterns matching them like customer_*; the detailed connection parameters must be "
+                        "stored in the credentials file (see create).")
+    parser_deploy.add_argument("-s", "--structure", action="store", default=None,
+                        help="the name of the data structure in Odoo, defaults to the name in the data file.")
+    parser_deploy.add_argument("-u", "--update", action="store_true", default=False,
+                        help="update the data structure instead of creating it (creating it where it's missing).")
+    parser_deploy.add_argument("-p", "--preserve-records", action="store_true",  default=False,
+                        help="when updating, keep additional generator or parser records in the target systems "
+                        "- otherwise they are unlinked.")
+    parser_deploy.add_argument("-j", "--jobs", action="store", type=int, default=4,
+                        help="number of connections to deploy to in parallel, defaults to 4.")
+    parser_deploy.add_argument("--chunk-size", action="store", type=int, default=None,
+                        help="create the data structure in chunks of at most this many records per request (see "
+                        "create).")
+    parser_deploy.add_argument("--report", action="store", default=None,
+                        help="also write the report of the deployment to this file as json.")
+    parser_deploy.set_defaults(func=deploy, init_api=False)
+
+    # arguments to copy a data structure from one connection to another directly
+    parser_sync = subparsers.add_parser('sync', help="this will read the data structure from the source Odoo and "
+                        "create (or update) it on the target Odoo right away, without writing a json file in "
+                        "between; the references are resolved on the target while the source is still read")
+    parser_sync.add_argument("source", help="the name of the connection to read the data structure from; the "
+                        "detailed connection parameters must be stored in the credentials file (see create).")
+    parser_sync.add_argument("target", help="the name of the connection to create the data structure on.")
+    parser_sync.add_argument("structure", help="the name of the data structure to copy.")
+    parser_sync.add_argument("-t", "--target-structure", action="store", default=None,
+                        help="the name of the data structure on the target, defaults to the source's name.")
+    parser_sync.add_argument("-u", "--update", action="store_true", default=False,
+                        help="update the data structure on the target instead of creating it (creating it if "
+                        "it's missing).")
+    parser_sync.add_argument("-p", "--preserve-records", action="store_true",  default=False,
+                        help="when updating, keep additional generator or parser records in the target system "
+                        "- otherwise they are unlinked.")
+    parser_sync.add_argument("-m", "--export-meta", action="store_true", default=False,
+                        help="also read the meta fields from the source (they are not written to the target).")
+    parser_sync.add_argument("--chunk-size", action="store", type=int, default=None,
+                        help="create the data structure in chunks of at most this many records per request (see "
+                        "create).")
+    parser_sync.set_defaults(func=sync, init_api=False, datafile=None)
+
     # scaffold a new example credentials file
     parser_scaffold = subparsers.add_parser('scaffold', help="export an example credentials file to "
                         "example_credentials.json")
@@ -1261,13 +4515,33 @@ def main():
     if 'func' in args:
         # init the sync object
         odoosync = DataStructureSync(cred_file_name=args.credentials_file or 'default_credentials.json', 
-                        verbosity=args.verbosity, readonly=args.read_only)
+                        verbosity=args.verbosity, readonly=args.read_only, cache_dir=args.cache_dir,
+                        cache_ttl=args.cache_ttl, refresh_cache=args.refresh_cache)
         if args.init_api:
             # load api and init
             odoosync.load_credentials(connection=args.connection)
+            # parallel workers need enough pooled connections to not wait for each other
+            odoosync.pool_maxsize = max(odoosync.pool_maxsize, getattr(args, 'jobs', 1))
+            odoosync.max_concurrency = getattr(args, 'concurrency', odoosync.max_concurrency)
             if not odoosync.init_api():
                 raise Exception(f"ERROR: Could not initialize api - please check the connection credentials")
-        args.func(odoosync, args)
+        # exports and creates record their progress, so they can be resumed
+        if 'resume' in args:
+            odoosync.open_journal(journal_file_name=args.journal, resume=args.resume)
+        # a failed run still keeps the reference caches fetched so far and reports what it cost
+        try:
+            result = args.func(odoosync, args)
+        except BaseException:
+            odoosync.close_journal(completed=False)
+            raise
+        else:
+            odoosync.close_journal(completed=result is not False)
+        finally:
+            if args.stats:
+                odoosync.print_stats()
+            if args.stats_file:
+                odoosync.write_stats(stats_file_name=args.stats_file)
+            odoosync.close_api()
         exit()
     else:
         print("you have to chose a command... invoke with '--help' to get some")